@@ -46,6 +46,43 @@ def score() -> None:
     asyncio.run(_run())
 
 
+@app.command()
+def rescore() -> None:
+    """Rewrite scores computed under older score rules from cached features."""
+    async def _run() -> None:
+        await _init()
+        from app.services.feature_service import rescore_outdated
+        count = await rescore_outdated()
+        typer.echo(f"Rescored {count} issues")
+        await _close()
+
+    asyncio.run(_run())
+
+
+@app.command()
+def dedupe(
+    threshold: float | None = None,
+    cross_repo: bool = typer.Option(False, help="Only report pairs from different repos"),
+    limit: int = 50,
+) -> None:
+    """Report likely duplicate issues from the MinHash/LSH index."""
+    async def _run() -> None:
+        await _init()
+        from app.services.dedupe_service import find_duplicates
+        pairs = await find_duplicates(threshold, cross_repo_only=cross_repo, limit=limit)
+        for pair in pairs:
+            a, b = pair["a"], pair["b"]
+            typer.echo(
+                f"{pair['similarity']:.2f}  {a['repo_full_name']}#{a['number']} ({a['state']})"
+                f"  ~  {b['repo_full_name']}#{b['number']} ({b['state']})"
+                f"  {a['title'][:60]}"
+            )
+        typer.echo(f"{len(pairs)} likely duplicate pairs")
+        await _close()
+
+    asyncio.run(_run())
+
+
 @app.command()
 def full(csv_path: str | None = None) -> None:
     """Run full pipeline: sync then score."""
@@ -4,11 +4,64 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     github_token: str = ""
     github_api_base: str = "https://api.github.com"
+    # Secret for POST /api/webhooks/github; webhooks are refused while unset
+    github_webhook_secret: str = ""
+    webhook_batch_size: int = 500
+    webhook_flush_interval: float = 1.0
+    # Failed writes retried per queued update before it is dropped and logged
+    webhook_max_retries: int = 5
     db_path: str = "data/fixability.db"
     repos_csv_path: str = "repos.csv"
     text_score_weight: float = 0.65
     fixability_score_weight: float = 0.35
+    star_score_weight: float = 0.0
+    recency_score_weight: float = 0.0
+    recency_half_life_days: float = 30.0
+    search_candidate_limit: int = 500
     max_concurrency: int = 15
+    read_pool_size: int = 4
+    score_batch_size: int = 500
+    search_cache_size: int = 1024
+    search_cache_ttl: float = 300.0
+    detail_cache_size: int = 4096
+    search_facet_cap: int = 10000
+    search_facet_labels: int = 10
+    search_batch_max: int = 50
+    search_batch_concurrency: int = 8
+    export_chunk_size: int = 1000
+    search_timeout_ms: float = 2000.0
+    # Cache-Control per route; responses also carry an ETag (utils/http_cache.py)
+    cache_control_search: str = "private, no-cache"
+    cache_control_issue: str = "public, max-age=30"
+    cache_control_rate_limit: str = "private, max-age=10"
+    rate_limit_ttl: float = 10.0
+    # Admission control (utils/admission.py): requests in flight and waiting
+    # per route group, before new ones get a 503
+    admission_search_concurrency: int = 32
+    admission_search_queue: int = 64
+    admission_batch_concurrency: int = 4
+    admission_batch_queue: int = 8
+    admission_export_concurrency: int = 2
+    admission_export_queue: int = 4
+    admission_queue_timeout: float = 5.0
+    admission_retry_after: int = 1
+    duplicate_similarity_threshold: float = 0.5
+    similar_closed_limit: int = 5
+    lsh_max_bucket_size: int = 100
+    suggest_max_terms: int = 50000
+    suggest_min_docs: int = 2
+    # Spelling fallback for searches with fewer than fuzzy_min_results matches
+    fuzzy_min_results: int = 3
+    fuzzy_max_expansions: int = 3
+    fuzzy_budget_ms: float = 50.0
+    # Semantic search (needs numpy); see services/semantic_index.py
+    semantic_search_enabled: bool = False
+    semantic_index_dir: str = ""  # default: "<db_path>.vectors"
+    semantic_dim: int = 256
+    semantic_model: str = ""  # local sentence-transformers model instead of hashing
+    semantic_nprobe: int = 8
+    semantic_ivf_min_vectors: int = 2000
+    semantic_rrf_k: int = 60
 
     model_config = {"env_file": ".env", "env_prefix": ""}
 
@@ -1,25 +1,172 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
 import aiosqlite
 from pathlib import Path
 
 from app.config import settings
 
 _db: aiosqlite.Connection | None = None
+# Held for the whole of each write transaction on _db (see write_transaction).
+_write_lock: asyncio.Lock | None = None
+# Read-only connections for searches, so concurrent reads do not queue behind
+# each other (or behind writes) on the single aiosqlite thread of _db.
+_read_pool: list[aiosqlite.Connection] = []
+_read_next = 0
+_read_uri: str | None = None
+# Idle read-only connections for query_budget(). Each is used by one budget
+# at a time, so aborting its statements never hits another request's.
+_budget_idle: list[_BudgetedConnection] = []
+_current_read: ContextVar[aiosqlite.Connection | None] = ContextVar(
+    "current_read", default=None
+)
+# SQLite VM instructions between deadline checks (roughly tens of microseconds)
+_PROGRESS_STEPS = 1000
+_generation = 0
+# Per-issue change sequences (see get_issue_seq), hashed into a fixed table so
+# memory stays flat; issues sharing a bucket just invalidate each other.
+_ISSUE_SEQ_BUCKETS = 1 << 16
+_issue_seqs = [0] * _ISSUE_SEQ_BUCKETS
+_all_issues_seq = 0
 _SCHEMA_PATH = Path(__file__).parent / "schema.sql"
 
+# Columns added after their table first shipped. CREATE TABLE IF NOT EXISTS
+# leaves existing tables untouched, so older databases get them via ALTER TABLE.
+_ADDED_COLUMNS: dict[str, dict[str, str]] = {
+    "issue_features": {
+        "text_rules_version": "INTEGER NOT NULL DEFAULT 0",
+        "score_rules_version": "INTEGER NOT NULL DEFAULT 0",
+        "reason_codes": "TEXT NOT NULL DEFAULT ''",
+        "has_steps_to_reproduce": "INTEGER NOT NULL DEFAULT 0",
+        "has_expected_vs_actual": "INTEGER NOT NULL DEFAULT 0",
+        "has_stack_trace": "INTEGER NOT NULL DEFAULT 0",
+        "has_code_block": "INTEGER NOT NULL DEFAULT 0",
+        "maintainer_replied": "INTEGER NOT NULL DEFAULT 0",
+        "env_detail_count": "INTEGER NOT NULL DEFAULT 0",
+    },
+}
+
+
+# Derived tables backfilled from their sources the first time they are
+# created in an existing database. Triggers keep them current afterwards.
+_BACKFILLS: dict[str, str] = {
+    "issue_comment_stats": """
+        INSERT INTO issue_comment_stats
+        SELECT issue_id, COUNT(*), COUNT(DISTINCT user_login),
+               MAX(author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')),
+               MIN(CASE WHEN author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')
+                        THEN created_at END),
+               MAX(created_at)
+        FROM comments GROUP BY issue_id""",
+}
+
+
+async def _existing_tables(db: aiosqlite.Connection) -> set[str]:
+    cursor = await db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in await cursor.fetchall()}
+
+
+async def _add_missing_columns(db: aiosqlite.Connection) -> None:
+    for table, columns in _ADDED_COLUMNS.items():
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in await cursor.fetchall()}
+        if not existing:
+            continue  # Table not created yet; schema.sql has the full layout.
+        for name, decl in columns.items():
+            if name not in existing:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+async def _unpack_feature_blobs(db: aiosqlite.Connection) -> None:
+    """Move issue_features rows off the old JSON ``features``/``reasons`` layout.
+
+    The typed columns are filled from the blob and the row is flagged for
+    rescoring, which regenerates its reason codes from those columns.
+    """
+    cursor = await db.execute("PRAGMA table_info(issue_features)")
+    existing = {row[1] for row in await cursor.fetchall()}
+    if "features" not in existing:
+        return
+    await db.execute(
+        """UPDATE issue_features SET
+               has_steps_to_reproduce = COALESCE(json_extract(features, '$.has_steps_to_reproduce'), 0),
+               has_expected_vs_actual = COALESCE(json_extract(features, '$.has_expected_vs_actual'), 0),
+               has_stack_trace = COALESCE(json_extract(features, '$.has_stack_trace'), 0),
+               has_code_block = COALESCE(json_extract(features, '$.has_code_block'), 0),
+               maintainer_replied = COALESCE(json_extract(features, '$.maintainer_replied'), 0),
+               env_detail_count = COALESCE(json_extract(features, '$.env_detail_count'), 0),
+               score_rules_version = 0
+           WHERE json_valid(features)"""
+    )
+    await db.execute("ALTER TABLE issue_features DROP COLUMN features")
+    await db.execute("ALTER TABLE issue_features DROP COLUMN reasons")
+
 
 async def init_db() -> None:
-    global _db
+    global _db, _write_lock
     db_path = Path(settings.db_path)
     db_path.parent.mkdir(parents=True, exist_ok=True)
     _db = await aiosqlite.connect(str(db_path))
     _db.row_factory = aiosqlite.Row
+    _write_lock = asyncio.Lock()
     await _db.execute("PRAGMA journal_mode=WAL")
     await _db.execute("PRAGMA foreign_keys=ON")
+    await _add_missing_columns(_db)
+    await _unpack_feature_blobs(_db)
+    tables_before = await _existing_tables(_db)
     schema_sql = _SCHEMA_PATH.read_text()
     await _db.executescript(schema_sql)
+    for table, backfill_sql in _BACKFILLS.items():
+        if table not in tables_before:
+            await _db.execute(backfill_sql)
     await _db.commit()
+    bump_generation()
+    await _open_read_pool(db_path)
+
+
+async def _open_read_pool(db_path: Path) -> None:
+    global _read_uri
+    # An in-memory database is private to its connection, so reads share _db.
+    if settings.db_path == ":memory:":
+        return
+    uri = _read_uri = f"{db_path.resolve().as_uri()}?mode=ro"
+    for _ in range(settings.read_pool_size):
+        conn = await aiosqlite.connect(uri, uri=True)
+        conn.row_factory = aiosqlite.Row
+        _read_pool.append(conn)
+
+
+def get_generation() -> int:
+    """Current data generation. Changes whenever this process writes to the DB."""
+    return _generation
+
+
+def bump_generation(issue_ids: Iterable[int] | None = None) -> None:
+    """Mark everything derived from the current data (e.g. cached searches) stale.
+
+    ``issue_ids`` narrows what changed for per-issue caches: only those
+    issues' change sequences move on (none for an empty list). The default,
+    None, means data shown for any issue may have changed.
+    """
+    global _generation, _all_issues_seq
+    _generation += 1
+    if issue_ids is None:
+        _all_issues_seq += 1
+    else:
+        for issue_id in issue_ids:
+            _issue_seqs[issue_id % _ISSUE_SEQ_BUCKETS] += 1
+
+
+def get_issue_seq(issue_id: int) -> tuple[int, int]:
+    """Change sequence of one issue. Moves on whenever this process writes
+    data shown for it (its row, comments, scores, repo or duplicates)."""
+    return _all_issues_seq, _issue_seqs[issue_id % _ISSUE_SEQ_BUCKETS]
 
 
 async def get_db() -> aiosqlite.Connection:
@@ -28,8 +175,179 @@ async def get_db() -> aiosqlite.Connection:
     return _db
 
 
+@asynccontextmanager
+async def write_transaction() -> AsyncIterator[aiosqlite.Connection]:
+    """_db for one write transaction: committed when the block exits, rolled
+    back if it raises.
+
+    Every write goes through here. Coroutines interleave between awaits on
+    the shared connection, so the transaction holds a lock until it ends;
+    otherwise another writer's commit() or rollback() could land between
+    its statements. BEGIN IMMEDIATE takes SQLite's write lock up front, so
+    a concurrent writer in another process (the CLI) is waited for at the
+    start instead of failing the transaction halfway.
+    """
+    db = await get_db()
+    async with _write_lock:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
+
+
+async def get_read_db() -> aiosqlite.Connection:
+    """A connection for read-only queries, round-robin over the read pool.
+
+    Inside query_budget() it is always that budget's connection. Falls back
+    to the main connection when there is no pool (in-memory DBs or
+    ``read_pool_size=0``).
+    """
+    global _read_next
+    current = _current_read.get()
+    if current is not None:
+        return current
+    if not _read_pool:
+        return await get_db()
+    _read_next = (_read_next + 1) % len(_read_pool)
+    return _read_pool[_read_next]
+
+
+@asynccontextmanager
+async def dedicated_read_db() -> AsyncIterator[aiosqlite.Connection]:
+    """A read-only connection of its own for the enclosed block, closed when
+    it exits.
+
+    For long-running reads such as exports, which would otherwise hold a
+    read pool connection (and its thread) and stall the searches behind it.
+    Uses the main connection when there is no pool (in-memory DBs).
+    """
+    if _read_uri is None:
+        yield await get_db()
+        return
+    conn = await aiosqlite.connect(_read_uri, uri=True)
+    conn.row_factory = aiosqlite.Row
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+class QueryTimeout(Exception):
+    """Statements ran past their query_budget() deadline and were aborted."""
+
+
+class QueryBudget:
+    """Time allowed for the statements of one operation, such as a search.
+
+    Callers set ``timed_out`` when they skip a step that ran out of time,
+    i.e. when their results are partial.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        self.deadline = time.monotonic() + seconds
+        self.cancelled = False
+        self.timed_out = False
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.cancelled or time.monotonic() > self.deadline
+
+    @contextmanager
+    def limit(self, seconds: float) -> Iterator[None]:
+        """Give the enclosed statements at most ``seconds`` of the budget.
+
+        Raises QueryTimeout when they run out, leaving the rest of the
+        budget for the steps after it.
+        """
+        outer = self.deadline
+        self.deadline = min(outer, time.monotonic() + seconds)
+        try:
+            with _raise_timeouts(self):
+                yield
+        finally:
+            self.deadline = outer
+
+
+@contextmanager
+def _raise_timeouts(budget: QueryBudget) -> Iterator[None]:
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if budget.expired() and "interrupted" in str(e):
+            raise QueryTimeout("Query ran over its time budget") from e
+        raise
+
+
+class _BudgetedConnection:
+    def __init__(self, conn: aiosqlite.Connection) -> None:
+        self.conn = conn
+        self.budget: QueryBudget | None = None
+
+    def progress(self) -> int:
+        # Runs on the connection's thread; non-zero aborts the statement.
+        return int(self.budget is not None and self.budget.expired())
+
+
+async def _checkout_budgeted() -> _BudgetedConnection:
+    if _budget_idle:
+        return _budget_idle.pop()
+    conn = await aiosqlite.connect(_read_uri, uri=True)
+    conn.row_factory = aiosqlite.Row
+    budgeted = _BudgetedConnection(conn)
+    await conn.set_progress_handler(budgeted.progress, _PROGRESS_STEPS)
+    return budgeted
+
+
+@asynccontextmanager
+async def query_budget(seconds: float) -> AsyncIterator[QueryBudget]:
+    """Run the enclosed reads on a connection of their own, aborting any
+    statement still running ``seconds`` after entry.
+
+    get_read_db() returns that connection inside the block. An aborted
+    statement raises QueryTimeout. If the block is cancelled (say, the
+    client disconnected) the running statement is interrupted and queued
+    ones abort on start. Budgets are not enforced for in-memory databases,
+    which cannot be opened a second time.
+    """
+    budget = QueryBudget(seconds)
+    if _read_uri is None:
+        yield budget
+        return
+
+    budgeted = await _checkout_budgeted()
+    budgeted.budget = budget
+    token = _current_read.set(budgeted.conn)
+    reusable = True
+    try:
+        with _raise_timeouts(budget):
+            yield budget
+    except asyncio.CancelledError:
+        budget.cancelled = True
+        await budgeted.conn.interrupt()
+        reusable = False
+        raise
+    finally:
+        _current_read.reset(token)
+        if reusable and len(_budget_idle) < settings.read_pool_size:
+            budgeted.budget = None
+            _budget_idle.append(budgeted)
+        else:
+            # Statements still queued on it see the cancelled budget and abort.
+            await budgeted.conn.close()
+
+
 async def close_db() -> None:
-    global _db
+    global _db, _read_uri
+    _read_uri = None
+    while _read_pool:
+        await _read_pool.pop().close()
+    while _budget_idle:
+        await _budget_idle.pop().conn.close()
     if _db is not None:
         await _db.close()
         _db = None
@@ -1,11 +1,36 @@
 from __future__ import annotations
 
+import html
 import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 
 import aiosqlite
 
-from app.db.connection import get_db
+from app.db.connection import (
+    bump_generation,
+    dedicated_read_db,
+    get_db,
+    get_read_db,
+    write_transaction,
+)
+from app.utils.text_analysis import RULES_VERSION as TEXT_RULES_VERSION
+
+# Typed feature columns on issue_features. The boolean ones double as search
+# filters ("signals"), so they are whitelisted here before reaching SQL.
+BOOLEAN_FEATURE_COLUMNS = (
+    "has_steps_to_reproduce",
+    "has_expected_vs_actual",
+    "has_stack_trace",
+    "has_code_block",
+    "maintainer_replied",
+)
+FEATURE_COLUMNS = (*BOOLEAN_FEATURE_COLUMNS, "env_detail_count")
+
+_FEATURE_SELECT = ",\n".join(
+    f"COALESCE(f.{column}, 0) AS {column}" for column in FEATURE_COLUMNS
+)
 
 
 async def upsert_repo(
@@ -21,22 +46,22 @@ async def upsert_repo(
     updated_at: str | None = None,
     archived: bool = False,
 ) -> None:
-    db = await get_db()
-    await db.execute(
-        """INSERT INTO repos (repo_id, full_name, owner, name, stars, forks,
-                              open_issues_count, language, pushed_at, updated_at, archived, last_synced_at)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-           ON CONFLICT(repo_id) DO UPDATE SET
-               full_name=excluded.full_name, owner=excluded.owner, name=excluded.name,
-               stars=excluded.stars, forks=excluded.forks,
-               open_issues_count=excluded.open_issues_count, language=excluded.language,
-               pushed_at=excluded.pushed_at, updated_at=excluded.updated_at,
-               archived=excluded.archived, last_synced_at=excluded.last_synced_at""",
-        (repo_id, full_name, owner, name, stars, forks, open_issues_count,
-         language, pushed_at, updated_at, int(archived),
-         datetime.now(timezone.utc).isoformat()),
-    )
-    await db.commit()
+    async with write_transaction() as db:
+        await db.execute(
+            """INSERT INTO repos (repo_id, full_name, owner, name, stars, forks,
+                                  open_issues_count, language, pushed_at, updated_at, archived, last_synced_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(repo_id) DO UPDATE SET
+                   full_name=excluded.full_name, owner=excluded.owner, name=excluded.name,
+                   stars=excluded.stars, forks=excluded.forks,
+                   open_issues_count=excluded.open_issues_count, language=excluded.language,
+                   pushed_at=excluded.pushed_at, updated_at=excluded.updated_at,
+                   archived=excluded.archived, last_synced_at=excluded.last_synced_at""",
+            (repo_id, full_name, owner, name, stars, forks, open_issues_count,
+             language, pushed_at, updated_at, int(archived),
+             datetime.now(timezone.utc).isoformat()),
+        )
+    bump_generation()
 
 
 async def upsert_issue(
@@ -54,22 +79,22 @@ async def upsert_issue(
     updated_at: str | None = None,
     closed_at: str | None = None,
 ) -> None:
-    db = await get_db()
     labels_json = json.dumps(labels or [])
-    await db.execute(
-        """INSERT INTO issues (issue_id, repo_id, number, title, body, state,
-                               user_login, labels, comments_count, html_url,
-                               created_at, updated_at, closed_at)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-           ON CONFLICT(issue_id) DO UPDATE SET
-               title=excluded.title, body=excluded.body, state=excluded.state,
-               user_login=excluded.user_login, labels=excluded.labels,
-               comments_count=excluded.comments_count, html_url=excluded.html_url,
-               updated_at=excluded.updated_at, closed_at=excluded.closed_at""",
-        (issue_id, repo_id, number, title, body, state, user_login, labels_json,
-         comments_count, html_url, created_at, updated_at, closed_at),
-    )
-    await db.commit()
+    async with write_transaction() as db:
+        await db.execute(
+            """INSERT INTO issues (issue_id, repo_id, number, title, body, state,
+                                   user_login, labels, comments_count, html_url,
+                                   created_at, updated_at, closed_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(issue_id) DO UPDATE SET
+                   title=excluded.title, body=excluded.body, state=excluded.state,
+                   user_login=excluded.user_login, labels=excluded.labels,
+                   comments_count=excluded.comments_count, html_url=excluded.html_url,
+                   updated_at=excluded.updated_at, closed_at=excluded.closed_at""",
+            (issue_id, repo_id, number, title, body, state, user_login, labels_json,
+             comments_count, html_url, created_at, updated_at, closed_at),
+        )
+    bump_generation([issue_id])
 
 
 async def upsert_comment(
@@ -81,165 +106,984 @@ async def upsert_comment(
     created_at: str | None = None,
     updated_at: str | None = None,
 ) -> None:
-    db = await get_db()
-    await db.execute(
-        """INSERT INTO comments (comment_id, issue_id, body, user_login,
-                                 author_association, created_at, updated_at)
-           VALUES (?, ?, ?, ?, ?, ?, ?)
-           ON CONFLICT(comment_id) DO UPDATE SET
-               body=excluded.body, user_login=excluded.user_login,
-               author_association=excluded.author_association,
-               updated_at=excluded.updated_at""",
-        (comment_id, issue_id, body, user_login, author_association,
-         created_at, updated_at),
-    )
-    await db.commit()
+    async with write_transaction() as db:
+        await db.execute(
+            """INSERT INTO comments (comment_id, issue_id, body, user_login,
+                                     author_association, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(comment_id) DO UPDATE SET
+                   body=excluded.body, user_login=excluded.user_login,
+                   author_association=excluded.author_association,
+                   updated_at=excluded.updated_at""",
+            (comment_id, issue_id, body, user_login, author_association,
+             created_at, updated_at),
+        )
+    bump_generation([issue_id])
+
+
+async def write_webhook_batch(
+    repos: list[dict],
+    issues: list[dict],
+    comments: list[dict],
+    deleted_comment_ids: list[int],
+) -> None:
+    """Apply a batch of webhook updates in one transaction and mark the
+    issues they touch dirty for scoring.
+
+    Rows are upsert_repo / upsert_issue / upsert_comment keyword arguments.
+    Deliveries can arrive out of order, so an issue or comment is only
+    overwritten by a version updated no earlier than the stored one; a repo
+    row is only rewritten when it changed.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    affected = {row["issue_id"] for row in issues} | {row["issue_id"] for row in comments}
+    async with write_transaction() as db:
+        if deleted_comment_ids:
+            placeholders = ", ".join("?" for _ in deleted_comment_ids)
+            cursor = await db.execute(
+                f"SELECT DISTINCT issue_id FROM comments WHERE comment_id IN ({placeholders})",
+                deleted_comment_ids,
+            )
+            affected.update(row["issue_id"] for row in await cursor.fetchall())
+
+        before = db.total_changes
+        await db.executemany(
+            """INSERT INTO repos (repo_id, full_name, owner, name, stars, forks,
+                                  open_issues_count, language, pushed_at, updated_at, archived, last_synced_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(repo_id) DO UPDATE SET
+                   full_name=excluded.full_name, owner=excluded.owner, name=excluded.name,
+                   stars=excluded.stars, forks=excluded.forks,
+                   open_issues_count=excluded.open_issues_count, language=excluded.language,
+                   pushed_at=excluded.pushed_at, updated_at=excluded.updated_at,
+                   archived=excluded.archived
+               WHERE (full_name, owner, name, stars, forks, open_issues_count, language,
+                      pushed_at, updated_at, archived)
+                  IS NOT (excluded.full_name, excluded.owner, excluded.name, excluded.stars,
+                          excluded.forks, excluded.open_issues_count, excluded.language,
+                          excluded.pushed_at, excluded.updated_at, excluded.archived)""",
+            [
+                (r["repo_id"], r["full_name"], r["owner"], r["name"], r["stars"], r["forks"],
+                 r["open_issues_count"], r["language"], r["pushed_at"], r["updated_at"],
+                 int(r["archived"]), now)
+                for r in repos
+            ],
+        )
+        repos_changed = db.total_changes > before
+        await db.executemany(
+            """INSERT INTO issues (issue_id, repo_id, number, title, body, state,
+                                   user_login, labels, comments_count, html_url,
+                                   created_at, updated_at, closed_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(issue_id) DO UPDATE SET
+                   title=excluded.title, body=excluded.body, state=excluded.state,
+                   user_login=excluded.user_login, labels=excluded.labels,
+                   comments_count=excluded.comments_count, html_url=excluded.html_url,
+                   updated_at=excluded.updated_at, closed_at=excluded.closed_at
+               WHERE issues.updated_at IS NULL OR excluded.updated_at >= issues.updated_at""",
+            [
+                (i["issue_id"], i["repo_id"], i["number"], i["title"], i["body"], i["state"],
+                 i["user_login"], json.dumps(i["labels"] or []), i["comments_count"],
+                 i["html_url"], i["created_at"], i["updated_at"], i["closed_at"])
+                for i in issues
+            ],
+        )
+        await db.executemany(
+            """INSERT INTO comments (comment_id, issue_id, body, user_login,
+                                     author_association, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(comment_id) DO UPDATE SET
+                   body=excluded.body, user_login=excluded.user_login,
+                   author_association=excluded.author_association,
+                   updated_at=excluded.updated_at
+               WHERE comments.updated_at IS NULL OR excluded.updated_at >= comments.updated_at""",
+            [
+                (c["comment_id"], c["issue_id"], c["body"], c["user_login"],
+                 c["author_association"], c["created_at"], c["updated_at"])
+                for c in comments
+            ],
+        )
+        await db.executemany(
+            "DELETE FROM comments WHERE comment_id = ?", [(cid,) for cid in deleted_comment_ids]
+        )
+        # An empty computed_at sorts before every updated_at, so get_dirty_issues
+        # picks these up even when only their comments changed.
+        await db.executemany(
+            "UPDATE issue_features SET computed_at = '' WHERE issue_id = ?",
+            [(issue_id,) for issue_id in affected],
+        )
+    bump_generation(None if repos_changed else affected)
 
 
 async def upsert_issue_features(
     issue_id: int,
     fixability_score: float,
     grade: str,
-    reasons: list[str],
+    reason_codes: list[str],
     features: dict,
+    text_rules_version: int = 0,
+    score_rules_version: int = 0,
 ) -> None:
-    db = await get_db()
-    await db.execute(
-        """INSERT INTO issue_features (issue_id, fixability_score, grade, reasons, features, computed_at)
-           VALUES (?, ?, ?, ?, ?, ?)
-           ON CONFLICT(issue_id) DO UPDATE SET
-               fixability_score=excluded.fixability_score, grade=excluded.grade,
-               reasons=excluded.reasons, features=excluded.features,
-               computed_at=excluded.computed_at""",
-        (issue_id, fixability_score, grade, json.dumps(reasons),
-         json.dumps(features), datetime.now(timezone.utc).isoformat()),
-    )
-    await db.commit()
+    await upsert_issue_features_many([
+        (issue_id, fixability_score, grade, reason_codes, features,
+         text_rules_version, score_rules_version),
+    ])
+
+
+async def upsert_issue_features_many(
+    entries: list[tuple[int, float, str, list[str], dict, int, int]],
+) -> None:
+    """Upsert a batch of feature rows in one transaction.
+
+    Each entry is (issue_id, fixability_score, grade, reason_codes, features,
+    text_rules_version, score_rules_version).
+    """
+    computed_at = datetime.now(timezone.utc).isoformat()
+    columns = ", ".join(FEATURE_COLUMNS)
+    placeholders = ", ".join("?" for _ in FEATURE_COLUMNS)
+    updates = ", ".join(f"{column}=excluded.{column}" for column in FEATURE_COLUMNS)
+    async with write_transaction() as db:
+        await db.executemany(
+            f"""INSERT INTO issue_features (issue_id, fixability_score, grade, reason_codes,
+                                            {columns}, computed_at,
+                                            text_rules_version, score_rules_version)
+               VALUES (?, ?, ?, ?, {placeholders}, ?, ?, ?)
+               ON CONFLICT(issue_id) DO UPDATE SET
+                   fixability_score=excluded.fixability_score, grade=excluded.grade,
+                   reason_codes=excluded.reason_codes, {updates},
+                   computed_at=excluded.computed_at,
+                   text_rules_version=excluded.text_rules_version,
+                   score_rules_version=excluded.score_rules_version""",
+            [
+                (issue_id, fixability_score, grade, ",".join(reason_codes),
+                 *(int(features.get(column) or 0) for column in FEATURE_COLUMNS),
+                 computed_at, text_rules_version, score_rules_version)
+                for (issue_id, fixability_score, grade, reason_codes, features,
+                     text_rules_version, score_rules_version) in entries
+            ],
+        )
+    bump_generation([entry[0] for entry in entries])
+
+
+async def upsert_minhash_many(entries: list[tuple[int, bytes, list[int]]]) -> None:
+    """Replace the MinHash signature and LSH buckets of each
+    ``(issue_id, signature_blob, band_buckets)`` in one transaction."""
+    if not entries:
+        return
+    issue_ids = [(issue_id,) for issue_id, _, _ in entries]
+    async with write_transaction() as db:
+        await db.executemany("DELETE FROM issue_lsh_bands WHERE issue_id = ?", issue_ids)
+        await db.executemany(
+            "INSERT OR REPLACE INTO issue_minhash (issue_id, signature) VALUES (?, ?)",
+            [(issue_id, blob) for issue_id, blob, _ in entries],
+        )
+        await db.executemany(
+            "INSERT OR IGNORE INTO issue_lsh_bands (band, bucket, issue_id) VALUES (?, ?, ?)",
+            [
+                (band, bucket, issue_id)
+                for issue_id, _, buckets in entries
+                for band, bucket in enumerate(buckets)
+            ],
+        )
+    # Only similar_closed reads these, and it is cached by generation
+    # (cache.similar_cache), so no issue's change sequence moves on.
+    bump_generation([])
+
+
+async def update_issue_scores(
+    scores: list[tuple[float, str, list[str], int, int]],
+) -> None:
+    """Rewrite only the score columns of existing feature rows.
+
+    Each entry is (fixability_score, grade, reason_codes, score_rules_version,
+    issue_id). Feature columns and computed_at are left alone.
+    """
+    async with write_transaction() as db:
+        await db.executemany(
+            """UPDATE issue_features
+               SET fixability_score = ?, grade = ?, reason_codes = ?, score_rules_version = ?
+               WHERE issue_id = ?""",
+            [(score, grade, ",".join(codes), version, issue_id)
+             for score, grade, codes, version, issue_id in scores],
+        )
+    bump_generation([entry[-1] for entry in scores])
 
 
-async def get_dirty_issues(limit: int = 500) -> list[aiosqlite.Row]:
-    """Get issues that have no computed features or were updated after last scoring."""
+async def get_dirty_issues(
+    limit: int = 500, after_issue_id: int = 0
+) -> list[aiosqlite.Row]:
+    """Get issues that have no computed features, were updated after last scoring,
+    or had their text features extracted under an older text_analysis.RULES_VERSION.
+
+    Rows come back in issue_id order after ``after_issue_id`` so callers can
+    walk the table in keyset-paginated chunks. ``changed`` is 0 for rows that
+    are only due for the new text rules.
+    """
     db = await get_db()
     cursor = await db.execute(
         """SELECT i.issue_id, i.repo_id, i.number, i.title, i.body, i.state,
                   i.user_login, i.labels, i.comments_count, i.html_url,
                   i.created_at, i.updated_at, i.closed_at,
-                  r.full_name AS repo_full_name, r.stars, r.language, r.pushed_at, r.archived
+                  r.full_name AS repo_full_name, r.stars, r.language, r.pushed_at, r.archived,
+                  COALESCE(s.maintainer_replied, 0) AS maintainer_replied,
+                  (f.issue_id IS NULL OR i.updated_at > f.computed_at) AS changed
            FROM issues i
            JOIN repos r ON i.repo_id = r.repo_id
            LEFT JOIN issue_features f ON i.issue_id = f.issue_id
-           WHERE f.issue_id IS NULL
-              OR i.updated_at > f.computed_at
+           LEFT JOIN issue_comment_stats s ON i.issue_id = s.issue_id
+           WHERE i.issue_id > ?
+             AND (f.issue_id IS NULL
+                  OR i.updated_at > f.computed_at
+                  OR f.text_rules_version < ?)
+           ORDER BY i.issue_id
            LIMIT ?""",
-        (limit,),
+        (after_issue_id, TEXT_RULES_VERSION, limit),
     )
     return await cursor.fetchall()
 
 
-async def search_issues_fts(
-    query: str,
-    language: str | None = None,
-    state: str | None = None,
-    labels: list[str] | None = None,
-    sort_by: str = "fixability",
-    limit: int = 30,
-    offset: int = 0,
-) -> tuple[list[aiosqlite.Row], int]:
-    """Full-text search on issues with optional filters and reranking."""
+async def get_outdated_scores(
+    score_rules_version: int, after_issue_id: int = 0, limit: int = 500
+) -> list[aiosqlite.Row]:
+    """Get feature rows whose text features are current but whose score was
+    computed under an older score rules version. Issue bodies are not read."""
     db = await get_db()
+    cursor = await db.execute(
+        f"""SELECT f.issue_id, i.labels, i.state, i.comments_count,
+                  {_FEATURE_SELECT}
+           FROM issue_features f
+           JOIN issues i ON f.issue_id = i.issue_id
+           WHERE f.score_rules_version < ?
+             AND f.text_rules_version >= ?
+             AND f.issue_id > ?
+           ORDER BY f.issue_id
+           LIMIT ?""",
+        (score_rules_version, TEXT_RULES_VERSION, after_issue_id, limit),
+    )
+    return await cursor.fetchall()
 
-    where_clauses = ["issues_fts MATCH ?"]
-    params: list = [query]
 
-    if language:
-        where_clauses.append("r.language = ?")
-        params.append(language)
-    if state:
-        where_clauses.append("i.state = ?")
-        params.append(state)
-    if labels:
-        for label in labels:
-            where_clauses.append("i.labels LIKE ?")
-            params.append(f'%"{label}"%')
-
-    where = " AND ".join(where_clauses)
-
-    # Count query
-    count_sql = f"""
-        SELECT COUNT(*) FROM issues_fts
-        JOIN issues i ON issues_fts.rowid = i.issue_id
-        JOIN repos r ON i.repo_id = r.repo_id
-        LEFT JOIN issue_features f ON i.issue_id = f.issue_id
-        WHERE {where}
+def _effective_score_sql(now: datetime | None = None) -> tuple[str, list]:
+    """SQL expression for the fixability score with staleness applied as of ``now``.
+
+    ``issue_features.fixability_score`` is time-independent and unclamped;
+    the staleness penalty is derived from ``i.created_at`` here so ranking
+    never goes stale, and the result is clamped to 0-100 afterwards.
     """
-    cursor = await db.execute(count_sql, params)
+    from app.services.feature_service import staleness_cutoffs
+
+    cutoffs = staleness_cutoffs(now)
+    cases = " ".join("WHEN i.created_at <= ? THEN ?" for _ in cutoffs)
+    params: list = [v for pair in cutoffs for v in pair]
+    sql = f"MAX(0.0, MIN(100.0, COALESCE(f.fixability_score, 0) - CASE {cases} ELSE 0 END))"
+    return sql, params
+
+
+_SEARCH_FROM = """
+    FROM issues_fts
+    JOIN issues i ON issues_fts.rowid = i.issue_id
+    JOIN repos r ON i.repo_id = r.repo_id
+    LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+"""
+
+# For filter-only searches, which have no MATCH expression to join on.
+_ISSUES_FROM = """
+    FROM issues i
+    JOIN repos r ON i.repo_id = r.repo_id
+    LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+"""
+
+
+def _search_from(query: str | None) -> tuple[str, str]:
+    """FROM clause and bm25 expression for a search with or without text."""
+    if query:
+        return _SEARCH_FROM, "bm25(issues_fts)"
+    return _ISSUES_FROM, "0.0"
+
+
+# Search rows never carry i.body, which can be hundreds of KB of pasted logs;
+# get_body_snippets() fetches a short fragment for just the returned page.
+_RESULT_COLUMNS = f"""
+    i.issue_id, i.repo_id, i.number, i.title, i.state,
+    i.user_login, i.labels, i.comments_count, i.html_url,
+    i.created_at, i.updated_at, i.closed_at,
+    r.full_name AS repo_full_name, r.stars, r.open_issues_count,
+    r.language, r.pushed_at, r.archived,
+    COALESCE(f.fixability_score, 0) AS fixability_score,
+    COALESCE(f.grade, 'F') AS grade,
+    {_FEATURE_SELECT}
+"""
+
+
+# Sort modes that can be answered by walking an index on issues in order
+# (see the idx_issues_* indexes in schema.sql). issue_id breaks ties. The
+# timestamps are nullable, so they sort (and page, see search_service's
+# cursors) on a key that gives NULL a real value: a row-value comparison
+# against NULL is never true, which would drop those rows from keyset pages.
+_INDEX_SORTS = {
+    "created": "COALESCE(i.created_at, '')",
+    "updated": "COALESCE(i.updated_at, '')",
+    "comments": "i.comments_count",
+}
+
+# With fewer matches than this it is cheaper to collect them from FTS and sort
+# them than to walk an issues index in order probing each row for a match.
+_INDEX_WALK_MIN_MATCHES = 2000
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Structured search filters. Each one that is set becomes an indexed
+    predicate in the search SQL rather than a post-filter in Python."""
+
+    language: str | None = None
+    state: str | None = None
+    labels: list[str] | None = None
+    signals: list[str] | None = None  # BOOLEAN_FEATURE_COLUMNS, all required
+    # ISO 8601 UTC timestamps ("%Y-%m-%dT%H:%M:%SZ"), compared as text
+    created_after: str | None = None
+    updated_after: str | None = None
+    min_stars: int | None = None
+    exclude_archived: bool = False
+    repo: str | None = None  # "owner/name"
+    # FTS5 expression whose matches are dropped (query_parser's -term syntax
+    # when a query has no positive terms)
+    exclude_text: str | None = None
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so ``value`` only matches itself (ESCAPE '\\')."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_where(
+    query: str | None,
+    filters: SearchFilters | None = None,
+    match: str = "join",
+) -> tuple[str, list]:
+    """Build the WHERE clause for a search.
+
+    ``match`` picks how the FTS condition is expressed: "join" when
+    issues_fts is joined in (needed for bm25), "in" for a rowid subquery the
+    planner can drive from, and "walk" for a subquery it may only probe, so
+    the scan follows an ORDER BY index and stops at LIMIT. A ``query`` of
+    None searches by filters alone.
+
+    Repo-level filters are collected into one ``repo_id IN (...)`` subquery
+    so they are answered from idx_repos_language_stars (or the full_name
+    key) once, instead of per matching issue.
+    """
+    f = filters or SearchFilters()
+    # "+" keeps the planner from driving the scan off a probe-only condition.
+    probe = "+" if match == "walk" else ""
+    where_clauses: list[str] = []
+    params: list = []
+    if query and match == "join":
+        where_clauses.append("issues_fts MATCH ?")
+        params.append(query)
+    elif query:
+        where_clauses.append(
+            f"{probe}i.issue_id IN (SELECT rowid FROM issues_fts WHERE issues_fts MATCH ?)"
+        )
+        params.append(query)
+    if f.exclude_text:
+        where_clauses.append(
+            "i.issue_id NOT IN (SELECT rowid FROM issues_fts WHERE issues_fts MATCH ?)"
+        )
+        params.append(f.exclude_text)
+
+    if f.state:
+        where_clauses.append("i.state = ?")
+        params.append(f.state)
+    # Written against the sort keys so the same indexes serve them as ranges.
+    if f.created_after:
+        where_clauses.append(f"{_INDEX_SORTS['created']} >= ?")
+        params.append(f.created_after)
+    if f.updated_after:
+        where_clauses.append(f"{_INDEX_SORTS['updated']} >= ?")
+        params.append(f.updated_after)
+    for label in f.labels or []:
+        where_clauses.append("i.labels LIKE ? ESCAPE '\\'")
+        # Labels are stored as a JSON array; match the label's encoded form.
+        params.append(f"%{_escape_like(json.dumps(label))}%")
+    for signal in f.signals or []:
+        if signal not in BOOLEAN_FEATURE_COLUMNS:
+            raise ValueError(f"Unknown signal filter: {signal}")
+        where_clauses.append(f"f.{signal} = 1")
+
+    repo_clauses: list[str] = []
+    repo_params: list = []
+    if f.language:
+        repo_clauses.append("language = ? COLLATE NOCASE")
+        repo_params.append(f.language)
+    if f.min_stars:
+        repo_clauses.append("stars >= ?")
+        repo_params.append(f.min_stars)
+    if f.exclude_archived:
+        repo_clauses.append("archived = 0")
+    if f.repo:
+        repo_clauses.append("full_name = ?")
+        repo_params.append(f.repo)
+    if repo_clauses:
+        where_clauses.append(
+            f"{probe}i.repo_id IN (SELECT repo_id FROM repos WHERE "
+            + " AND ".join(repo_clauses) + ")"
+        )
+        params.extend(repo_params)
+
+    return " AND ".join(where_clauses) or "1", params
+
+
+async def count_search_matches(
+    query: str | None, filters: SearchFilters | None = None
+) -> int:
+    db = await get_read_db()
+    from_sql, _ = _search_from(query)
+    where, params = _search_where(query, filters)
+    cursor = await db.execute(f"SELECT COUNT(*) {from_sql} WHERE {where}", params)
     row = await cursor.fetchone()
-    total_count = row[0] if row else 0
+    return row[0] if row else 0
+
 
-    # Result query with reranking
-    if sort_by == "fixability":
-        order = "COALESCE(f.fixability_score, 0) DESC"
+def _search_sql(
+    query: str | None,
+    filters: SearchFilters | None = None,
+    sort_by: str = "fixability",
+    limit: int = 30,
+    offset: int = 0,
+    now: datetime | None = None,
+    after: tuple | None = None,
+    total_count: int = 0,
+) -> tuple[str, list]:
+    """SQL and params for one page of search_issues_fts()."""
+    score_sql, score_params = _effective_score_sql(now)
+
+    if sort_by in _INDEX_SORTS:
+        column = _INDEX_SORTS[sort_by]
+        match = "walk" if total_count >= _INDEX_WALK_MIN_MATCHES else "in"
+        where, params = _search_where(query, filters, match=match)
+        if after is not None:
+            where += f" AND ({column}, i.issue_id) < (?, ?)"
+            params.extend(after)
+        sql = f"""
+            SELECT {_RESULT_COLUMNS},
+                   {score_sql} AS effective_score
+            FROM issues i
+            JOIN repos r ON i.repo_id = r.repo_id
+            LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+            WHERE {where}
+            ORDER BY {column} DESC, i.issue_id DESC
+            LIMIT ? OFFSET ?
+        """
+        return sql, [*score_params, *params, limit, offset]
+
+    from_sql, bm25_sql = _search_from(query)
+    where, params = _search_where(query, filters)
+    if sort_by == "fixability" or not query:
+        order = "effective_score DESC"
     else:
-        order = """(
-            1.0 / (1.0 + ABS(bm25(issues_fts))) * 0.65
-            + COALESCE(f.fixability_score, 0) / 100.0 * 0.35
-        ) DESC"""
-
-    results_sql = f"""
-        SELECT i.issue_id, i.repo_id, i.number, i.title, i.body, i.state,
-               i.user_login, i.labels, i.comments_count, i.html_url,
-               i.created_at, i.updated_at, i.closed_at,
-               r.full_name AS repo_full_name, r.stars, r.open_issues_count,
-               r.language, r.pushed_at, r.archived,
-               COALESCE(f.fixability_score, 0) AS fixability_score,
-               COALESCE(f.grade, 'F') AS grade,
-               COALESCE(f.reasons, '[]') AS reasons,
-               COALESCE(f.features, '{{}}') AS features,
-               bm25(issues_fts) AS bm25_score
-        FROM issues_fts
-        JOIN issues i ON issues_fts.rowid = i.issue_id
-        JOIN repos r ON i.repo_id = r.repo_id
-        LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+        order = bm25_sql
+    sql = f"""
+        SELECT {_RESULT_COLUMNS},
+               {score_sql} AS effective_score,
+               {bm25_sql} AS bm25_score
+        {from_sql}
         WHERE {where}
         ORDER BY {order}
         LIMIT ? OFFSET ?
     """
-    params.extend([limit, offset])
-    cursor = await db.execute(results_sql, params)
-    rows = await cursor.fetchall()
-    return rows, total_count
+    return sql, [*score_params, *params, limit, offset]
+
+
+async def get_facet_counts(
+    query: str | None,
+    filters: SearchFilters | None = None,
+    labels_limit: int = 10,
+    now: datetime | None = None,
+    limit: int = 10000,
+) -> list[aiosqlite.Row]:
+    """Facet counts over at most ``limit`` matches, aggregated in one
+    statement.
+
+    Rows are ``(facet, value, count)``. The "score" facet counts matches per
+    effective score, for callers to bucket into grades; "labels" holds the
+    ``labels_limit`` most common labels, each counted once per issue. A
+    "matches" row counts up to ``limit + 1`` matches, so a count above
+    ``limit`` means the facets left some out.
+    """
+    db = await get_read_db()
+    score_sql, score_params = _effective_score_sql(now)
+    from_sql, _ = _search_from(query)
+    where, params = _search_where(query, filters)
+    cursor = await db.execute(
+        f"""WITH m AS MATERIALIZED (
+                SELECT i.issue_id, r.language, i.state, i.labels,
+                       {score_sql} AS effective_score
+                {from_sql}
+                WHERE {where}
+                LIMIT ?
+            ),
+            c AS MATERIALIZED (SELECT * FROM m LIMIT ?)
+            SELECT 'matches' AS facet, NULL AS value, COUNT(*) AS count FROM m
+            UNION ALL
+            SELECT 'language', language, COUNT(*) FROM c GROUP BY language
+            UNION ALL
+            SELECT 'state', state, COUNT(*) FROM c GROUP BY state
+            UNION ALL
+            SELECT 'score', effective_score, COUNT(*) FROM c GROUP BY effective_score
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'labels', l.value, COUNT(DISTINCT c.issue_id) AS n
+                  FROM c, json_each(NULLIF(c.labels, '')) AS l
+                 GROUP BY l.value
+                 ORDER BY n DESC, l.value
+                 LIMIT ?
+            )""",
+        [*score_params, *params, limit + 1, limit, labels_limit],
+    )
+    return await cursor.fetchall()
+
+
+async def search_issues_fts(
+    query: str | None,
+    filters: SearchFilters | None = None,
+    sort_by: str = "fixability",
+    limit: int = 30,
+    offset: int = 0,
+    now: datetime | None = None,
+    after: tuple | None = None,
+    total_count: int | None = None,
+) -> tuple[list[aiosqlite.Row], int]:
+    """Full-text search on issues with optional filters, ordered in SQL.
+
+    ``sort_by="fixability"`` orders by the effective fixability score, and
+    "created", "updated" and "comments" by that column, newest/most first.
+    Any other value orders by bm25 alone, or by fixability when ``query``
+    is None (a filter-only search). Blended relevance ranking goes
+    through search_candidates() and the reranker in services/ranking.py.
+
+    For the column sorts, ``after`` is a keyset cursor of
+    ``(sort_value, issue_id)`` from the last row of the previous page.
+    Pass ``total_count`` when it is already known to skip the COUNT query;
+    it only picks the query plan, so a lower bound will do.
+    """
+    db = await get_read_db()
+    if total_count is None:
+        total_count = await count_search_matches(query, filters)
+    sql, params = _search_sql(
+        query, filters, sort_by, limit, offset, now, after, total_count
+    )
+    cursor = await db.execute(sql, params)
+    return await cursor.fetchall(), total_count
+
+
+# Columns a search export may select, by field name. Keys are the public
+# field names; values are trusted SQL, never built from user input.
+EXPORT_COLUMNS = {
+    "issue_id": "i.issue_id",
+    "repo": "r.full_name",
+    "number": "i.number",
+    "title": "i.title",
+    "body": "i.body",
+    "state": "i.state",
+    "user": "i.user_login",
+    "labels": "i.labels",
+    "comments": "i.comments_count",
+    "html_url": "i.html_url",
+    "created_at": "i.created_at",
+    "updated_at": "i.updated_at",
+    "closed_at": "i.closed_at",
+    "stars": "r.stars",
+    "language": "r.language",
+    "archived": "r.archived",
+}
+
+
+async def iter_search_rows(
+    query: str | None,
+    filters: SearchFilters | None = None,
+    fields: list[str] | tuple[str, ...] = ("issue_id",),
+    sort_by: str = "issue_id",
+    chunk_size: int = 1000,
+    now: datetime | None = None,
+) -> AsyncIterator[list[aiosqlite.Row]]:
+    """Stream every match in chunks of ``chunk_size`` rows from one cursor.
+
+    Selects only ``fields`` (keys of EXPORT_COLUMNS) plus ``effective_score``.
+    ``sort_by`` is "issue_id" or one of the index sorts; both are answered
+    in index order, so rows flow without first sorting the whole match set.
+    The stream reads on a connection of its own, closed when it ends.
+    """
+    score_sql, score_params = _effective_score_sql(now)
+    columns = ", ".join(f"{EXPORT_COLUMNS[name]} AS {name}" for name in fields)
+    if sort_by in _INDEX_SORTS:
+        where, params = _search_where(query, filters, match="walk")
+        order = f"{_INDEX_SORTS[sort_by]} DESC, i.issue_id DESC"
+    else:
+        where, params = _search_where(query, filters, match="in")
+        order = "i.issue_id"
+    async with dedicated_read_db() as db:
+        cursor = await db.execute(
+            f"""SELECT {columns}, {score_sql} AS effective_score
+                FROM issues i
+                JOIN repos r ON i.repo_id = r.repo_id
+                LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+                WHERE {where}
+                ORDER BY {order}""",
+            [*score_params, *params],
+        )
+        try:
+            while rows := await cursor.fetchmany(chunk_size):
+                yield rows
+        finally:
+            await cursor.close()
+
+
+async def search_candidates(
+    query: str | None,
+    filters: SearchFilters | None = None,
+    limit: int = 500,
+    now: datetime | None = None,
+) -> list[aiosqlite.Row]:
+    """Retrieval stage: the top ``limit`` matches by bm25, with only the
+    columns the reranker needs (no bodies)."""
+    db = await get_read_db()
+    score_sql, score_params = _effective_score_sql(now)
+    from_sql, bm25_sql = _search_from(query)
+    where, params = _search_where(query, filters)
+    order = bm25_sql if query else "effective_score DESC"
+    cursor = await db.execute(
+        f"""SELECT i.issue_id, {bm25_sql} AS bm25_score,
+                   {score_sql} AS effective_score,
+                   r.stars, i.updated_at
+            {from_sql}
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT ?""",
+        [*score_params, *params, limit],
+    )
+    return await cursor.fetchall()
+
+
+async def get_search_rows(
+    issue_ids: list[int], now: datetime | None = None
+) -> list[aiosqlite.Row]:
+    """Full result rows for ``issue_ids``, returned in the given order."""
+    if not issue_ids:
+        return []
+    db = await get_read_db()
+    score_sql, score_params = _effective_score_sql(now)
+    placeholders = ", ".join("?" for _ in issue_ids)
+    cursor = await db.execute(
+        f"""SELECT {_RESULT_COLUMNS},
+                   {score_sql} AS effective_score
+            FROM issues i
+            JOIN repos r ON i.repo_id = r.repo_id
+            LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+            WHERE i.issue_id IN ({placeholders})""",
+        [*score_params, *issue_ids],
+    )
+    by_id = {row["issue_id"]: row for row in await cursor.fetchall()}
+    return [by_id[issue_id] for issue_id in issue_ids if issue_id in by_id]
+
+
+# Body fragments shown with results: an FTS5 snippet() of up to
+# SNIPPET_TOKENS tokens around the matched terms, wrapped in SNIPPET_MARKERS,
+# or the first BODY_PREVIEW_CHARS characters when there is no text query.
+# Either way the fragment is HTML: issue text is escaped, and snippet()
+# marks matches with private-use sentinels that become the markers only
+# after escaping, so the body can never inject markup of its own.
+SNIPPET_MARKERS = ("<mark>", "</mark>")
+_SNIPPET_SENTINELS = ("\ue000", "\ue001")
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 40
+BODY_PREVIEW_CHARS = 300
+
+
+async def get_body_snippets(query: str | None, issue_ids: list[int]) -> dict[int, str]:
+    """HTML body fragments for one page of results, keyed by issue_id.
+
+    Run after the page is chosen so snippet() is only evaluated for the rows
+    actually returned, and the full body never leaves SQLite. Rows the query
+    does not match (semantic search hits) get the escaped body preview.
+    """
+    if not issue_ids:
+        return {}
+    db = await get_read_db()
+    snippets: dict[int, str] = {}
+    if query:
+        placeholders = ", ".join("?" for _ in issue_ids)
+        cursor = await db.execute(
+            f"""SELECT rowid AS issue_id,
+                       snippet(issues_fts, 1, ?, ?, ?, ?) AS snippet
+                FROM issues_fts
+                WHERE issues_fts MATCH ? AND rowid IN ({placeholders})""",
+            [*_SNIPPET_SENTINELS, SNIPPET_ELLIPSIS, SNIPPET_TOKENS, query, *issue_ids],
+        )
+        snippets = {
+            row["issue_id"]: _mark_snippet(row["snippet"]) for row in await cursor.fetchall()
+        }
+    rest = [issue_id for issue_id in issue_ids if issue_id not in snippets]
+    if rest:
+        placeholders = ", ".join("?" for _ in rest)
+        cursor = await db.execute(
+            f"""SELECT issue_id, substr(body, 1, {BODY_PREVIEW_CHARS}) AS snippet
+                FROM issues
+                WHERE issue_id IN ({placeholders})""",
+            rest,
+        )
+        snippets.update(
+            (row["issue_id"], html.escape(row["snippet"] or ""))
+            for row in await cursor.fetchall()
+        )
+    return snippets
+
+
+def _mark_snippet(snippet: str | None) -> str:
+    """Escape a snippet() fragment and turn its sentinels into SNIPPET_MARKERS."""
+    text = html.escape(snippet or "")
+    for sentinel, marker in zip(_SNIPPET_SENTINELS, SNIPPET_MARKERS):
+        text = text.replace(sentinel, marker)
+    return text
 
 
 async def get_issue_by_repo_and_number(
-    owner: str, repo: str, number: int
+    owner: str, repo: str, number: int, now: datetime | None = None
 ) -> aiosqlite.Row | None:
     db = await get_db()
+    score_sql, score_params = _effective_score_sql(now)
     cursor = await db.execute(
-        """SELECT i.issue_id, i.repo_id, i.number, i.title, i.body, i.state,
+        f"""SELECT i.issue_id, i.repo_id, i.number, i.title, i.state,
+                  substr(i.body, 1, {BODY_PREVIEW_CHARS}) AS body_snippet,
                   i.user_login, i.labels, i.comments_count, i.html_url,
                   i.created_at, i.updated_at, i.closed_at,
                   r.full_name AS repo_full_name, r.stars, r.open_issues_count,
                   r.language, r.pushed_at, r.archived,
                   COALESCE(f.fixability_score, 0) AS fixability_score,
                   COALESCE(f.grade, 'F') AS grade,
-                  COALESCE(f.reasons, '[]') AS reasons,
-                  COALESCE(f.features, '{}') AS features
+                  COALESCE(f.reason_codes, '') AS reason_codes,
+                  {_FEATURE_SELECT},
+                  {score_sql} AS effective_score,
+                  COALESCE(s.comment_count, 0) AS synced_comment_count,
+                  COALESCE(s.commenter_count, 0) AS commenter_count,
+                  COALESCE(s.maintainer_replied, 0) AS comments_maintainer_replied,
+                  s.first_maintainer_response_at, s.last_comment_at
            FROM issues i
            JOIN repos r ON i.repo_id = r.repo_id
            LEFT JOIN issue_features f ON i.issue_id = f.issue_id
+           LEFT JOIN issue_comment_stats s ON i.issue_id = s.issue_id
            WHERE r.owner = ? AND r.name = ? AND i.number = ?""",
-        (owner, repo, number),
+        (*score_params, owner, repo, number),
     )
     return await cursor.fetchone()
 
 
-async def get_comments_for_issue(issue_id: int) -> list[aiosqlite.Row]:
+async def get_minhash_signatures(issue_ids: list[int]) -> dict[int, bytes]:
+    if not issue_ids:
+        return {}
+    db = await get_db()
+    placeholders = ", ".join("?" for _ in issue_ids)
+    cursor = await db.execute(
+        f"SELECT issue_id, signature FROM issue_minhash WHERE issue_id IN ({placeholders})",
+        issue_ids,
+    )
+    return {row["issue_id"]: row["signature"] for row in await cursor.fetchall()}
+
+
+async def get_lsh_candidates(
+    issue_id: int, state: str | None = None, limit: int = 200
+) -> list[aiosqlite.Row]:
+    """Issues sharing at least one LSH bucket with ``issue_id``, most shared
+    bands first, with their signatures and display columns."""
+    db = await get_db()
+    state_sql = "AND i.state = ?" if state else ""
+    cursor = await db.execute(
+        f"""SELECT other.issue_id, COUNT(*) AS shared_bands, m.signature,
+                   i.number, i.title, i.html_url, i.state, i.closed_at,
+                   r.full_name AS repo_full_name
+            FROM issue_lsh_bands mine
+            JOIN issue_lsh_bands other
+              ON other.band = mine.band AND other.bucket = mine.bucket
+            JOIN issue_minhash m ON m.issue_id = other.issue_id
+            JOIN issues i ON i.issue_id = other.issue_id
+            JOIN repos r ON r.repo_id = i.repo_id
+            WHERE mine.issue_id = ? AND other.issue_id != ? {state_sql}
+            GROUP BY other.issue_id
+            ORDER BY shared_bands DESC
+            LIMIT ?""",
+        [issue_id, issue_id, *([state] if state else []), limit],
+    )
+    return await cursor.fetchall()
+
+
+async def get_lsh_candidate_pairs(max_bucket_size: int = 100) -> list[aiosqlite.Row]:
+    """All issue pairs sharing an LSH bucket, skipping buckets with more than
+    ``max_bucket_size`` members (issue templates, boilerplate)."""
+    db = await get_db()
+    cursor = await db.execute(
+        """WITH buckets AS (
+               SELECT band, bucket FROM issue_lsh_bands
+               GROUP BY band, bucket
+               HAVING COUNT(*) BETWEEN 2 AND ?
+           )
+           SELECT DISTINCT a.issue_id AS a_id, b.issue_id AS b_id
+           FROM buckets k
+           JOIN issue_lsh_bands a ON a.band = k.band AND a.bucket = k.bucket
+           JOIN issue_lsh_bands b
+             ON b.band = k.band AND b.bucket = k.bucket AND b.issue_id > a.issue_id""",
+        (max_bucket_size,),
+    )
+    return await cursor.fetchall()
+
+
+async def get_issue_summaries(issue_ids: list[int]) -> dict[int, aiosqlite.Row]:
+    """Display columns for ``issue_ids``, keyed by issue_id."""
+    if not issue_ids:
+        return {}
+    db = await get_db()
+    placeholders = ", ".join("?" for _ in issue_ids)
+    cursor = await db.execute(
+        f"""SELECT i.issue_id, i.repo_id, i.number, i.title, i.html_url, i.state,
+                   r.full_name AS repo_full_name
+            FROM issues i JOIN repos r ON r.repo_id = i.repo_id
+            WHERE i.issue_id IN ({placeholders})""",
+        issue_ids,
+    )
+    return {row["issue_id"]: row for row in await cursor.fetchall()}
+
+
+async def filter_issue_ids(
+    issue_ids: list[int], filters: SearchFilters | None = None
+) -> list[int]:
+    """The subset of ``issue_ids`` passing ``filters``, in the given order."""
+    if not issue_ids:
+        return []
+    db = await get_read_db()
+    where, params = _search_where(None, filters)
+    placeholders = ", ".join("?" for _ in issue_ids)
+    cursor = await db.execute(
+        f"""SELECT i.issue_id {_ISSUES_FROM}
+            WHERE i.issue_id IN ({placeholders}) AND {where}""",
+        [*issue_ids, *params],
+    )
+    keep = {row["issue_id"] for row in await cursor.fetchall()}
+    return [issue_id for issue_id in issue_ids if issue_id in keep]
+
+
+async def get_unembedded_issues(
+    after_issue_id: int = 0, limit: int = 500
+) -> list[aiosqlite.Row]:
+    """Issues with no embedding, or updated since it was computed, in
+    issue_id order after ``after_issue_id``. ``slot`` is the existing slot,
+    if any, so re-embedded issues overwrite their old vector."""
     db = await get_db()
     cursor = await db.execute(
-        """SELECT comment_id, issue_id, body, user_login, author_association,
+        """SELECT i.issue_id, i.title, i.body, e.slot
+           FROM issues i
+           LEFT JOIN issue_embeddings e ON i.issue_id = e.issue_id
+           WHERE i.issue_id > ?
+             AND (e.issue_id IS NULL OR i.updated_at > e.embedded_at)
+           ORDER BY i.issue_id
+           LIMIT ?""",
+        (after_issue_id, limit),
+    )
+    return await cursor.fetchall()
+
+
+async def upsert_embeddings_many(entries: list[tuple[int, int, int]]) -> None:
+    """Record ``(issue_id, slot, list_id)`` for vectors already written to
+    the vector file."""
+    if not entries:
+        return
+    embedded_at = datetime.now(timezone.utc).isoformat()
+    async with write_transaction() as db:
+        await db.executemany(
+            """INSERT OR REPLACE INTO issue_embeddings (issue_id, slot, list_id, embedded_at)
+               VALUES (?, ?, ?, ?)""",
+            [(issue_id, slot, list_id, embedded_at) for issue_id, slot, list_id in entries],
+        )
+    bump_generation([])
+
+
+async def update_embedding_lists(assignments: list[tuple[int, int]]) -> None:
+    """Move each ``(list_id, slot)`` to a new IVF list after retraining."""
+    async with write_transaction() as db:
+        await db.executemany(
+            "UPDATE issue_embeddings SET list_id = ? WHERE slot = ?", assignments
+        )
+    bump_generation([])
+
+
+async def clear_embeddings() -> None:
+    async with write_transaction() as db:
+        await db.execute("DELETE FROM issue_embeddings")
+    bump_generation([])
+
+
+async def get_embedding_stats() -> tuple[int, int]:
+    """(number of embeddings, highest slot in use or -1)."""
+    db = await get_db()
+    cursor = await db.execute("SELECT COUNT(*), COALESCE(MAX(slot), -1) FROM issue_embeddings")
+    row = await cursor.fetchone()
+    return row[0], row[1]
+
+
+async def get_embedding_slots(list_ids: list[int] | None = None) -> list[aiosqlite.Row]:
+    """``(slot, issue_id)`` for every embedding, or for those in ``list_ids``,
+    in slot order."""
+    db = await get_read_db()
+    if list_ids is None:
+        cursor = await db.execute(
+            "SELECT slot, issue_id FROM issue_embeddings ORDER BY slot"
+        )
+    else:
+        placeholders = ", ".join("?" for _ in list_ids)
+        cursor = await db.execute(
+            f"""SELECT slot, issue_id FROM issue_embeddings
+                WHERE list_id IN ({placeholders}) ORDER BY slot""",
+            list_ids,
+        )
+    return await cursor.fetchall()
+
+
+async def get_vocab_terms(min_docs: int = 2, limit: int = 50000) -> list[aiosqlite.Row]:
+    """The ``limit`` most widespread issues_fts terms, with their document
+    counts."""
+    db = await get_read_db()
+    cursor = await db.execute(
+        """SELECT term, doc FROM issues_fts_vocab
+           WHERE doc >= ?
+           ORDER BY doc DESC
+           LIMIT ?""",
+        (min_docs, limit),
+    )
+    return await cursor.fetchall()
+
+
+async def get_label_counts() -> list[aiosqlite.Row]:
+    """Every label in use, with the number of issues carrying it."""
+    db = await get_read_db()
+    cursor = await db.execute(
+        """SELECT l.value AS label, COUNT(*) AS issues
+           FROM issues i, json_each(i.labels) l
+           WHERE i.labels IS NOT NULL AND i.labels != ''
+           GROUP BY l.value"""
+    )
+    return await cursor.fetchall()
+
+
+async def get_comments_for_issue(
+    issue_id: int, limit: int = -1, body_chars: int | None = None
+) -> list[aiosqlite.Row]:
+    """Comments on ``issue_id``, oldest first: at most ``limit`` of them
+    (-1 for all), with bodies cut to ``body_chars`` when given."""
+    db = await get_db()
+    body = "body" if body_chars is None else f"substr(body, 1, {int(body_chars)}) AS body"
+    cursor = await db.execute(
+        f"""SELECT comment_id, issue_id, {body}, user_login, author_association,
                   created_at, updated_at
-           FROM comments WHERE issue_id = ? ORDER BY created_at""",
-        (issue_id,),
+           FROM comments WHERE issue_id = ? ORDER BY created_at LIMIT ?""",
+        (issue_id, limit),
     )
     return await cursor.fetchall()
 
@@ -257,3 +1101,117 @@ async def get_all_repos() -> list[aiosqlite.Row]:
     db = await get_db()
     cursor = await db.execute("SELECT * FROM repos")
     return await cursor.fetchall()
+
+
+async def create_saved_search(name: str, request: str, min_score: float | None) -> int:
+    async with write_transaction() as db:
+        cursor = await db.execute(
+            """INSERT INTO saved_searches (name, request, min_score, created_at)
+               VALUES (?, ?, ?, ?)""",
+            (name, request, min_score, datetime.now(timezone.utc).isoformat()),
+        )
+    return cursor.lastrowid
+
+
+async def get_saved_searches() -> list[aiosqlite.Row]:
+    db = await get_db()
+    cursor = await db.execute("SELECT * FROM saved_searches ORDER BY search_id")
+    return await cursor.fetchall()
+
+
+async def get_saved_search(search_id: int) -> aiosqlite.Row | None:
+    db = await get_db()
+    cursor = await db.execute("SELECT * FROM saved_searches WHERE search_id = ?", (search_id,))
+    return await cursor.fetchone()
+
+
+async def delete_saved_search(search_id: int) -> bool:
+    """Delete a saved search and its matches. False if there was none."""
+    async with write_transaction() as db:
+        await db.execute("DELETE FROM saved_search_matches WHERE search_id = ?", (search_id,))
+        cursor = await db.execute("DELETE FROM saved_searches WHERE search_id = ?", (search_id,))
+    return cursor.rowcount > 0
+
+
+async def match_issue_ids(
+    issue_ids: list[int],
+    query: str | None,
+    filters: SearchFilters | None = None,
+    min_score: float | None = None,
+    now: datetime | None = None,
+) -> list[int]:
+    """The subset of ``issue_ids`` a search matches, in issue_id order.
+
+    Every MATCH is bounded to the given rowids, so FTS5 seeks to those rows
+    in each term's doclist: the cost follows ``len(issue_ids)``, not how
+    common the terms are.
+    """
+    if not issue_ids:
+        return []
+    db = await get_db()
+    f = filters or SearchFilters()
+    placeholders = ", ".join("?" for _ in issue_ids)
+    fts = f"SELECT rowid FROM issues_fts WHERE issues_fts MATCH ? AND rowid IN ({placeholders})"
+    where, params = _search_where(None, replace(f, exclude_text=None))
+    clauses = [f"i.issue_id IN ({placeholders})", where]
+    params = [*issue_ids, *params]
+    if query:
+        clauses.append(f"i.issue_id IN ({fts})")
+        params += [query, *issue_ids]
+    if f.exclude_text:
+        clauses.append(f"i.issue_id NOT IN ({fts})")
+        params += [f.exclude_text, *issue_ids]
+    if min_score is not None:
+        score_sql, score_params = _effective_score_sql(now)
+        clauses.append(f"{score_sql} >= ?")
+        params += [*score_params, min_score]
+    cursor = await db.execute(
+        f"""SELECT i.issue_id {_ISSUES_FROM}
+            WHERE {" AND ".join(clauses)} ORDER BY i.issue_id""",
+        params,
+    )
+    return [row["issue_id"] for row in await cursor.fetchall()]
+
+
+async def insert_saved_search_matches(matches: list[tuple[int, int]]) -> int:
+    """Append ``(search_id, issue_id)`` pairs to the outbox, skipping pairs
+    already reported. Returns count added."""
+    if not matches:
+        return 0
+    matched_at = datetime.now(timezone.utc).isoformat()
+    async with write_transaction() as db:
+        before = db.total_changes
+        await db.executemany(
+            """INSERT OR IGNORE INTO saved_search_matches (search_id, issue_id, matched_at)
+               VALUES (?, ?, ?)""",
+            [(search_id, issue_id, matched_at) for search_id, issue_id in matches],
+        )
+        added = db.total_changes - before
+    # No bump_generation(): the outbox is read directly and never shown in
+    # cached search or detail results.
+    return added
+
+
+async def get_saved_search_matches(
+    after_match_id: int = 0, limit: int = 100, search_id: int | None = None
+) -> list[aiosqlite.Row]:
+    """Outbox rows after ``after_match_id``, oldest first."""
+    db = await get_db()
+    where = "m.match_id > ?"
+    params: list = [after_match_id]
+    if search_id is not None:
+        where += " AND m.search_id = ?"
+        params.append(search_id)
+    cursor = await db.execute(
+        f"""SELECT m.match_id, m.search_id, m.matched_at,
+                   i.number, i.title, i.html_url, i.state,
+                   r.full_name AS repo_full_name
+            FROM saved_search_matches m
+            JOIN issues i ON i.issue_id = m.issue_id
+            JOIN repos r ON r.repo_id = i.repo_id
+            WHERE {where}
+            ORDER BY m.match_id
+            LIMIT ?""",
+        (*params, limit),
+    )
+    return await cursor.fetchall()
@@ -40,13 +40,83 @@ CREATE TABLE IF NOT EXISTS comments (
     updated_at TEXT
 );
 
+-- fixability_score is time-independent: the staleness penalty is derived
+-- from issues.created_at at query time. The *_rules_version columns record
+-- which text_analysis.RULES_VERSION / feature_service.SCORE_RULES_VERSION
+-- produced the row, so rule changes can be rescored incrementally.
+-- reason_codes is a comma-separated list of feature_service.REASON_RULES keys.
 CREATE TABLE IF NOT EXISTS issue_features (
     issue_id INTEGER PRIMARY KEY REFERENCES issues(issue_id),
     fixability_score REAL NOT NULL DEFAULT 0,
     grade TEXT NOT NULL DEFAULT 'F',
-    reasons TEXT NOT NULL DEFAULT '[]',
-    features TEXT NOT NULL DEFAULT '{}',
-    computed_at TEXT
+    reason_codes TEXT NOT NULL DEFAULT '',
+    has_steps_to_reproduce INTEGER NOT NULL DEFAULT 0,
+    has_expected_vs_actual INTEGER NOT NULL DEFAULT 0,
+    has_stack_trace INTEGER NOT NULL DEFAULT 0,
+    has_code_block INTEGER NOT NULL DEFAULT 0,
+    maintainer_replied INTEGER NOT NULL DEFAULT 0,
+    env_detail_count INTEGER NOT NULL DEFAULT 0,
+    computed_at TEXT,
+    text_rules_version INTEGER NOT NULL DEFAULT 0,
+    score_rules_version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Per-issue comment aggregates, kept current by the comments_stats_* triggers
+-- so scoring and issue detail read one row instead of scanning comments.
+CREATE TABLE IF NOT EXISTS issue_comment_stats (
+    issue_id INTEGER PRIMARY KEY REFERENCES issues(issue_id),
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    commenter_count INTEGER NOT NULL DEFAULT 0,
+    maintainer_replied INTEGER NOT NULL DEFAULT 0,
+    first_maintainer_response_at TEXT,
+    last_comment_at TEXT
+);
+
+-- MinHash signatures (utils/minhash.py) and their LSH band buckets, written
+-- during scoring. Issues sharing a (band, bucket) are near-duplicate
+-- candidates; signature is NUM_PERM unsigned 64-bit ints.
+CREATE TABLE IF NOT EXISTS issue_minhash (
+    issue_id INTEGER PRIMARY KEY REFERENCES issues(issue_id),
+    signature BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS issue_lsh_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    issue_id INTEGER NOT NULL REFERENCES issues(issue_id),
+    PRIMARY KEY (band, bucket, issue_id)
+) WITHOUT ROWID;
+
+-- Where each issue's embedding lives in the semantic index's vector file
+-- (services/semantic_index.py): row ``slot`` of the matrix, in IVF list
+-- ``list_id`` (-1 until the index is trained).
+CREATE TABLE IF NOT EXISTS issue_embeddings (
+    issue_id INTEGER PRIMARY KEY REFERENCES issues(issue_id),
+    slot INTEGER NOT NULL UNIQUE,
+    list_id INTEGER NOT NULL DEFAULT -1,
+    embedded_at TEXT NOT NULL
+);
+
+-- Saved searches (services/percolator.py). request is a SearchRequest as
+-- JSON; only its query and filters are used. min_score, when set, is a floor
+-- on the effective fixability score.
+CREATE TABLE IF NOT EXISTS saved_searches (
+    search_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    request TEXT NOT NULL,
+    min_score REAL,
+    created_at TEXT NOT NULL
+);
+
+-- Outbox of saved-search matches, appended to as new and changed issues are
+-- scored. Consumers read it in match_id order from their last match_id. An
+-- issue is reported at most once per saved search.
+CREATE TABLE IF NOT EXISTS saved_search_matches (
+    match_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    search_id INTEGER NOT NULL REFERENCES saved_searches(search_id),
+    issue_id INTEGER NOT NULL REFERENCES issues(issue_id),
+    matched_at TEXT NOT NULL,
+    UNIQUE(search_id, issue_id)
 );
 
 -- FTS5 virtual table for full-text search on issues
@@ -57,6 +127,10 @@ CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
     content_rowid='issue_id'
 );
 
+-- Read-only view of the issues_fts term dictionary (term, doc, cnt), used
+-- for query autocompletion
+CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts_vocab USING fts5vocab(issues_fts, 'row');
+
 -- Triggers to keep FTS in sync with issues table
 CREATE TRIGGER IF NOT EXISTS issues_ai AFTER INSERT ON issues BEGIN
     INSERT INTO issues_fts(rowid, title, body) VALUES (new.issue_id, new.title, new.body);
@@ -71,9 +145,88 @@ CREATE TRIGGER IF NOT EXISTS issues_au AFTER UPDATE ON issues BEGIN
     INSERT INTO issues_fts(rowid, title, body) VALUES (new.issue_id, new.title, new.body);
 END;
 
+-- Triggers to keep issue_comment_stats in sync with comments. Inserts are
+-- folded in incrementally; the rarer updates and deletes recompute the
+-- aggregate for the affected issue.
+CREATE TRIGGER IF NOT EXISTS comments_stats_ai AFTER INSERT ON comments BEGIN
+    INSERT INTO issue_comment_stats (issue_id, comment_count, commenter_count, maintainer_replied,
+                                     first_maintainer_response_at, last_comment_at)
+    VALUES (
+        new.issue_id, 1, 1,
+        new.author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR'),
+        CASE WHEN new.author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR') THEN new.created_at END,
+        new.created_at
+    )
+    ON CONFLICT(issue_id) DO UPDATE SET
+        comment_count = comment_count + 1,
+        commenter_count = commenter_count + NOT EXISTS (
+            SELECT 1 FROM comments
+            WHERE issue_id = new.issue_id AND user_login = new.user_login
+              AND comment_id != new.comment_id
+        ),
+        maintainer_replied = MAX(maintainer_replied, excluded.maintainer_replied),
+        first_maintainer_response_at = CASE
+            WHEN excluded.first_maintainer_response_at IS NULL THEN first_maintainer_response_at
+            WHEN first_maintainer_response_at IS NULL THEN excluded.first_maintainer_response_at
+            ELSE MIN(first_maintainer_response_at, excluded.first_maintainer_response_at)
+        END,
+        last_comment_at = CASE
+            WHEN excluded.last_comment_at IS NULL THEN last_comment_at
+            WHEN last_comment_at IS NULL THEN excluded.last_comment_at
+            ELSE MAX(last_comment_at, excluded.last_comment_at)
+        END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_stats_au AFTER UPDATE ON comments
+WHEN old.issue_id != new.issue_id
+  OR old.user_login IS NOT new.user_login
+  OR old.author_association IS NOT new.author_association
+  OR old.created_at IS NOT new.created_at
+BEGIN
+    INSERT OR REPLACE INTO issue_comment_stats
+    SELECT issue_id, COUNT(*), COUNT(DISTINCT user_login),
+           MAX(author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')),
+           MIN(CASE WHEN author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR') THEN created_at END),
+           MAX(created_at)
+    FROM comments WHERE issue_id IN (old.issue_id, new.issue_id) GROUP BY issue_id;
+    DELETE FROM issue_comment_stats
+    WHERE issue_id = old.issue_id
+      AND NOT EXISTS (SELECT 1 FROM comments WHERE issue_id = old.issue_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_stats_ad AFTER DELETE ON comments BEGIN
+    INSERT OR REPLACE INTO issue_comment_stats
+    SELECT issue_id, COUNT(*), COUNT(DISTINCT user_login),
+           MAX(author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')),
+           MIN(CASE WHEN author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR') THEN created_at END),
+           MAX(created_at)
+    FROM comments WHERE issue_id = old.issue_id GROUP BY issue_id;
+    DELETE FROM issue_comment_stats
+    WHERE issue_id = old.issue_id
+      AND NOT EXISTS (SELECT 1 FROM comments WHERE issue_id = old.issue_id);
+END;
+
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_issues_repo_id ON issues(repo_id);
 CREATE INDEX IF NOT EXISTS idx_issues_state ON issues(state);
 CREATE INDEX IF NOT EXISTS idx_issues_updated_at ON issues(updated_at);
+-- Ordered indexes for the created/updated/comments search sorts, with and
+-- without a state filter. Timestamps are indexed on the NULL-safe sort key
+-- used by queries._INDEX_SORTS, which replaced the plain-column versions.
+DROP INDEX IF EXISTS idx_issues_created_at;
+DROP INDEX IF EXISTS idx_issues_state_created;
+DROP INDEX IF EXISTS idx_issues_state_updated;
+CREATE INDEX IF NOT EXISTS idx_issues_created_key ON issues(COALESCE(created_at, ''));
+CREATE INDEX IF NOT EXISTS idx_issues_updated_key ON issues(COALESCE(updated_at, ''));
+CREATE INDEX IF NOT EXISTS idx_issues_comments ON issues(comments_count);
+CREATE INDEX IF NOT EXISTS idx_issues_state_created_key ON issues(state, COALESCE(created_at, ''));
+CREATE INDEX IF NOT EXISTS idx_issues_state_updated_key ON issues(state, COALESCE(updated_at, ''));
+CREATE INDEX IF NOT EXISTS idx_issues_state_comments ON issues(state, comments_count);
+CREATE INDEX IF NOT EXISTS idx_repos_language_stars ON repos(language COLLATE NOCASE, stars, archived);
+CREATE INDEX IF NOT EXISTS idx_lsh_bands_issue ON issue_lsh_bands(issue_id);
+CREATE INDEX IF NOT EXISTS idx_issue_embeddings_list ON issue_embeddings(list_id, slot);
 CREATE INDEX IF NOT EXISTS idx_comments_issue_id ON comments(issue_id);
+CREATE INDEX IF NOT EXISTS idx_comments_issue_user ON comments(issue_id, user_login);
+CREATE INDEX IF NOT EXISTS idx_comments_issue_created ON comments(issue_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_issue_features_score ON issue_features(fixability_score DESC);
+CREATE INDEX IF NOT EXISTS idx_issue_features_score_rules ON issue_features(score_rules_version);
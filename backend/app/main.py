@@ -4,20 +4,33 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db.connection import init_db, close_db
-from app.routers import search, issue_detail, rate_limit, jobs
+from app.routers import (
+    search, suggest, issue_detail, rate_limit, jobs, metrics, saved_searches, webhooks,
+)
+from app.services import suggest_service
 from app.services.github_client import github_client
+from app.services.webhook_service import write_queue
+from app.utils.admission import AdmissionControlMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    # Built in the background so startup does not wait on the vocabulary scan.
+    suggest_build = suggest_service.schedule_rebuild()
     yield
+    if suggest_build is not None:
+        suggest_build.cancel()
+    await write_queue.close()
     await close_db()
     await github_client.close()
 
 
 app = FastAPI(title="GitHub Fixability Search", lifespan=lifespan)
 
+# Sheds load before routing; added first so CORSMiddleware wraps it and its
+# 503s still carry CORS headers.
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -27,6 +40,10 @@ app.add_middleware(
 )
 
 app.include_router(search.router, prefix="/api")
+app.include_router(suggest.router, prefix="/api")
 app.include_router(issue_detail.router, prefix="/api")
+app.include_router(saved_searches.router, prefix="/api")
 app.include_router(rate_limit.router, prefix="/api")
 app.include_router(jobs.router, prefix="/api")
+app.include_router(webhooks.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
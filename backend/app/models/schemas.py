@@ -1,16 +1,47 @@
 from __future__ import annotations
 
+from datetime import datetime
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
+# Boolean issue_features columns that can be used as search filters.
+Signal = Literal[
+    "has_steps_to_reproduce",
+    "has_expected_vs_actual",
+    "has_stack_trace",
+    "has_code_block",
+    "maintainer_replied",
+]
+
 
 class SearchRequest(BaseModel):
     query: str
     language: str | None = None
     state: str | None = None  # "open" | "closed"
     labels: list[str] | None = None
-    sort_by: str = "fixability"  # "fixability" | "created" | "updated" | "comments"
+    signals: list[Signal] | None = None  # all must be present
+    created_after: datetime | None = None
+    updated_after: datetime | None = None
+    min_stars: int | None = Field(default=None, ge=0)
+    exclude_archived: bool = False
+    repo: str | None = None  # "owner/name"
+    sort_by: str = "fixability"  # "fixability" | "relevance" | "created" | "updated" | "comments"
+    # "semantic" ranks by embedding similarity and "hybrid" fuses that with
+    # the relevance ranking; both ignore sort_by and cursor, and fall back to
+    # keyword search when semantic search is not enabled
+    mode: Literal["keyword", "semantic", "hybrid"] = "keyword"
     page: int = 1
     per_page: int = 30
+    # Keyset cursor from a previous SearchResponse.next_cursor; replaces
+    # page for the created/updated/comments sorts
+    cursor: str | None = None
+    # Per-request overrides of the relevance rerank weights in settings
+    text_weight: float | None = Field(default=None, ge=0)
+    fixability_weight: float | None = Field(default=None, ge=0)
+    star_weight: float | None = Field(default=None, ge=0)
+    recency_weight: float | None = Field(default=None, ge=0)
+    facets: bool = False
     enrich_top_n: int | None = None
 
 
@@ -46,6 +77,7 @@ class IssueResult(BaseModel):
     comments: int = 0
     labels: list[str] = Field(default_factory=list)
     user: str = ""
+    # An HTML fragment: escaped issue text, with search matches in <mark>
     body_snippet: str = ""
     repo_full_name: str = ""
 
@@ -62,16 +94,105 @@ class RateLimitInfo(BaseModel):
     reset_at: str | None = None
 
 
+class FacetCount(BaseModel):
+    value: str | None
+    count: int
+
+
+class SearchFacets(BaseModel):
+    language: list[FacetCount] = Field(default_factory=list)
+    state: list[FacetCount] = Field(default_factory=list)
+    grade: list[FacetCount] = Field(default_factory=list)
+    labels: list[FacetCount] = Field(default_factory=list)
+    # Counts cover only the first search_facet_cap matches, or are left empty
+    # when facets ran out of time (see SearchResponse.timed_out)
+    truncated: bool = False
+
+
 class SearchResponse(BaseModel):
     total_count: int = 0
     items: list[ScoredIssue] = Field(default_factory=list)
+    next_cursor: str | None = None
+    facets: SearchFacets | None = None
+    # Set when misspelled terms were expanded to find these results: the
+    # query with each one replaced by its best correction
+    did_you_mean: str | None = None
+    # The search ran out of time: total_count is then a lower bound, facets
+    # may be missing, and items are empty if even the first page timed out
+    timed_out: bool = False
     rate_limit: RateLimitInfo = Field(default_factory=RateLimitInfo)
 
 
+class SearchBatchRequest(BaseModel):
+    requests: list[SearchRequest]
+
+
+class SearchBatchResult(BaseModel):
+    # Exactly one of response / error is set
+    response: SearchResponse | None = None
+    error: str | None = None
+
+
+class SearchBatchResponse(BaseModel):
+    results: list[SearchBatchResult] = Field(default_factory=list)
+
+
+class Suggestion(BaseModel):
+    value: str
+    # Matching issues for terms and labels, stars for repos
+    count: int = 0
+
+
+class SuggestResponse(BaseModel):
+    terms: list[Suggestion] = Field(default_factory=list)
+    repos: list[Suggestion] = Field(default_factory=list)
+    labels: list[Suggestion] = Field(default_factory=list)
+
+
+class SavedSearchCreate(BaseModel):
+    name: str = Field(min_length=1)
+    # Only the query and filters apply; sorting and paging are ignored
+    request: SearchRequest
+    min_score: float | None = Field(default=None, ge=0)
+
+
+class SavedSearch(SavedSearchCreate):
+    search_id: int
+    created_at: str
+
+
+class SavedSearchMatch(BaseModel):
+    match_id: int
+    search_id: int
+    matched_at: str
+    repo_full_name: str
+    number: int
+    title: str
+    html_url: str
+    state: str
+
+
+class SavedSearchMatches(BaseModel):
+    matches: list[SavedSearchMatch] = Field(default_factory=list)
+    # Pass as ``after`` to read on from the last match returned
+    last_match_id: int = 0
+
+
+class CommentStats(BaseModel):
+    comment_count: int = 0
+    commenter_count: int = 0
+    maintainer_replied: bool = False
+    first_maintainer_response_at: str | None = None
+    maintainer_response_hours: float | None = None
+    last_comment_at: str | None = None
+
+
 class IssueDetailResponse(BaseModel):
     issue: IssueResult
     repo_summary: RepoSummary | None = None
     fixability: FixabilityResult = Field(default_factory=FixabilityResult)
+    reasons: list[str] = Field(default_factory=list)
+    comment_stats: CommentStats = Field(default_factory=CommentStats)
     linked_prs: list[dict] = Field(default_factory=list)
     similar_closed: list[dict] = Field(default_factory=list)
     timeline_events: list[dict] = Field(default_factory=list)
@@ -82,5 +203,6 @@ class JobStatus(BaseModel):
     status: str
     started_at: str | None = None
     completed_at: str | None = None
+    progress: dict | None = None
     result: dict | None = None
     error: str | None = None
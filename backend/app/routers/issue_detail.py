@@ -1,35 +1,64 @@
 from __future__ import annotations
 
+import html
 import json
+from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
+from cachetools import LRUCache
+from fastapi import APIRouter, HTTPException, Request, Response
 
+from app.config import settings
 from app.db import queries
+from app.db.connection import get_generation
 from app.models.schemas import (
+    CommentStats,
     FixabilityBreakdown,
     FixabilityResult,
     IssueDetailResponse,
     IssueResult,
     RepoSummary,
 )
+from app.services.cache import detail_cache, similar_cache
+from app.services.dedupe_service import similar_closed
+from app.services.feature_service import (
+    expand_reasons,
+    features_from_row,
+    grade_for_score,
+    staleness_codes,
+)
 from app.services.score_engine import compute_fixability_from_db
+from app.utils import http_cache
+from app.utils.fast_json import FastJSONResponse
 
 router = APIRouter()
 
+_TIMELINE_EVENTS = 20
+_COMMENT_PREVIEW_CHARS = 200
 
-@router.get("/issue/{owner}/{repo}/{number}", response_model=IssueDetailResponse)
-async def issue_detail(owner: str, repo: str, number: int) -> IssueDetailResponse:
-    row = await queries.get_issue_by_repo_and_number(owner, repo, number)
-    if row is None:
-        raise HTTPException(status_code=404, detail="Issue not found")
+# issue_id behind each path served, so a cached detail is found without a query
+_issue_ids: LRUCache = LRUCache(maxsize=settings.detail_cache_size)
+
+
+def _hours_between(start: str | None, end: str | None) -> float | None:
+    if not start or not end:
+        return None
+    try:
+        delta = datetime.fromisoformat(end.replace("Z", "+00:00")) - datetime.fromisoformat(
+            start.replace("Z", "+00:00")
+        )
+    except ValueError:
+        return None
+    return round(delta.total_seconds() / 3600, 2)
 
+
+async def _detail_payload(row) -> dict:
+    """IssueDetailResponse-shaped payload for an issue row."""
     labels = json.loads(row["labels"]) if row["labels"] else []
-    features = json.loads(row["features"]) if row["features"] else {}
-    body = row["body"] or ""
+    features = features_from_row(row)
 
     fix = compute_fixability_from_db(
-        fixability_score=row["fixability_score"],
-        grade=row["grade"],
+        fixability_score=row["effective_score"],
+        grade=grade_for_score(row["effective_score"]),
         features=features,
     )
 
@@ -43,7 +72,7 @@ async def issue_detail(owner: str, repo: str, number: int) -> IssueDetailRespons
         comments=row["comments_count"],
         labels=labels,
         user=row["user_login"],
-        body_snippet=body[:300],
+        body_snippet=html.escape(row["body_snippet"] or ""),
         repo_full_name=row["repo_full_name"],
     )
 
@@ -56,14 +85,31 @@ async def issue_detail(owner: str, repo: str, number: int) -> IssueDetailRespons
         archived=bool(row["archived"]),
     )
 
-    # Fetch comments for timeline events
-    comments = await queries.get_comments_for_issue(row["issue_id"])
+    comment_stats = CommentStats(
+        comment_count=row["synced_comment_count"],
+        commenter_count=row["commenter_count"],
+        # From the trigger-maintained comment stats, like the fields around
+        # it; row["maintainer_replied"] is as of the last scoring run.
+        maintainer_replied=bool(row["comments_maintainer_replied"]),
+        first_maintainer_response_at=row["first_maintainer_response_at"],
+        maintainer_response_hours=_hours_between(
+            row["created_at"], row["first_maintainer_response_at"]
+        ),
+        last_comment_at=row["last_comment_at"],
+    )
+
+    # Fetch comments for timeline events, skipping the query when there are none
+    comments = []
+    if comment_stats.comment_count:
+        comments = await queries.get_comments_for_issue(
+            row["issue_id"], limit=_TIMELINE_EVENTS, body_chars=_COMMENT_PREVIEW_CHARS
+        )
     timeline_events = [
         {
             "event": "commented",
             "user": c["user_login"],
             "author_association": c["author_association"],
-            "body": (c["body"] or "")[:200],
+            "body": c["body"] or "",
             "created_at": c["created_at"],
         }
         for c in comments
@@ -78,7 +124,55 @@ async def issue_detail(owner: str, repo: str, number: int) -> IssueDetailRespons
             breakdown=FixabilityBreakdown(**fix["breakdown"]),
             enriched=fix["enriched"],
         ),
+        reasons=expand_reasons(
+            [code for code in row["reason_codes"].split(",") if code]
+            + staleness_codes(row["created_at"])
+        ),
+        comment_stats=comment_stats,
         linked_prs=[],
-        similar_closed=[],
-        timeline_events=timeline_events[:20],
-    )
+        timeline_events=timeline_events,
+    ).model_dump(mode="json")
+
+
+async def _load_detail(owner: str, repo: str, number: int) -> dict | None:
+    row = await queries.get_issue_by_repo_and_number(owner, repo, number)
+    return None if row is None else await _detail_payload(row)
+
+
+async def _cached_detail(owner: str, repo: str, number: int) -> dict | None:
+    path = (owner, repo, number)
+    issue_id = _issue_ids.get(path)
+    if issue_id is not None:
+        payload = await detail_cache.get_or_compute(
+            issue_id, lambda: _load_detail(owner, repo, number)
+        )
+    else:
+        # First request for this path: the issue_id, and so the change
+        # sequence to cache under, is only known once the row is read.
+        generation = get_generation()
+        row = await queries.get_issue_by_repo_and_number(owner, repo, number)
+        if row is None:
+            return None
+        issue_id = _issue_ids[path] = row["issue_id"]
+        seq = detail_cache.version(issue_id)
+        payload = await _detail_payload(row)
+        if get_generation() == generation:  # nothing written since the row was read
+            detail_cache.set(issue_id, payload, seq)
+    if payload is None:
+        return None
+    # Near-duplicates change whenever any issue does, so they are cached
+    # apart from the payload rather than invalidating it.
+    similar = await similar_cache.get_or_compute(issue_id, lambda: similar_closed(issue_id))
+    return {**payload, "similar_closed": similar}
+
+
+# Returns the payload through FastJSONResponse; response_model documents it.
+@router.get("/issue/{owner}/{repo}/{number}", response_model=IssueDetailResponse)
+async def issue_detail(owner: str, repo: str, number: int, request: Request) -> Response:
+    tag = http_cache.etag(f"issue:{owner}/{repo}/{number}")
+    if http_cache.matches(request, tag):
+        return http_cache.not_modified(tag, settings.cache_control_issue)
+    payload = await _cached_detail(owner, repo, number)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    return FastJSONResponse(payload, headers=http_cache.headers(tag, settings.cache_control_issue))
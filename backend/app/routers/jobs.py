@@ -1,81 +1,153 @@
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, BackgroundTasks
 from pydantic import BaseModel
 
+from app.db import queries
+
 router = APIRouter()
 
 _job_status: dict[str, dict] = {}
+_cancel_events: dict[str, asyncio.Event] = {}
 
 
 class JobStatus(BaseModel):
     name: str
-    status: str  # "running", "completed", "failed"
+    status: str  # "running", "completed", "cancelled", "failed"
     started_at: str | None = None
     completed_at: str | None = None
+    progress: dict | None = None
     result: dict | None = None
     error: str | None = None
 
 
-async def _run_sync() -> None:
-    _job_status["sync"] = {
-        "name": "sync",
+def _start_job(name: str, cancellable: bool = True) -> asyncio.Event:
+    """Mark ``name`` running before its task is scheduled, so a second
+    trigger arriving in the meantime sees it. Returns its cancel event."""
+    cancel = asyncio.Event()
+    if cancellable:
+        _cancel_events[name] = cancel
+    _job_status[name] = {
+        "name": name,
         "status": "running",
         "started_at": datetime.now(timezone.utc).isoformat(),
     }
+    return cancel
+
+
+async def _run_job(
+    name: str,
+    work: Callable[[Callable[[dict], None], asyncio.Event], Awaitable[dict]],
+    cancel: asyncio.Event,
+    pending: Callable[[], Awaitable[bool]] | None = None,
+) -> None:
+    """Run ``work(on_progress, cancel)`` for a job started by _start_job and
+    record how it ended in _job_status.
+
+    A cancelled job is reported "cancelled" only if ``pending()`` says work
+    was left; a cancel that arrived after the last chunk changed nothing.
+    """
+
+    def on_progress(progress: dict) -> None:
+        _job_status[name]["progress"] = progress
+
     try:
-        from app.services.ingestion_service import IngestionService
-        svc = IngestionService()
-        stats = await svc.run_full_sync()
-        _job_status["sync"].update({
-            "status": "completed",
+        result = await work(on_progress, cancel)
+        cancelled = cancel.is_set() and (pending is None or await pending())
+        _job_status[name].update({
+            "status": "cancelled" if cancelled else "completed",
             "completed_at": datetime.now(timezone.utc).isoformat(),
-            "result": stats,
+            "result": result,
         })
     except Exception as e:
-        _job_status["sync"].update({
+        _job_status[name].update({
             "status": "failed",
             "completed_at": datetime.now(timezone.utc).isoformat(),
             "error": str(e),
         })
+    finally:
+        _cancel_events.pop(name, None)
 
 
-async def _run_score() -> None:
-    _job_status["score"] = {
-        "name": "score",
-        "status": "running",
-        "started_at": datetime.now(timezone.utc).isoformat(),
-    }
-    try:
+async def _run_sync(cancel: asyncio.Event) -> None:
+    async def work(on_progress: Callable[[dict], None], cancel: asyncio.Event) -> dict:
+        from app.services.ingestion_service import IngestionService
+        from app.services.suggest_service import rebuild
+        svc = IngestionService()
+        result = await svc.run_full_sync()
+        await rebuild()
+        return result
+
+    await _run_job("sync", work, cancel)
+
+
+async def _run_score(cancel: asyncio.Event) -> None:
+    async def work(on_progress: Callable[[dict], None], cancel: asyncio.Event) -> dict:
         from app.services.feature_service import score_all_dirty
-        count = await score_all_dirty()
-        _job_status["score"].update({
-            "status": "completed",
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-            "result": {"scored": count},
-        })
-    except Exception as e:
-        _job_status["score"].update({
-            "status": "failed",
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-            "error": str(e),
-        })
+        count = await score_all_dirty(on_progress=on_progress, cancel=cancel)
+        return {"scored": count}
+
+    async def pending() -> bool:
+        return bool(await queries.get_dirty_issues(limit=1))
+
+    await _run_job("score", work, cancel, pending)
+
+
+async def _run_rescore(cancel: asyncio.Event) -> None:
+    async def work(on_progress: Callable[[dict], None], cancel: asyncio.Event) -> dict:
+        from app.services.feature_service import rescore_outdated
+        count = await rescore_outdated(on_progress=on_progress, cancel=cancel)
+        return {"rescored": count}
+
+    async def pending() -> bool:
+        from app.services.feature_service import SCORE_RULES_VERSION
+        return bool(await queries.get_outdated_scores(SCORE_RULES_VERSION, limit=1))
+
+    await _run_job("rescore", work, cancel, pending)
+
+
+def _is_running(name: str) -> bool:
+    return _job_status.get(name, {}).get("status") == "running"
 
 
 @router.post("/jobs/sync")
 async def trigger_sync(background_tasks: BackgroundTasks) -> dict:
-    background_tasks.add_task(_run_sync)
+    if _is_running("sync"):
+        return {"message": "Sync job already running"}
+    background_tasks.add_task(_run_sync, _start_job("sync", cancellable=False))
     return {"message": "Sync job started"}
 
 
 @router.post("/jobs/score")
 async def trigger_score(background_tasks: BackgroundTasks) -> dict:
-    background_tasks.add_task(_run_score)
+    if _is_running("score"):
+        return {"message": "Score job already running"}
+    background_tasks.add_task(_run_score, _start_job("score"))
     return {"message": "Score job started"}
 
 
+@router.post("/jobs/rescore")
+async def trigger_rescore(background_tasks: BackgroundTasks) -> dict:
+    if _is_running("rescore"):
+        return {"message": "Rescore job already running"}
+    background_tasks.add_task(_run_rescore, _start_job("rescore"))
+    return {"message": "Rescore job started"}
+
+
+@router.post("/jobs/{name}/cancel")
+async def cancel_job(name: str) -> dict:
+    """Ask a running job to stop after its current chunk."""
+    cancel = _cancel_events.get(name)
+    if cancel is None:
+        return {"message": f"No running {name} job"}
+    cancel.set()
+    return {"message": f"Cancelling {name} job"}
+
+
 @router.get("/jobs/status/{name}", response_model=JobStatus)
 async def job_status(name: str) -> JobStatus:
     info = _job_status.get(name)
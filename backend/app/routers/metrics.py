@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+
+from app.services.cache import count_cache, detail_cache, search_cache, similar_cache
+from app.services.webhook_service import write_queue
+from app.utils import admission
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics() -> dict:
+    return {
+        "search_cache": search_cache.stats(),
+        "count_cache": count_cache.stats(),
+        "detail_cache": detail_cache.stats(),
+        "similar_cache": similar_cache.stats(),
+        "admission": admission.stats(),
+        "webhooks": write_queue.stats(),
+    }
@@ -1,28 +1,46 @@
-from fastapi import APIRouter
+import asyncio
+import time
 
+from fastapi import APIRouter, Response
+
+from app.config import settings
 from app.services.github_client import github_client
 
 router = APIRouter()
 
+# Last /rate_limit answer from GitHub and when it was fetched (monotonic).
+# Between fetches the tracker, updated from the headers of every API call
+# the syncer makes, is the fresher view of the core quota.
+_snapshot: dict = {"fetched_at": None, "resources": None}
+_refresh_lock = asyncio.Lock()
+
+
+def _resource(data: dict) -> dict:
+    return {
+        "remaining": data.get("remaining", -1),
+        "limit": data.get("limit", -1),
+        "reset": data.get("reset"),
+    }
+
+
+async def _resources() -> dict:
+    async with _refresh_lock:
+        fetched_at = _snapshot["fetched_at"]
+        if fetched_at is None or time.monotonic() - fetched_at >= settings.rate_limit_ttl:
+            data = await github_client.get_rate_limit()
+            resources = data.get("resources", {})
+            _snapshot["resources"] = {
+                "core": _resource(resources.get("core", {})),
+                "search": _resource(resources.get("search", {})),
+            }
+            _snapshot["fetched_at"] = time.monotonic()
+    return _snapshot["resources"]
+
 
 @router.get("/rate-limit")
-async def rate_limit() -> dict:
+async def rate_limit(response: Response) -> dict:
+    response.headers["Cache-Control"] = settings.cache_control_rate_limit
     try:
-        data = await github_client.get_rate_limit()
-        core = data.get("resources", {}).get("core", {})
-        search = data.get("resources", {}).get("search", {})
-        return {
-            "core": {
-                "remaining": core.get("remaining", -1),
-                "limit": core.get("limit", -1),
-                "reset": core.get("reset"),
-            },
-            "search": {
-                "remaining": search.get("remaining", -1),
-                "limit": search.get("limit", -1),
-                "reset": search.get("reset"),
-            },
-            "tracked": github_client.rate_limit.to_dict(),
-        }
+        return {**await _resources(), "tracked": github_client.rate_limit.to_dict()}
     except Exception as e:
         return {"error": str(e), "tracked": github_client.rate_limit.to_dict()}
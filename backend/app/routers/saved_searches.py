@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.db import queries
+from app.models.schemas import (
+    SavedSearch,
+    SavedSearchCreate,
+    SavedSearchMatch,
+    SavedSearchMatches,
+    SearchRequest,
+)
+
+router = APIRouter()
+
+# Saved searches are matched against new and changed issues by every score
+# job (services/percolator.py); matches collect in an outbox read with
+# GET /saved-searches/matches.
+
+
+def _saved_search(row) -> SavedSearch:
+    return SavedSearch(
+        search_id=row["search_id"],
+        name=row["name"],
+        request=SearchRequest.model_validate_json(row["request"]),
+        min_score=row["min_score"],
+        created_at=row["created_at"],
+    )
+
+
+@router.post("/saved-searches", response_model=SavedSearch)
+async def create_saved_search(body: SavedSearchCreate) -> SavedSearch:
+    search_id = await queries.create_saved_search(
+        body.name, body.request.model_dump_json(), body.min_score
+    )
+    return _saved_search(await queries.get_saved_search(search_id))
+
+
+@router.get("/saved-searches", response_model=list[SavedSearch])
+async def list_saved_searches() -> list[SavedSearch]:
+    return [_saved_search(row) for row in await queries.get_saved_searches()]
+
+
+@router.delete("/saved-searches/{search_id}")
+async def delete_saved_search(search_id: int) -> dict:
+    if not await queries.delete_saved_search(search_id):
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return {"message": f"Deleted saved search {search_id}"}
+
+
+@router.get("/saved-searches/matches", response_model=SavedSearchMatches)
+async def saved_search_matches(
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    search_id: int | None = None,
+) -> SavedSearchMatches:
+    """Matches after match_id ``after``, oldest first."""
+    rows = await queries.get_saved_search_matches(after, limit, search_id)
+    return SavedSearchMatches(
+        matches=[SavedSearchMatch(**dict(row)) for row in rows],
+        last_match_id=rows[-1]["match_id"] if rows else after,
+    )
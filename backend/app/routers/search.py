@@ -1,11 +1,146 @@
-from fastapi import APIRouter
+import asyncio
+import contextlib
+from collections.abc import Awaitable
+from datetime import datetime
+from typing import Literal
 
-from app.models.schemas import SearchRequest, SearchResponse
-from app.services.search_service import search_issues
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import settings
+from app.models.schemas import (
+    SearchBatchRequest,
+    SearchBatchResponse,
+    SearchRequest,
+    SearchResponse,
+    Signal,
+)
+from app.services.export_service import (
+    DEFAULT_EXPORT_FIELDS,
+    EXPORT_FIELDS,
+    EXPORT_MEDIA_TYPES,
+    export_search,
+)
+from app.services.search_service import (
+    InvalidCursor,
+    check_cursor,
+    search_batch,
+    search_cache_key,
+    search_result,
+)
+from app.utils import http_cache
+from app.utils.fast_json import FastJSONResponse
 
 router = APIRouter()
 
+# Status for requests abandoned by the client; nobody reads the response.
+_CLIENT_CLOSED = 499
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has been read, so the next ASGI message is the disconnect.
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _unless_disconnected(request: Request, work: Awaitable) -> object:
+    """Await ``work``, cancelling it (and so its SQLite statements, see
+    connection.query_budget) if the client disconnects first. Returns None
+    in that case."""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # Let it interrupt and release its connection before returning.
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    return None if task.cancelled() else task.result()
+
 
+# Search routes return pre-shaped dicts through FastJSONResponse; the
+# response_model declarations document the (identical) wire schema.
 @router.post("/search", response_model=SearchResponse)
-async def search(req: SearchRequest) -> SearchResponse:
-    return await search_issues(req)
+async def search(req: SearchRequest, request: Request) -> Response:
+    # Searches are POSTed only because the request is a JSON body; they are
+    # safe and repeatable, so they revalidate like a GET would.
+    try:
+        check_cursor(req)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    tag = http_cache.etag(search_cache_key(req))
+    result = await _unless_disconnected(request, search_result(req))
+    if result is None:
+        return Response(status_code=_CLIENT_CLOSED)
+    payload, complete = result
+    # A timed-out or failed search is no answer to revalidate against or
+    # reuse: the next try may well do better.
+    if not complete:
+        return FastJSONResponse(payload, headers=http_cache.NO_STORE)
+    if http_cache.matches(request, tag):
+        return http_cache.not_modified(tag, settings.cache_control_search)
+    return FastJSONResponse(payload, headers=http_cache.headers(tag, settings.cache_control_search))
+
+
+@router.post("/search/batch", response_model=SearchBatchResponse)
+async def search_many(batch: SearchBatchRequest, request: Request) -> Response:
+    if len(batch.requests) > settings.search_batch_max:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.search_batch_max} searches per batch",
+        )
+    results = await _unless_disconnected(request, search_batch(batch.requests))
+    if results is None:
+        return Response(status_code=_CLIENT_CLOSED)
+    return FastJSONResponse({"results": results})
+
+
+@router.get("/search/export")
+async def export(
+    q: str = "",
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: str | None = Query(None, description="Comma-separated field names"),
+    sort_by: Literal["issue_id", "created", "updated", "comments"] = "issue_id",
+    language: str | None = None,
+    state: str | None = None,
+    label: list[str] | None = Query(None),
+    signal: list[Signal] | None = Query(None),
+    repo: str | None = None,
+    min_stars: int | None = Query(None, ge=0),
+    exclude_archived: bool = False,
+    created_after: datetime | None = None,
+    updated_after: datetime | None = None,
+) -> StreamingResponse:
+    """Stream every matching issue as NDJSON or CSV."""
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else []
+    selected = selected or list(DEFAULT_EXPORT_FIELDS)
+    unknown = [f for f in selected if f not in EXPORT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown export fields: {', '.join(unknown)}",
+        )
+
+    req = SearchRequest(
+        query=q,
+        language=language,
+        state=state,
+        labels=label,
+        signals=signal,
+        repo=repo,
+        min_stars=min_stars,
+        exclude_archived=exclude_archived,
+        created_after=created_after,
+        updated_after=updated_after,
+    )
+    headers = {}
+    if format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="issues.csv"'
+    return StreamingResponse(
+        export_search(req, selected, format, sort_by),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
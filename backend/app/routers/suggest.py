@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+
+from app.models.schemas import SuggestResponse
+from app.services.suggest_service import MAX_SUGGESTIONS, suggest
+from app.utils.fast_json import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest_completions(
+    q: str = Query(""),
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS),
+) -> FastJSONResponse:
+    return FastJSONResponse(await suggest(q, limit))
@@ -0,0 +1,40 @@
+import json
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from app.config import settings
+from app.services.webhook_service import EVENTS, verify_signature, write_queue
+
+router = APIRouter()
+
+
+@router.post("/webhooks/github", status_code=202)
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(""),
+    x_hub_signature_256: str | None = Header(None),
+) -> dict:
+    """Receive ``issues`` and ``issue_comment`` events from a GitHub webhook.
+
+    Updates are queued for the batched writer (services/webhook_service.py)
+    and marked dirty, so the next score job picks them up; other events are
+    acknowledged and ignored.
+    """
+    if not settings.github_webhook_secret:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+    body = await request.body()
+    if not verify_signature(body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    if x_github_event == "ping":
+        return {"message": "pong"}
+    if x_github_event not in EVENTS:
+        return {"message": f"Ignored {x_github_event or 'unknown'} event"}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Payload is not a JSON object")
+    if not await write_queue.put(x_github_event, payload):
+        return {"message": f"Ignored {x_github_event} event"}
+    return {"message": "Queued"}
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from cachetools import TTLCache
+
+from app.config import settings
+from app.db.connection import get_generation, get_issue_seq
+
+
+class GenerationCache:
+    """LRU/TTL cache whose entries expire as soon as the DB generation changes.
+
+    Writers in this process bump the generation (see connection.bump_generation),
+    so a hit never serves data older than the last local write. The TTL bounds
+    staleness for writes made by other processes, such as the CLI.
+
+    ``version`` replaces the generation with a narrower one per key, such as
+    an issue's change sequence (connection.get_issue_seq).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        version: Callable[[Hashable], Hashable] | None = None,
+    ) -> None:
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._version = version
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, key: Hashable) -> Hashable:
+        return get_generation() if self._version is None else self._version(key)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self.version(key):
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any, generation: Hashable) -> None:
+        """Store ``value`` as computed at ``generation`` (self.version(key),
+        read before computing it)."""
+        if generation == self.version(key):
+            self._entries[key] = (generation, value)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """Return the cached value for ``key``, or compute and cache it.
+
+        Concurrent callers asking for the same missing key share one
+        ``compute()`` instead of each running it. Exceptions propagate to
+        every waiter and are not cached, nor are values ``cacheable``
+        rejects. If the caller running ``compute()`` is cancelled, the
+        waiters start over rather than being cancelled too.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        pending = self._pending.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get_or_compute(key, compute, cacheable)
+
+        generation = self.version(key)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here; waiters re-raise it themselves
+            raise
+        finally:
+            del self._pending[key]
+        future.set_result(value)
+        if cacheable is None or cacheable(value):
+            self.set(key, value, generation)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "generation": get_generation(),
+        }
+
+
+search_cache = GenerationCache(
+    maxsize=settings.search_cache_size, ttl=settings.search_cache_ttl
+)
+# Match counts per (query, filters), shared across pages and sort orders
+count_cache = GenerationCache(
+    maxsize=settings.search_cache_size, ttl=settings.search_cache_ttl
+)
+# Assembled issue detail payloads by issue_id, kept until the issue changes;
+# similar_closed is left out, since it changes with other issues
+detail_cache = GenerationCache(
+    maxsize=settings.detail_cache_size, ttl=settings.search_cache_ttl, version=get_issue_seq
+)
+# dedupe_service.similar_closed() results by issue_id
+similar_cache = GenerationCache(
+    maxsize=settings.detail_cache_size, ttl=settings.search_cache_ttl
+)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import heapq
+import logging
+
+from app.config import settings
+from app.db import queries
+from app.utils import minhash
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit.
+_LOOKUP_CHUNK = 500
+
+
+async def similar_closed(issue_id: int, k: int | None = None) -> list[dict]:
+    """Top ``k`` closed issues that look like near-duplicates of ``issue_id``.
+
+    Candidates come from the LSH band index; each is then checked against its
+    full MinHash signature and kept if the estimated Jaccard similarity
+    reaches ``duplicate_similarity_threshold``.
+    """
+    k = k or settings.similar_closed_limit
+    candidates = await queries.get_lsh_candidates(issue_id, state="closed")
+    if not candidates:
+        return []
+    blob = (await queries.get_minhash_signatures([issue_id])).get(issue_id)
+    if blob is None:
+        return []
+    sig = minhash.from_blob(blob)
+
+    scored = []
+    for row in candidates:
+        similarity = minhash.similarity(sig, minhash.from_blob(row["signature"]))
+        if similarity >= settings.duplicate_similarity_threshold:
+            scored.append((similarity, row))
+    return [
+        {
+            "repo_full_name": row["repo_full_name"],
+            "number": row["number"],
+            "title": row["title"],
+            "html_url": row["html_url"],
+            "closed_at": row["closed_at"],
+            "similarity": round(similarity, 3),
+        }
+        for similarity, row in heapq.nlargest(k, scored, key=lambda pair: pair[0])
+    ]
+
+
+async def _chunked(fetch, ids: list[int]) -> dict:
+    found: dict = {}
+    for start in range(0, len(ids), _LOOKUP_CHUNK):
+        found.update(await fetch(ids[start:start + _LOOKUP_CHUNK]))
+    return found
+
+
+async def find_duplicates(
+    threshold: float | None = None,
+    cross_repo_only: bool = False,
+    limit: int = 100,
+) -> list[dict]:
+    """Likely duplicate pairs across the whole index, most similar first."""
+    threshold = settings.duplicate_similarity_threshold if threshold is None else threshold
+    pairs = await queries.get_lsh_candidate_pairs(settings.lsh_max_bucket_size)
+    ids = sorted({p["a_id"] for p in pairs} | {p["b_id"] for p in pairs})
+    signatures = {
+        issue_id: minhash.from_blob(blob)
+        for issue_id, blob in (await _chunked(queries.get_minhash_signatures, ids)).items()
+    }
+    summaries = await _chunked(queries.get_issue_summaries, ids)
+
+    found = []
+    for pair in pairs:
+        a, b = summaries.get(pair["a_id"]), summaries.get(pair["b_id"])
+        if a is None or b is None:
+            continue
+        if cross_repo_only and a["repo_id"] == b["repo_id"]:
+            continue
+        similarity = minhash.similarity(signatures[a["issue_id"]], signatures[b["issue_id"]])
+        if similarity >= threshold:
+            found.append((similarity, a, b))
+
+    logger.info("Checked %d candidate pairs, %d above %.2f", len(pairs), len(found), threshold)
+    return [
+        {
+            "similarity": round(similarity, 3),
+            "a": {key: a[key] for key in ("repo_full_name", "number", "title", "state", "html_url")},
+            "b": {key: b[key] for key in ("repo_full_name", "number", "title", "state", "html_url")},
+        }
+        for similarity, a, b in heapq.nlargest(limit, found, key=lambda t: t[0])
+    ]
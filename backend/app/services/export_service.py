@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+
+from app.config import settings
+from app.db import queries
+from app.models.schemas import SearchRequest
+from app.services.feature_service import grade_for_score
+from app.services.search_service import compile_search
+
+# Fields computed from the effective score rather than read from a column
+_SCORE_FIELDS = ("fixability_score", "grade")
+EXPORT_FIELDS = (*queries.EXPORT_COLUMNS, *_SCORE_FIELDS)
+DEFAULT_EXPORT_FIELDS = (
+    "repo", "number", "title", "state", "html_url", "labels",
+    "comments", "created_at", "updated_at", "fixability_score", "grade",
+)
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _record(row, fields: list[str]) -> dict:
+    record = {}
+    for name in fields:
+        if name == "fixability_score":
+            record[name] = row["effective_score"]
+        elif name == "grade":
+            record[name] = grade_for_score(row["effective_score"])
+        elif name == "labels":
+            record[name] = json.loads(row["labels"]) if row["labels"] else []
+        elif name == "archived":
+            record[name] = bool(row["archived"])
+        else:
+            record[name] = row[name]
+    return record
+
+
+def _csv_lines(records: list[list]) -> str:
+    out = io.StringIO()
+    csv.writer(out).writerows(records)
+    return out.getvalue()
+
+
+async def export_search(
+    req: SearchRequest,
+    fields: list[str],
+    fmt: str = "ndjson",
+    sort_by: str = "issue_id",
+) -> AsyncIterator[str]:
+    """Yield every match of ``req`` as NDJSON or CSV text, one chunk at a time.
+
+    Rows come from a single cursor in ``settings.export_chunk_size`` chunks,
+    so memory stays flat however large the export is, and the next chunk is
+    only read once the consumer (StreamingResponse) has sent the previous one.
+    ``req`` paging, sorting and facet options are ignored.
+    """
+    query, filters = compile_search(req)
+    columns = [name for name in fields if name not in _SCORE_FIELDS]
+    if fmt == "csv":
+        yield _csv_lines([fields])
+
+    async for rows in queries.iter_search_rows(
+        query, filters, columns, sort_by=sort_by, chunk_size=settings.export_chunk_size
+    ):
+        records = [_record(row, fields) for row in rows]
+        if fmt == "csv":
+            for record in records:
+                if "labels" in record:
+                    record["labels"] = ",".join(record["labels"])
+            yield _csv_lines([list(record.values()) for record in records])
+        else:
+            yield "".join(json.dumps(record) + "\n" for record in records)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from datetime import datetime, timezone
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
 
+from app.config import settings
 from app.db import queries
-from app.utils.text_analysis import extract_features
+from app.services import semantic_index
+from app.utils import minhash
+from app.utils.text_analysis import RULES_VERSION as TEXT_RULES_VERSION, extract_features
 
 logger = logging.getLogger(__name__)
 
@@ -14,156 +19,285 @@ MAINTAINER_ASSOCIATIONS = {"OWNER", "MEMBER", "COLLABORATOR"}
 NEGATIVE_LABELS = {"wontfix", "won't fix", "invalid", "duplicate"}
 BLOCKED_LABELS = {"blocked", "waiting", "waiting-for-author", "needs-more-info"}
 
+# Bump whenever a weight or rule in compute_base_score() changes. Score rules
+# only read the cached features dict, so rows scored under an older version
+# are rewritten by rescore_outdated() without touching issue bodies. Changes
+# to the regexes in text_analysis bump text_analysis.RULES_VERSION instead,
+# which sends the affected issues back through score_all_dirty().
+SCORE_RULES_VERSION = 2
 
-def compute_score_from_features(features: dict) -> tuple[float, str, list[str]]:
-    """Compute additive fixability score from features dict.
 
-    Returns (score_0_100, grade, reasons).
+# Rule codes stored in issue_features.reason_codes, mapped to their points
+# and label. Reasons are kept as codes and only expanded for display.
+REASON_RULES: dict[str, tuple[int, str]] = {
+    "repro": (8, "steps to reproduce"),
+    "expected": (5, "expected vs actual"),
+    "trace": (4, "stack trace"),
+    "code": (3, "code block"),
+    "env2": (4, "env details (2+)"),
+    "env1": (2, "env detail (1)"),
+    "maintainer": (10, "maintainer replied"),
+    "gfi": (8, "good first issue label"),
+    "help": (6, "help wanted label"),
+    "bug": (3, "bug label"),
+    "active": (5, "active discussion (3+ comments)"),
+    "discussion": (2, "some discussion"),
+    "blocked": (-15, "blocked/waiting label"),
+    "negative": (-20, "wontfix/invalid/duplicate label"),
+    "closed": (-10, "closed"),
+    "stale": (-8, "stale (180+ days)"),
+    "aging": (-4, "aging (90+ days)"),
+}
+
+# Staleness depends on the current time, so it is never baked into the stored
+# score. Each rule is (min_days_old, reason_code), checked in order.
+STALENESS_RULES: tuple[tuple[int, str], ...] = (
+    (180, "stale"),
+    (90, "aging"),
+)
+
+
+def expand_reasons(codes: list[str]) -> list[str]:
+    """Turn stored rule codes into display strings like ``"+8 steps to reproduce"``."""
+    reasons = []
+    for code in codes:
+        if code in REASON_RULES:
+            points, label = REASON_RULES[code]
+            reasons.append(f"{points:+d} {label}")
+    return reasons
+
+
+def compute_base_score(features: dict) -> tuple[float, list[str]]:
+    """Compute the time-independent part of the fixability score.
+
+    This is what gets stored in ``issue_features.fixability_score``; staleness
+    is applied on top of it at query time. The score is left unclamped so the
+    0-100 clamp happens once, after staleness, as it always has. Returns
+    (raw_score, reason_codes).
     """
-    score = 50.0
-    reasons: list[str] = []
+    codes: list[str] = []
 
     # Positive text signals
     if features.get("has_steps_to_reproduce"):
-        score += 8
-        reasons.append("+8 steps to reproduce")
+        codes.append("repro")
     if features.get("has_expected_vs_actual"):
-        score += 5
-        reasons.append("+5 expected vs actual")
+        codes.append("expected")
     if features.get("has_stack_trace"):
-        score += 4
-        reasons.append("+4 stack trace")
+        codes.append("trace")
     if features.get("has_code_block"):
-        score += 3
-        reasons.append("+3 code block")
+        codes.append("code")
 
     env_count = features.get("env_detail_count", 0)
     if env_count >= 2:
-        score += 4
-        reasons.append("+4 env details (2+)")
+        codes.append("env2")
     elif env_count == 1:
-        score += 2
-        reasons.append("+2 env detail (1)")
+        codes.append("env1")
 
     # Maintainer engagement
     if features.get("maintainer_replied"):
-        score += 10
-        reasons.append("+10 maintainer replied")
+        codes.append("maintainer")
 
     # Labels
     labels = {l.lower() for l in features.get("labels", [])}
 
     if "good first issue" in labels:
-        score += 8
-        reasons.append("+8 good first issue label")
+        codes.append("gfi")
     if "help wanted" in labels:
-        score += 6
-        reasons.append("+6 help wanted label")
+        codes.append("help")
     if "bug" in labels:
-        score += 3
-        reasons.append("+3 bug label")
+        codes.append("bug")
 
     # Comment activity
     state = features.get("state", "open")
     comments = features.get("comments_count", 0)
     if state == "open":
         if comments >= 3:
-            score += 5
-            reasons.append("+5 active discussion (3+ comments)")
+            codes.append("active")
         elif comments >= 1:
-            score += 2
-            reasons.append("+2 some discussion")
+            codes.append("discussion")
 
     # Negative signals
     if labels & BLOCKED_LABELS:
-        score -= 15
-        reasons.append("-15 blocked/waiting label")
+        codes.append("blocked")
     if labels & NEGATIVE_LABELS:
-        score -= 20
-        reasons.append("-20 wontfix/invalid/duplicate label")
+        codes.append("negative")
     if state == "closed":
-        score -= 10
-        reasons.append("-10 closed")
+        codes.append("closed")
 
-    # Staleness
-    days_old = features.get("days_old", 0)
-    if days_old >= 180:
-        score -= 8
-        reasons.append("-8 stale (180+ days)")
-    elif days_old >= 90:
-        score -= 4
-        reasons.append("-4 aging (90+ days)")
+    return 50.0 + sum(REASON_RULES[code][0] for code in codes), codes
 
-    score = max(0.0, min(100.0, score))
 
+def apply_staleness(base_score: float, days_old: float) -> tuple[float, list[str]]:
+    """Apply the staleness penalty for an issue ``days_old`` days old and
+    clamp the result to 0-100.
+
+    Returns (score, reason_codes).
+    """
+    for min_days, code in STALENESS_RULES:
+        if days_old >= min_days:
+            return max(0.0, min(100.0, base_score + REASON_RULES[code][0])), [code]
+    return max(0.0, min(100.0, base_score)), []
+
+
+def grade_for_score(score: float) -> str:
     if score >= 80:
-        grade = "A"
-    elif score >= 60:
-        grade = "B"
-    elif score >= 40:
-        grade = "C"
-    elif score >= 20:
-        grade = "D"
-    else:
-        grade = "F"
-
-    return score, grade, reasons
-
-
-def _days_since(iso_date: str | None) -> float:
-    if not iso_date:
-        return 0.0
-    try:
-        dt = datetime.fromisoformat(iso_date.replace("Z", "+00:00"))
-        return max(0.0, (datetime.now(timezone.utc) - dt).total_seconds() / 86400)
-    except Exception:
-        return 0.0
-
-
-async def score_all_dirty() -> int:
-    """Score all issues that need (re)scoring. Returns count scored."""
-    dirty = await queries.get_dirty_issues()
+        return "A"
+    if score >= 60:
+        return "B"
+    if score >= 40:
+        return "C"
+    if score >= 20:
+        return "D"
+    return "F"
+
+
+def compute_score_from_features(features: dict) -> tuple[float, str, list[str]]:
+    """Compute additive fixability score from features dict.
+
+    Staleness is applied only when the dict carries ``days_old``.
+    Returns (score_0_100, grade, reasons).
+    """
+    base, codes = compute_base_score(features)
+    score, stale_codes = apply_staleness(base, features.get("days_old", 0))
+    return score, grade_for_score(score), expand_reasons(codes + stale_codes)
+
+
+def features_from_row(row) -> dict:
+    """Rebuild the features dict from a row carrying the typed feature columns
+    (see queries.FEATURE_COLUMNS) plus the issue's labels, state and comment count."""
+    features = {column: row[column] for column in queries.FEATURE_COLUMNS}
+    for column in queries.BOOLEAN_FEATURE_COLUMNS:
+        features[column] = bool(features[column])
+    features["labels"] = json.loads(row["labels"]) if row["labels"] else []
+    features["state"] = row["state"]
+    features["comments_count"] = row["comments_count"]
+    return features
+
+
+def staleness_cutoffs(now: datetime | None = None) -> list[tuple[str, float]]:
+    """Translate STALENESS_RULES into ``(created_at_cutoff, penalty)`` pairs.
+
+    Issues created at or before a cutoff get its penalty. Cutoffs are ISO
+    strings so SQL can compare them against ``issues.created_at`` directly.
+    """
+    now = now or datetime.now(timezone.utc)
+    return [
+        ((now - timedelta(days=min_days)).strftime("%Y-%m-%dT%H:%M:%SZ"), -REASON_RULES[code][0])
+        for min_days, code in STALENESS_RULES
+    ]
+
+
+def staleness_codes(created_at: str | None, now: datetime | None = None) -> list[str]:
+    """Reason code for the staleness rule an issue currently falls under, if any."""
+    if not created_at:
+        return []
+    for (cutoff, _), (_, code) in zip(staleness_cutoffs(now), STALENESS_RULES):
+        if created_at <= cutoff:
+            return [code]
+    return []
+
+
+async def score_all_dirty(
+    batch_size: int | None = None,
+    on_progress: Callable[[dict], None] | None = None,
+    cancel: asyncio.Event | None = None,
+) -> int:
+    """Score all issues that need (re)scoring. Returns count scored.
+
+    Dirty issues are streamed in issue_id order, ``batch_size`` at a time, so
+    memory stays bounded by one chunk of bodies no matter how many issues are
+    dirty. Each chunk is committed before the next is read; ``on_progress`` is
+    called after every commit and setting ``cancel`` stops between chunks.
+    Each chunk's new and changed issues are matched against the saved
+    searches; they are then embedded for semantic search, if enabled.
+    """
+    # Imported here: the percolator compiles searches with search_service,
+    # which imports this module.
+    from app.services import percolator
+
+    batch_size = batch_size or settings.score_batch_size
     count = 0
+    matched = 0
+    after_issue_id = 0
+    saved_searches = await percolator.load()
+
+    while cancel is None or not cancel.is_set():
+        rows = await queries.get_dirty_issues(limit=batch_size, after_issue_id=after_issue_id)
+        if not rows:
+            break
 
-    for row in dirty:
-        issue_id = row["issue_id"]
-        body = row["body"] or ""
-        labels = json.loads(row["labels"]) if row["labels"] else []
-
-        # Extract text features from body
-        text_features = extract_features(body)
-
-        # Check for maintainer replies in comments
-        from app.db.connection import get_db
-        db = await get_db()
-        cursor = await db.execute(
-            """SELECT 1 FROM comments
-               WHERE issue_id = ? AND author_association IN ('OWNER', 'MEMBER', 'COLLABORATOR')
-               LIMIT 1""",
-            (issue_id,),
+        entries = []
+        signatures = []
+        for row in rows:
+            labels = json.loads(row["labels"]) if row["labels"] else []
+            features = {
+                **extract_features(row["body"] or ""),
+                "maintainer_replied": bool(row["maintainer_replied"]),
+                "labels": labels,
+                "state": row["state"],
+                "comments_count": row["comments_count"],
+            }
+            score, codes = compute_base_score(features)
+            entries.append((
+                row["issue_id"], score, grade_for_score(score), codes, features,
+                TEXT_RULES_VERSION, SCORE_RULES_VERSION,
+            ))
+            sig = minhash.signature(row["title"] or "", row["body"])
+            if sig is not None:
+                signatures.append(
+                    (row["issue_id"], minhash.to_blob(sig), minhash.band_buckets(sig))
+                )
+
+        await queries.upsert_issue_features_many(entries)
+        await queries.upsert_minhash_many(signatures)
+        matched += await percolator.percolate(
+            saved_searches, [row for row in rows if row["changed"]]
         )
-        maintainer_row = await cursor.fetchone()
-
-        # Build combined features dict
-        features = {
-            **text_features,
-            "maintainer_replied": maintainer_row is not None,
-            "labels": labels,
-            "state": row["state"],
-            "comments_count": row["comments_count"],
-            "days_old": _days_since(row["created_at"]),
-        }
-
-        score, grade, reasons = compute_score_from_features(features)
-
-        await queries.upsert_issue_features(
-            issue_id=issue_id,
-            fixability_score=score,
-            grade=grade,
-            reasons=reasons,
-            features=features,
+        count += len(rows)
+        after_issue_id = rows[-1]["issue_id"]
+        if on_progress:
+            on_progress({"scored": count, "last_issue_id": after_issue_id})
+
+    logger.info("Scored %d issues (%d saved-search matches)", count, matched)
+    if semantic_index.available():
+        await semantic_index.sync(batch_size=batch_size, cancel=cancel)
+    return count
+
+
+async def rescore_outdated(
+    batch_size: int | None = None,
+    on_progress: Callable[[dict], None] | None = None,
+    cancel: asyncio.Event | None = None,
+) -> int:
+    """Rewrite scores computed under an older SCORE_RULES_VERSION.
+
+    Reuses the cached features, so no issue body is read or re-parsed. Rows
+    are updated in place one batch at a time; searches keep serving the old
+    score of a row until its batch commits. Returns count rescored.
+    """
+    batch_size = batch_size or settings.score_batch_size
+    count = 0
+    after_issue_id = 0
+
+    while cancel is None or not cancel.is_set():
+        rows = await queries.get_outdated_scores(
+            SCORE_RULES_VERSION, after_issue_id=after_issue_id, limit=batch_size
         )
-        count += 1
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            score, codes = compute_base_score(features_from_row(row))
+            updates.append(
+                (score, grade_for_score(score), codes, SCORE_RULES_VERSION, row["issue_id"])
+            )
+
+        await queries.update_issue_scores(updates)
+        count += len(rows)
+        after_issue_id = rows[-1]["issue_id"]
+        if on_progress:
+            on_progress({"rescored": count, "last_issue_id": after_issue_id})
 
-    logger.info("Scored %d issues", count)
+    logger.info("Rescored %d issues under score rules v%d", count, SCORE_RULES_VERSION)
     return count
@@ -13,6 +13,59 @@ logger = logging.getLogger(__name__)
 MAINTAINER_ASSOCIATIONS = {"OWNER", "MEMBER", "COLLABORATOR"}
 
 
+# GitHub API objects -> keyword arguments of the queries.upsert_* functions.
+# Webhook payloads (services/webhook_service.py) carry the same objects.
+
+def repo_fields(raw: dict, owner: str, name: str) -> dict:
+    return {
+        "repo_id": raw["id"],
+        "full_name": raw.get("full_name", f"{owner}/{name}"),
+        "owner": owner,
+        "name": name,
+        "stars": raw.get("stargazers_count", 0),
+        "forks": raw.get("forks_count", 0),
+        "open_issues_count": raw.get("open_issues_count", 0),
+        "language": raw.get("language"),
+        "pushed_at": raw.get("pushed_at"),
+        "updated_at": raw.get("updated_at"),
+        "archived": raw.get("archived", False),
+    }
+
+
+def issue_fields(item: dict, repo_id: int) -> dict:
+    labels = [
+        lbl.get("name", "") if isinstance(lbl, dict) else str(lbl)
+        for lbl in item.get("labels", [])
+    ]
+    return {
+        "issue_id": item["id"],
+        "repo_id": repo_id,
+        "number": item["number"],
+        "title": item.get("title", ""),
+        "body": item.get("body") or "",
+        "state": item.get("state", "open"),
+        "user_login": (item.get("user") or {}).get("login", ""),
+        "labels": labels,
+        "comments_count": item.get("comments", 0),
+        "html_url": item.get("html_url", ""),
+        "created_at": item.get("created_at"),
+        "updated_at": item.get("updated_at"),
+        "closed_at": item.get("closed_at"),
+    }
+
+
+def comment_fields(c: dict, issue_id: int) -> dict:
+    return {
+        "comment_id": c["id"],
+        "issue_id": issue_id,
+        "body": c.get("body") or "",
+        "user_login": (c.get("user") or {}).get("login", ""),
+        "author_association": c.get("author_association", ""),
+        "created_at": c.get("created_at"),
+        "updated_at": c.get("updated_at"),
+    }
+
+
 class IngestionService:
     def __init__(self) -> None:
         self._client = github_client
@@ -35,19 +88,7 @@ class IngestionService:
         try:
             raw = await self._client.get_repo(owner, name)
             repo_id = raw["id"]
-            await queries.upsert_repo(
-                repo_id=repo_id,
-                full_name=raw.get("full_name", f"{owner}/{name}"),
-                owner=owner,
-                name=name,
-                stars=raw.get("stargazers_count", 0),
-                forks=raw.get("forks_count", 0),
-                open_issues_count=raw.get("open_issues_count", 0),
-                language=raw.get("language"),
-                pushed_at=raw.get("pushed_at"),
-                updated_at=raw.get("updated_at"),
-                archived=raw.get("archived", False),
-            )
+            await queries.upsert_repo(**repo_fields(raw, owner, name))
             logger.info("Synced repo %s/%s (id=%d)", owner, name, repo_id)
             return repo_id
         except Exception:
@@ -76,25 +117,7 @@ class IngestionService:
                     # Skip pull requests (they also appear in /issues)
                     if item.get("pull_request"):
                         continue
-                    labels = [
-                        lbl.get("name", "") if isinstance(lbl, dict) else str(lbl)
-                        for lbl in item.get("labels", [])
-                    ]
-                    await queries.upsert_issue(
-                        issue_id=item["id"],
-                        repo_id=repo_id,
-                        number=item["number"],
-                        title=item.get("title", ""),
-                        body=item.get("body") or "",
-                        state=item.get("state", "open"),
-                        user_login=item.get("user", {}).get("login", ""),
-                        labels=labels,
-                        comments_count=item.get("comments", 0),
-                        html_url=item.get("html_url", ""),
-                        created_at=item.get("created_at"),
-                        updated_at=item.get("updated_at"),
-                        closed_at=item.get("closed_at"),
-                    )
+                    await queries.upsert_issue(**issue_fields(item, repo_id))
                     count += 1
             except Exception:
                 logger.exception("Failed to fetch issues page %d for %s/%s", page, owner, name)
@@ -116,15 +139,7 @@ class IngestionService:
             if not isinstance(comments, list):
                 return 0
             for c in comments:
-                await queries.upsert_comment(
-                    comment_id=c["id"],
-                    issue_id=issue_id,
-                    body=c.get("body") or "",
-                    user_login=c.get("user", {}).get("login", ""),
-                    author_association=c.get("author_association", ""),
-                    created_at=c.get("created_at"),
-                    updated_at=c.get("updated_at"),
-                )
+                await queries.upsert_comment(**comment_fields(c, issue_id))
                 count += 1
         except Exception:
             logger.exception(
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from app.db import queries
+from app.models.schemas import SearchRequest
+from app.services.search_service import compile_search
+from app.utils.query_parser import parse_query
+
+logger = logging.getLogger(__name__)
+
+# Saved searches run in reverse: rather than every saved search querying the
+# whole corpus, each batch of new or changed issues is matched against the
+# saved searches. A search can only match an issue containing one of the
+# alternatives of each of its OR-groups, so it is indexed under those of one
+# group (its "anchors"); an issue's tokens then pick out the few searches
+# worth checking, and SQL checks them against just that batch of rows.
+# Searches without positive terms (filters only) are checked for every issue.
+
+# unicode61, the issues_fts tokenizer: runs of letters and digits, lowercased,
+# with diacritics removed.
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokens(text: str) -> list[str]:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _TOKEN.findall(stripped)
+
+
+def _anchor(value: str, prefix: bool) -> tuple[str, bool] | None:
+    """The token an issue must contain (or start with, for a prefix) to
+    match a term or phrase: its longest whole token."""
+    toks = tokens(value)
+    if not toks:
+        return None
+    whole = toks[:-1] if prefix else toks
+    if whole:
+        return max(whole, key=len), False
+    return toks[-1], True
+
+
+@dataclass(frozen=True)
+class _Compiled:
+    search_id: int
+    query: str | None
+    filters: queries.SearchFilters
+    min_score: float | None
+
+
+class PercolatorIndex:
+    """Saved searches by anchor token."""
+
+    def __init__(self, searches: Iterable[tuple[int, SearchRequest, float | None]]):
+        self.searches: dict[int, _Compiled] = {}
+        self._terms: dict[str, list[int]] = defaultdict(list)
+        self._prefixes: dict[str, list[int]] = defaultdict(list)
+        self._unanchored: list[int] = []
+        for search_id, req, min_score in searches:
+            query, filters = compile_search(req)
+            self.searches[search_id] = _Compiled(search_id, query, filters, min_score)
+            anchors = self._pick_anchors(parse_query(req.query).term_groups)
+            if anchors is None:
+                self._unanchored.append(search_id)
+                continue
+            for token, prefix in anchors:
+                (self._prefixes if prefix else self._terms)[token].append(search_id)
+        self._max_prefix = max(map(len, self._prefixes), default=0)
+
+    @staticmethod
+    def _pick_anchors(groups) -> list[tuple[str, bool]] | None:
+        best = None
+        for group in groups:
+            anchors = [_anchor(value, prefix) for value, prefix in group]
+            if None in anchors:
+                continue
+            # Fewer and longer anchors are likely to match fewer issues.
+            key = (len(anchors), -min(len(token) for token, _ in anchors))
+            if best is None or key < best[0]:
+                best = key, anchors
+        return None if best is None else best[1]
+
+    def __len__(self) -> int:
+        return len(self.searches)
+
+    def candidates(self, text: str) -> set[int]:
+        """search_ids that may match an issue with this title and body."""
+        found = set(self._unanchored)
+        for token in set(tokens(text)):
+            found.update(self._terms.get(token, ()))
+            for n in range(1, min(len(token), self._max_prefix) + 1):
+                found.update(self._prefixes.get(token[:n], ()))
+        return found
+
+
+async def load() -> PercolatorIndex:
+    rows = await queries.get_saved_searches()
+    return PercolatorIndex(
+        (row["search_id"], SearchRequest.model_validate_json(row["request"]), row["min_score"])
+        for row in rows
+    )
+
+
+async def percolate(index: PercolatorIndex, rows) -> int:
+    """Match issue rows (with issue_id, title and body) against the saved
+    searches, appending new matches to the outbox. Returns count added."""
+    if not len(index):
+        return 0
+    by_search: dict[int, list[int]] = defaultdict(list)
+    for row in rows:
+        for search_id in index.candidates(f"{row['title'] or ''} {row['body'] or ''}"):
+            by_search[search_id].append(row["issue_id"])
+
+    matches: list[tuple[int, int]] = []
+    for search_id, issue_ids in by_search.items():
+        s = index.searches[search_id]
+        matched = await queries.match_issue_ids(issue_ids, s.query, s.filters, s.min_score)
+        matches.extend((search_id, issue_id) for issue_id in matched)
+    added = await queries.insert_saved_search_matches(matches)
+    logger.debug(
+        "Percolated %d issues: %d candidate searches, %d new matches",
+        len(rows), len(by_search), added,
+    )
+    return added
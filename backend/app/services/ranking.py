@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.models.schemas import SearchRequest
+
+# log10(1 + stars) at which the star signal saturates (100k stars).
+_STAR_SATURATION = 5.0
+
+
+@dataclass(frozen=True)
+class RankWeights:
+    text: float
+    fixability: float
+    stars: float = 0.0
+    recency: float = 0.0
+
+
+def weights_for(req: SearchRequest) -> RankWeights:
+    """Configured rerank weights with any per-request overrides applied."""
+
+    def pick(override: float | None, default: float) -> float:
+        return default if override is None else override
+
+    return RankWeights(
+        text=pick(req.text_weight, settings.text_score_weight),
+        fixability=pick(req.fixability_weight, settings.fixability_score_weight),
+        stars=pick(req.star_weight, settings.star_score_weight),
+        recency=pick(req.recency_weight, settings.recency_score_weight),
+    )
+
+
+def _epoch_seconds(iso_date: str | None) -> float | None:
+    if not iso_date:
+        return None
+    try:
+        return datetime.fromisoformat(iso_date.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def rerank(
+    candidates: list,
+    weights: RankWeights,
+    k: int,
+    now: datetime | None = None,
+) -> list[int]:
+    """Rank retrieval candidates by a weighted blend of signals.
+
+    Each candidate needs ``issue_id``, ``bm25_score``, ``effective_score``,
+    ``stars`` and ``updated_at``. Every signal is scaled to 0..1: text
+    relevance relative to the best bm25 in the candidate set, fixability
+    out of 100, stars on a log scale, and recency as an exponential decay
+    of ``updated_at`` with a ``recency_half_life_days`` half-life. Only the
+    top ``k`` are kept, via a bounded heap. Returns issue_ids best first.
+    """
+    if not candidates or k <= 0:
+        return []
+
+    # bm25() is negative in FTS5; more negative means a better match.
+    best_text = max(-c["bm25_score"] for c in candidates) or 1.0
+    now_ts = (now or datetime.now(timezone.utc)).timestamp()
+    decay_per_second = math.log(2) / (settings.recency_half_life_days * 86400)
+    w_text, w_fix, w_stars, w_recency = (
+        weights.text, weights.fixability, weights.stars, weights.recency,
+    )
+
+    def blended(c) -> float:
+        score = w_text * (-c["bm25_score"] / best_text) + w_fix * c["effective_score"] / 100.0
+        if w_stars:
+            score += w_stars * min(1.0, math.log10(1 + (c["stars"] or 0)) / _STAR_SATURATION)
+        if w_recency:
+            updated = _epoch_seconds(c["updated_at"])
+            if updated is not None:
+                score += w_recency * math.exp(-decay_per_second * max(0.0, now_ts - updated))
+        return score
+
+    top = heapq.nlargest(k, candidates, key=blended)
+    return [c["issue_id"] for c in top]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[int]:
+    """Merge rankings of issue_ids by summed 1 / (k + rank).
+
+    Only ranks are used, so lists scored on incomparable scales (bm25 and
+    cosine similarity) combine without normalization; ``k`` damps the
+    advantage of the very top ranks. Ties keep first-seen order.
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, issue_id in enumerate(ranking, start=1):
+            scores[issue_id] = scores.get(issue_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda issue_id: -scores[issue_id])
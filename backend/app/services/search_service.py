@@ -1,97 +1,467 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import dataclasses
 import json
 import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
 
+from app.config import settings
 from app.db import queries
-from app.models.schemas import (
-    FixabilityBreakdown,
-    FixabilityResult,
-    IssueResult,
-    RateLimitInfo,
-    RepoSummary,
-    ScoredIssue,
-    SearchRequest,
-    SearchResponse,
-)
+from app.db.connection import QueryBudget, QueryTimeout, query_budget
+from app.models.schemas import SearchRequest, SearchResponse
+from app.services import semantic_index, suggest_service
+from app.services.cache import count_cache, search_cache
+from app.services.feature_service import features_from_row, grade_for_score
 from app.services.github_client import github_client
+from app.services.ranking import reciprocal_rank_fusion, rerank, weights_for
 from app.services.score_engine import compute_fixability_from_db
+from app.utils.query_parser import parse_query
 
 logger = logging.getLogger(__name__)
 
 
-def _row_to_scored_issue(row) -> ScoredIssue:
-    labels = json.loads(row["labels"]) if row["labels"] else []
-    features = json.loads(row["features"]) if row["features"] else {}
-    body = row["body"] or ""
+def _row_to_item(row, body_snippet: str = "") -> dict:
+    """Map a search row straight to the ScoredIssue wire shape.
 
+    Plain dicts rather than the pydantic models: a page of results is built
+    and encoded (see utils/fast_json.py) without per-field validation.
+    test_search_payload_matches_response_model pins the two together.
+    """
+    features = features_from_row(row)
+
+    # Staleness is applied at query time, so grade the effective score here
+    # rather than trusting the grade stored alongside the base score.
     fix = compute_fixability_from_db(
-        fixability_score=row["fixability_score"],
-        grade=row["grade"],
+        fixability_score=row["effective_score"],
+        grade=grade_for_score(row["effective_score"]),
         features=features,
     )
 
-    issue = IssueResult(
-        number=row["number"],
-        title=row["title"],
-        html_url=row["html_url"],
-        state=row["state"],
-        created_at=row["created_at"] or "",
-        updated_at=row["updated_at"] or "",
-        comments=row["comments_count"],
-        labels=labels,
-        user=row["user_login"],
-        body_snippet=body[:300],
-        repo_full_name=row["repo_full_name"],
-    )
+    return {
+        "issue": {
+            "number": row["number"],
+            "title": row["title"],
+            "html_url": row["html_url"],
+            "state": row["state"],
+            "created_at": row["created_at"] or "",
+            "updated_at": row["updated_at"] or "",
+            "comments": row["comments_count"],
+            "labels": features["labels"],
+            "user": row["user_login"],
+            "body_snippet": body_snippet,
+            "repo_full_name": row["repo_full_name"],
+        },
+        "repo_summary": {
+            "full_name": row["repo_full_name"],
+            "stars": row["stars"],
+            "open_issues": row["open_issues_count"],
+            "language": row["language"],
+            "pushed_at": row["pushed_at"],
+            "archived": bool(row["archived"]),
+        },
+        "fixability": fix,
+    }
+
+
+# Row column holding the sort key for each keyset-paginated sort mode
+_CURSOR_COLUMNS = {"created": "created_at", "updated": "updated_at", "comments": "comments_count"}
+
+
+def _encode_cursor(sort_by: str, row) -> str:
+    # NULL timestamps sort as '' (queries._INDEX_SORTS); page on that key.
+    value = row[_CURSOR_COLUMNS[sort_by]]
+    payload = json.dumps([sort_by, "" if value is None else value, row["issue_id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+class InvalidCursor(ValueError):
+    """A SearchRequest.cursor that is not a next_cursor issued for its sort_by."""
+
+
+def _decode_cursor(sort_by: str, cursor: str) -> tuple:
+    try:
+        cursor_sort, value, issue_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        issue_id = int(issue_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor") from None
+    if not isinstance(value, (str, int, float)):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_sort != sort_by:
+        raise InvalidCursor(f"Cursor is for sort_by={cursor_sort!r}, not {sort_by!r}")
+    return value, issue_id
+
+
+def check_cursor(req: SearchRequest) -> None:
+    """Raise InvalidCursor if ``req`` carries a cursor it cannot use.
+
+    Run before searching, so a bad cursor is reported to the client rather
+    than failing inside the search and coming back as no results.
+    """
+    if req.cursor and req.sort_by in _CURSOR_COLUMNS:
+        _decode_cursor(req.sort_by, req.cursor)
+
+
+def _iso_utc(value: datetime | None) -> str | None:
+    """Format a filter timestamp like the GitHub timestamps stored in issues."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _build_facets(rows, cap: int) -> tuple[dict, int | None]:
+    """SearchFacets wire shape for get_facet_counts() rows, and the number
+    of matches, or None if there are more than the ``cap`` they cover."""
+    facets: dict[str, list[dict]] = {"language": [], "state": [], "grade": [], "labels": []}
+    grades: Counter = Counter()
+    matches = 0
+    for row in rows:
+        if row["facet"] == "matches":
+            matches = row["count"]
+        elif row["facet"] == "score":
+            grades[grade_for_score(row["value"])] += row["count"]
+        else:
+            facets[row["facet"]].append({"value": row["value"], "count": row["count"]})
+    for name in ("language", "state"):
+        facets[name].sort(key=lambda f: -f["count"])
+    facets["grade"] = [{"value": value, "count": count} for value, count in grades.most_common()]
+    if matches > cap:
+        return {**facets, "truncated": True}, None
+    return {**facets, "truncated": False}, matches
 
-    repo_summary = RepoSummary(
-        full_name=row["repo_full_name"],
-        stars=row["stars"],
-        open_issues=row["open_issues_count"],
-        language=row["language"],
-        pushed_at=row["pushed_at"],
-        archived=bool(row["archived"]),
+
+def compile_search(
+    req: SearchRequest, expansions: dict[str, list[str]] | None = None
+) -> tuple[str | None, queries.SearchFilters]:
+    """The FTS5 expression and SQL filters for a request.
+
+    Request fields take precedence over the same filter written in the query.
+    ``expansions`` is passed through to parse_query.
+    """
+    parsed = parse_query(req.query, expansions)
+    filters = queries.SearchFilters(
+        language=req.language or parsed.language,
+        state=req.state or parsed.state,
+        labels=[*(req.labels or []), *parsed.labels] or None,
+        signals=req.signals,
+        created_after=_iso_utc(req.created_after),
+        updated_after=_iso_utc(req.updated_after),
+        min_stars=req.min_stars,
+        exclude_archived=req.exclude_archived,
+        repo=req.repo or parsed.repo,
+        exclude_text=parsed.exclude_text,
     )
+    return parsed.text, filters
+
+
+# Stands in for a COUNT that ran out of time; a query that slow matches a lot.
+_UNCOUNTED = 1 << 62
+
 
-    return ScoredIssue(
-        issue=issue,
-        repo_summary=repo_summary,
-        fixability=FixabilityResult(
-            score=fix["score"],
-            grade=fix["grade"],
-            breakdown=FixabilityBreakdown(**fix["breakdown"]),
-            enriched=fix["enriched"],
-        ),
+async def _count_matches(query: str | None, filters: queries.SearchFilters) -> int:
+    """COUNT for a query + filter set, shared by every page, sort and
+    concurrent request over the same matches."""
+    key = json.dumps(["count", query, dataclasses.asdict(filters)], sort_keys=True)
+    return await count_cache.get_or_compute(
+        key, lambda: queries.count_search_matches(query, filters)
     )
 
 
-async def search_issues(req: SearchRequest) -> SearchResponse:
+async def _count_within(
+    budget: QueryBudget, query: str | None, filters: queries.SearchFilters
+) -> int | None:
+    """_count_matches in at most half the remaining budget, or None (and the
+    budget marked timed out) if that is not enough."""
+    try:
+        with budget.limit(budget.remaining() / 2):
+            return await _count_matches(query, filters)
+    except QueryTimeout:
+        budget.timed_out = True
+        return None
+
+
+async def _semantic_ranking(
+    req: SearchRequest,
+    query: str | None,
+    filters: queries.SearchFilters,
+    now: datetime,
+) -> list[int] | None:
+    """issue_ids for a semantic or hybrid search, best first, or None to
+    fall back to keyword search.
+
+    The nearest ``search_candidate_limit`` embeddings are filtered in SQL;
+    hybrid fuses them with the relevance ranking of the bm25 candidates.
+    """
+    text = " ".join(parse_query(req.query).terms)
+    if not text or not semantic_index.available():
+        return None
+    limit = max(settings.search_candidate_limit, req.page * req.per_page)
+    nearest = await semantic_index.search(text, limit)
+    if not nearest:
+        return None
+    ranked = await queries.filter_issue_ids(nearest, filters)
+    if req.mode == "hybrid":
+        candidates = await queries.search_candidates(
+            query=query, limit=limit, now=now, filters=filters
+        )
+        keyword = rerank(candidates, weights_for(req), k=len(candidates), now=now)
+        ranked = reciprocal_rank_fusion([keyword, ranked], k=settings.semantic_rrf_k)
+    return ranked
+
+
+async def _run_search(
+    req: SearchRequest,
+    query: str | None,
+    filters: queries.SearchFilters,
+    budget: QueryBudget,
+) -> tuple[list, int, str | None, dict | None]:
+    """Returns (rows, total_count, next_cursor, facets).
+
+    Facets and the match count are optional: each gets at most half of the
+    remaining ``budget``, and when they run out of time the facets come back
+    truncated and the total as a lower bound. Only the page of rows itself
+    may use the whole budget.
+    """
+    # No terms and no filters ("", or only operators like "OR - :") would
+    # otherwise match, count and facet every issue in the index.
+    if not query and filters == queries.SearchFilters():
+        facets = None
+        if req.facets:
+            facets = {"language": [], "state": [], "grade": [], "labels": [], "truncated": False}
+        return [], 0, None, facets
+
     offset = (req.page - 1) * req.per_page
+    now = datetime.now(timezone.utc)
 
-    try:
-        rows, total_count = await queries.search_issues_fts(
-            query=req.query,
-            language=req.language,
-            state=req.state,
-            labels=req.labels,
+    # Facets come from one aggregate over at most search_facet_cap matches,
+    # which also yields the exact total when the cap is not reached.
+    total_count = None
+    facets = None
+    if req.facets:
+        cap = settings.search_facet_cap
+        try:
+            with budget.limit(budget.remaining() / 2):
+                facet_rows = await queries.get_facet_counts(
+                    query, filters, labels_limit=settings.search_facet_labels,
+                    now=now, limit=cap,
+                )
+        except QueryTimeout:
+            budget.timed_out = True
+            facets = {"language": [], "state": [], "grade": [], "labels": [], "truncated": True}
+        else:
+            facets, total_count = _build_facets(facet_rows, cap)
+
+    if req.mode != "keyword":
+        ranked = await _semantic_ranking(req, query, filters, now)
+        if ranked is not None:
+            rows = await queries.get_search_rows(ranked[offset:offset + req.per_page], now=now)
+            return rows, len(ranked), None, facets
+
+    # Any other sort_by gets the blended relevance ranking, as it always has.
+    if req.sort_by == "fixability" or req.sort_by in _CURSOR_COLUMNS:
+        keyset = req.sort_by in _CURSOR_COLUMNS
+        after = _decode_cursor(req.sort_by, req.cursor) if keyset and req.cursor else None
+        if total_count is None:
+            total_count = await _count_within(budget, query, filters)
+        rows, _ = await queries.search_issues_fts(
+            query=query,
             sort_by=req.sort_by,
             limit=req.per_page,
-            offset=offset,
+            offset=0 if after else offset,
+            now=now,
+            after=after,
+            filters=filters,
+            total_count=_UNCOUNTED if total_count is None else total_count,
         )
-    except Exception:
-        logger.exception("FTS search failed for query: %s", req.query)
-        rows, total_count = [], 0
+        if total_count is None:
+            total_count = offset + len(rows)
+        next_cursor = None
+        if keyset and rows and len(rows) == req.per_page:
+            next_cursor = _encode_cursor(req.sort_by, rows[-1])
+        return rows, total_count, next_cursor, facets
+
+    # Two-phase: pull the best bm25 matches, then rerank them in Python
+    # with the configured (or per-request) weights and fetch just one page.
+    k = offset + req.per_page
+    candidates = await queries.search_candidates(
+        query=query,
+        limit=max(settings.search_candidate_limit, k),
+        now=now,
+        filters=filters,
+    )
+    ranked = rerank(candidates, weights_for(req), k=k, now=now)
+    rows = await queries.get_search_rows(ranked[offset:], now=now)
+    if total_count is None:
+        if len(candidates) < max(settings.search_candidate_limit, k):
+            total_count = len(candidates)
+        else:
+            total_count = await _count_within(budget, query, filters) or len(candidates)
+    return rows, total_count, None, facets
 
-    scored_items = [_row_to_scored_issue(row) for row in rows]
 
+def search_cache_key(req: SearchRequest) -> str:
+    """Normalize a request so equivalent searches share a cache entry."""
+    data = req.model_dump(mode="json", exclude={"enrich_top_n"})
+    data["query"] = " ".join(req.query.split())
+    for field in ("labels", "signals"):
+        if data[field]:
+            data[field] = sorted(set(data[field]))
+    return json.dumps(data, sort_keys=True)
+
+
+def _rate_limit_info() -> dict:
     rl = github_client.rate_limit
-    return SearchResponse(
-        total_count=total_count,
-        items=scored_items,
-        rate_limit=RateLimitInfo(
-            remaining=rl.remaining,
-            limit=rl.limit,
-            reset_at=rl.reset_at.isoformat() if rl.reset_at else None,
-        ),
+    return {
+        "remaining": rl.remaining,
+        "limit": rl.limit,
+        "reset_at": rl.reset_at.isoformat() if rl.reset_at else None,
+    }
+
+
+async def _fuzzy_search(
+    req: SearchRequest, total_count: int, budget: QueryBudget
+) -> tuple | None:
+    """Retry a search that found (almost) nothing with each term missing
+    from the index vocabulary ORed with its nearest spellings.
+
+    Returns (query, _run_search result, did_you_mean), or None when no term
+    has a correction, the retry finds no more, or it would overrun
+    ``fuzzy_budget_ms``.
+    """
+    deadline = time.monotonic() + settings.fuzzy_budget_ms / 1000
+    expansions = await suggest_service.corrections(parse_query(req.query).terms, deadline)
+    if not expansions:
+        return None
+    query, filters = compile_search(req, expansions)
+    try:
+        with budget.limit(deadline - time.monotonic()):
+            result = await _run_search(req, query, filters, budget)
+    except QueryTimeout:
+        logger.info("Spelling fallback over budget for query: %s", req.query)
+        return None
+    if result[1] <= total_count:
+        return None
+    did_you_mean = " ".join(
+        expansions[word.lower()][0] if word.lower() in expansions else word
+        for word in req.query.split()
+    )
+    return query, result, did_you_mean
+
+
+async def _search_page(req: SearchRequest) -> tuple:
+    """Run a search within ``search_timeout_ms``. Returns (total_count,
+    items, next_cursor, facets, did_you_mean, timed_out)."""
+    async with query_budget(settings.search_timeout_ms / 1000) as budget:
+        try:
+            return await _budgeted_search_page(req, budget)
+        except QueryTimeout:
+            # Not even one page fit in the budget: report the query as too
+            # broad.
+            logger.warning("Search ran out of time for query: %s", req.query)
+            return 0, [], None, None, None, True
+
+
+async def _budgeted_search_page(req: SearchRequest, budget: QueryBudget) -> tuple:
+    query, filters = compile_search(req)
+    rows, total_count, next_cursor, facets = await _run_search(req, query, filters, budget)
+    did_you_mean = None
+    if (
+        query
+        and total_count < settings.fuzzy_min_results
+        and req.mode == "keyword"
+        and req.page == 1
+        and not req.cursor
+    ):
+        fuzzy = await _fuzzy_search(req, total_count, budget)
+        if fuzzy:
+            query, (rows, total_count, next_cursor, facets), did_you_mean = fuzzy
+    snippets = await queries.get_body_snippets(query, [row["issue_id"] for row in rows])
+    items = [_row_to_item(row, snippets.get(row["issue_id"], "")) for row in rows]
+    return total_count, items, next_cursor, facets, did_you_mean, budget.timed_out
+
+
+async def _cached_search(req: SearchRequest) -> dict:
+    """Run (or reuse) a search. Errors propagate and are never cached, nor
+    are timed-out results: running out of time says more about the load at
+    that moment than about the query.
+
+    The payload shares its (cached) items with other responses, so callers
+    must treat it as read-only.
+    """
+    (
+        total_count, items, next_cursor, facets, did_you_mean, timed_out,
+    ) = await search_cache.get_or_compute(
+        search_cache_key(req), lambda: _search_page(req), cacheable=lambda page: not page[-1]
     )
+    return {
+        "total_count": total_count,
+        "items": items,
+        "next_cursor": next_cursor,
+        "facets": facets,
+        "did_you_mean": did_you_mean,
+        "timed_out": timed_out,
+        "rate_limit": _rate_limit_info(),
+    }
+
+
+async def search_result(req: SearchRequest) -> tuple[dict, bool]:
+    """search_payload(), and whether it is complete: False when the search
+    timed out or failed (and the payload is an empty stand-in)."""
+    try:
+        payload = await _cached_search(req)
+    except Exception:
+        logger.exception("FTS search failed for query: %s", req.query)
+        return {
+            "total_count": 0,
+            "items": [],
+            "next_cursor": None,
+            "facets": None,
+            "did_you_mean": None,
+            "timed_out": False,
+            "rate_limit": _rate_limit_info(),
+        }, False
+    return payload, not payload["timed_out"]
+
+
+async def search_payload(req: SearchRequest) -> dict:
+    """A search as a SearchResponse-shaped dict, ready for fast_json.dumps."""
+    payload, _ = await search_result(req)
+    return payload
+
+
+async def search_issues(req: SearchRequest) -> SearchResponse:
+    return SearchResponse.model_validate(await search_payload(req))
+
+
+async def search_batch(reqs: list[SearchRequest]) -> list[dict]:
+    """Run many searches concurrently, returning results in request order.
+
+    Each result is a SearchBatchResult-shaped dict. Identical requests (by
+    search_cache_key) run once, and requests that differ only in page or
+    sort share one COUNT via _count_matches. A failing request yields an
+    ``error`` entry without affecting the others.
+    """
+    semaphore = asyncio.Semaphore(settings.search_batch_concurrency)
+
+    async def run(req: SearchRequest) -> dict:
+        async with semaphore:
+            try:
+                return {"response": await _cached_search(req), "error": None}
+            except Exception as e:
+                logger.exception("Batch search failed for query: %s", req.query)
+                return {"response": None, "error": str(e) or type(e).__name__}
+
+    unique: dict[str, SearchRequest] = {}
+    keys = []
+    for req in reqs:
+        key = search_cache_key(req)
+        unique.setdefault(key, req)
+        keys.append(key)
+    results = await asyncio.gather(*(run(req) for req in unique.values()))
+    by_key = dict(zip(unique, results))
+    return [by_key[key] for key in keys]
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+from pathlib import Path
+
+from app.config import settings
+from app.db import queries
+from app.utils.embedding import HashingEncoder, SentenceTransformerEncoder, issue_text, np
+
+logger = logging.getLogger(__name__)
+
+# Approximate nearest-neighbour index over issue embeddings, kept in
+# settings.semantic_index_dir (default "<db_path>.vectors/"):
+#
+#   vectors.f16    float16 matrix, one row per slot, memory-mapped so only
+#                  the rows a search touches are paged in
+#   centroids.npy  IVF centroids, once semantic_ivf_min_vectors are indexed
+#   meta.json      encoder id, dim, capacity and the count the IVF was
+#                  trained on; rewritten (atomically) whenever the others are
+#
+# issue_embeddings in SQLite maps issue_id -> (slot, IVF list). Vectors are
+# flushed before their rows commit, so a slot a search can see always holds
+# its vector. Below the IVF threshold a search scans every vector; above it,
+# only the semantic_nprobe lists whose centroids are closest to the query.
+_MIN_CAPACITY = 1024
+_NLIST_MIN, _NLIST_MAX = 16, 4096
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_PER_LIST = 256
+_ASSIGN_CHUNK = 8192
+# Retrain once the index has grown this many times past its training set.
+_RETRAIN_GROWTH = 4
+
+_encoders: dict = {}
+_indexes: dict[Path, VectorIndex] = {}
+
+
+def _index_dir() -> Path | None:
+    if settings.semantic_index_dir:
+        return Path(settings.semantic_index_dir)
+    if settings.db_path == ":memory:":
+        return None
+    return Path(f"{settings.db_path}.vectors")
+
+
+def available() -> bool:
+    """Semantic search is enabled, numpy is installed and there is somewhere
+    to keep the index."""
+    return np is not None and settings.semantic_search_enabled and _index_dir() is not None
+
+
+def get_encoder():
+    key = settings.semantic_model or settings.semantic_dim
+    if key not in _encoders:
+        if settings.semantic_model:
+            _encoders[key] = SentenceTransformerEncoder(settings.semantic_model)
+        else:
+            _encoders[key] = HashingEncoder(settings.semantic_dim)
+    return _encoders[key]
+
+
+def _normalized(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        self.meta: dict | None = None
+        self.vectors = None
+        self.centroids = None
+        self._version = None
+
+    def _stat(self):
+        st = (self.path / "meta.json").stat()
+        return st.st_ino, st.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """Reopen the files if they changed (possibly in another process).
+        False when there is no index yet."""
+        try:
+            version = self._stat()
+        except FileNotFoundError:
+            self.meta = self.vectors = self.centroids = self._version = None
+            return False
+        if version != self._version:
+            self.meta = json.loads((self.path / "meta.json").read_text())
+            self.vectors = np.memmap(
+                self.path / "vectors.f16", dtype=np.float16, mode="r+",
+                shape=(self.meta["capacity"], self.meta["dim"]),
+            )
+            self.centroids = (
+                np.load(self.path / "centroids.npy") if self.meta["trained_count"] else None
+            )
+            self._version = version
+        return True
+
+    def _write_meta(self) -> None:
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(self.meta))
+        os.replace(tmp, self.path / "meta.json")
+        self._version = self._stat()
+
+    def create(self, encoder) -> None:
+        """Start an empty index for ``encoder``, discarding any other."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name in ("centroids.npy", "meta.json"):
+            (self.path / name).unlink(missing_ok=True)
+        self.vectors = np.memmap(
+            self.path / "vectors.f16", dtype=np.float16, mode="w+",
+            shape=(_MIN_CAPACITY, encoder.dim),
+        )
+        self.centroids = None
+        self.meta = {
+            "encoder": encoder.id, "dim": encoder.dim,
+            "capacity": _MIN_CAPACITY, "trained_count": 0,
+        }
+        self._write_meta()
+
+    def ensure_capacity(self, slots: int) -> None:
+        """Grow the vector file (by doubling) to hold ``slots`` rows.
+
+        The bigger file is written beside the old one and swapped in, so
+        readers still mapping the old file are unaffected.
+        """
+        capacity = self.meta["capacity"]
+        if slots <= capacity:
+            return
+        while capacity < slots:
+            capacity *= 2
+        tmp = self.path / "vectors.f16.tmp"
+        grown = np.memmap(tmp, dtype=np.float16, mode="w+", shape=(capacity, self.meta["dim"]))
+        grown[:self.meta["capacity"]] = self.vectors
+        grown.flush()
+        del grown
+        os.replace(tmp, self.path / "vectors.f16")
+        self.meta["capacity"] = capacity
+        self.vectors = np.memmap(
+            self.path / "vectors.f16", dtype=np.float16, mode="r+",
+            shape=(capacity, self.meta["dim"]),
+        )
+        self._write_meta()
+
+    def write(self, slots: list[int], vectors) -> None:
+        self.vectors[slots] = vectors.astype(np.float16)
+        self.vectors.flush()
+
+    def assign(self, vectors) -> list[int]:
+        """Nearest IVF list for each vector (-1 while untrained)."""
+        if self.centroids is None:
+            return [-1] * len(vectors)
+        return np.argmax(vectors @ self.centroids.T, axis=1).tolist()
+
+    def _kmeans(self, slots):
+        """Spherical k-means over a sample of the indexed vectors."""
+        nlist = min(len(slots), max(_NLIST_MIN, min(_NLIST_MAX, int(math.sqrt(len(slots))))))
+        rng = np.random.default_rng(0)
+        sample_size = nlist * _KMEANS_SAMPLE_PER_LIST
+        if len(slots) > sample_size:
+            slots = np.sort(rng.choice(slots, sample_size, replace=False))
+        data = self.vectors[slots].astype(np.float32)
+        centroids = data[rng.choice(len(data), nlist, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS):
+            nearest = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, data)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalized(sums)
+        return centroids
+
+    async def train(self) -> None:
+        """(Re)build the IVF centroids and move every vector to its list."""
+        rows = await queries.get_embedding_slots()
+        slots = np.fromiter((row["slot"] for row in rows), dtype=np.int64, count=len(rows))
+        centroids = await asyncio.to_thread(self._kmeans, slots)
+
+        assignments: list[tuple[int, int]] = []
+        for start in range(0, len(slots), _ASSIGN_CHUNK):
+            chunk = slots[start:start + _ASSIGN_CHUNK]
+            nearest = np.argmax(self.vectors[chunk].astype(np.float32) @ centroids.T, axis=1)
+            assignments.extend(zip(nearest.tolist(), chunk.tolist()))
+        await queries.update_embedding_lists(assignments)
+
+        with open(self.path / "centroids.npy.tmp", "wb") as f:
+            np.save(f, centroids)
+        os.replace(self.path / "centroids.npy.tmp", self.path / "centroids.npy")
+        self.centroids = centroids
+        self.meta["trained_count"] = len(slots)
+        self._write_meta()
+        logger.info("Trained IVF index: %d lists over %d vectors", len(centroids), len(slots))
+
+
+def get_index() -> VectorIndex:
+    path = _index_dir()
+    if path not in _indexes:
+        _indexes[path] = VectorIndex(path)
+    return _indexes[path]
+
+
+async def sync(
+    batch_size: int | None = None, cancel: asyncio.Event | None = None
+) -> int:
+    """Embed new and updated issues, growing the index in place.
+
+    Runs at the end of every score job. Issues are walked in issue_id
+    chunks; an updated issue overwrites its old slot. The whole index is
+    rebuilt only when the encoder changes. Returns count embedded.
+    """
+    if not available():
+        return 0
+    batch_size = batch_size or settings.score_batch_size
+    encoder = get_encoder()
+    index = get_index()
+
+    count, max_slot = await queries.get_embedding_stats()
+    if not index.refresh() or index.meta["encoder"] != encoder.id:
+        await queries.clear_embeddings()
+        index.create(encoder)
+        count, max_slot = 0, -1
+
+    next_slot = max_slot + 1
+    embedded = 0
+    after_issue_id = 0
+    while cancel is None or not cancel.is_set():
+        rows = await queries.get_unembedded_issues(after_issue_id, limit=batch_size)
+        if not rows:
+            break
+        vectors = encoder.encode([issue_text(row["title"], row["body"]) for row in rows])
+        slots = []
+        for row in rows:
+            if row["slot"] is None:
+                slots.append(next_slot)
+                next_slot += 1
+                count += 1
+            else:
+                slots.append(row["slot"])
+        index.ensure_capacity(next_slot)
+        index.write(slots, vectors)
+        await queries.upsert_embeddings_many(
+            list(zip((row["issue_id"] for row in rows), slots, index.assign(vectors)))
+        )
+        embedded += len(rows)
+        after_issue_id = rows[-1]["issue_id"]
+
+    trained = index.meta["trained_count"]
+    if count >= settings.semantic_ivf_min_vectors and (
+        not trained or count > _RETRAIN_GROWTH * trained
+    ):
+        await index.train()
+
+    logger.info("Embedded %d issues (%d indexed)", embedded, count)
+    return embedded
+
+
+async def search(text: str, k: int) -> list[int]:
+    """issue_ids of the ``k`` embeddings nearest to ``text``, best first.
+
+    Empty when the index has not been built (or was built by another
+    encoder), so callers can fall back to keyword search.
+    """
+    encoder = get_encoder()
+    index = get_index()
+    if not index.refresh() or index.meta["encoder"] != encoder.id or k <= 0:
+        return []
+    query = encoder.encode([text])[0]
+    if not query.any():
+        return []
+
+    if index.centroids is None:
+        rows = await queries.get_embedding_slots()
+    else:
+        nprobe = min(settings.semantic_nprobe, len(index.centroids))
+        lists = np.argpartition(-(index.centroids @ query), nprobe - 1)[:nprobe]
+        rows = await queries.get_embedding_slots([-1, *lists.tolist()])
+    rows = [row for row in rows if row["slot"] < index.meta["capacity"]]
+    if not rows:
+        return []
+
+    slots = np.fromiter((row["slot"] for row in rows), dtype=np.int64, count=len(rows))
+    scores = index.vectors[slots].astype(np.float32) @ query
+    top = min(k, len(scores))
+    best = np.argpartition(-scores, top - 1)[:top]
+    best = best[np.argsort(-scores[best])]
+    return [rows[i]["issue_id"] for i in best.tolist()]
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from app.config import settings
+from app.db import queries
+
+logger = logging.getLogger(__name__)
+
+# Prefixes up to this length get their best completions precomputed; those
+# are the ones whose key ranges are too wide to scan per keystroke.
+_PRECOMPUTED_LEN = 3
+MAX_SUGGESTIONS = 20
+
+# Words short enough that any correction is a guess are left alone.
+_MIN_CORRECTABLE_LEN = 4
+_PLAIN_WORD = re.compile(r"\w+")
+
+
+class PrefixIndex:
+    """Completions of a prefix, most weighted first.
+
+    Keys are lowercased and kept in one sorted list, so a prefix maps to a
+    contiguous range found by bisection. Several keys may complete to the
+    same value (a repo by owner and by name); each value is returned once.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, str, int]]):
+        items = sorted((key.lower(), value, weight) for key, value, weight in entries)
+        self._keys = [key for key, _, _ in items]
+        self._values = [value for _, value, _ in items]
+        self._weights = [weight for _, _, weight in items]
+
+        by_prefix: dict[str, list[int]] = defaultdict(list)
+        for i, key in enumerate(self._keys):
+            for n in range(1, min(len(key), _PRECOMPUTED_LEN) + 1):
+                by_prefix[key[:n]].append(i)
+        self._top = {
+            prefix: heapq.nlargest(2 * MAX_SUGGESTIONS, idxs, key=self._weights.__getitem__)
+            for prefix, idxs in by_prefix.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def complete(self, prefix: str, limit: int = 8) -> list[tuple[str, int]]:
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        if len(prefix) <= _PRECOMPUTED_LEN:
+            idxs = self._top.get(prefix, [])
+        else:
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+            idxs = heapq.nlargest(2 * limit, range(lo, hi), key=self._weights.__getitem__)
+
+        out: list[tuple[str, int]] = []
+        seen: set[str] = set()
+        for i in idxs:
+            value = self._values[i]
+            if value not in seen:
+                seen.add(value)
+                out.append((value, self._weights[i]))
+                if len(out) == limit:
+                    break
+        return out
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance counting adjacent transpositions as one edit,
+    or ``limit + 1`` as soon as it must exceed ``limit``."""
+    before: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], before[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return prev[-1]
+
+
+class TrigramIndex:
+    """Vocabulary terms by character trigram, for spelling corrections.
+
+    A term within k edits of a word shares most of its trigrams, so only
+    terms sharing enough of them are scored by edit distance.
+    """
+
+    def __init__(self, terms: Iterable[tuple[str, int]]):
+        self._terms: list[str] = []
+        self._docs: list[int] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for term, docs in terms:
+            for gram in _trigrams(term):
+                self._postings[gram].append(len(self._terms))
+            self._terms.append(term)
+            self._docs.append(docs)
+        self._known = set(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._known
+
+    def nearest(self, word: str, n: int = 3) -> list[str]:
+        """Up to ``n`` terms within 1 edit (2 for words over 4 characters),
+        closest first, then most widespread."""
+        max_edits = 1 if len(word) <= 4 else 2
+        grams = _trigrams(word)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        needed = max(1, len(grams) - 3 * max_edits)
+
+        scored = []
+        for i, count in shared.items():
+            term = self._terms[i]
+            if count < needed or abs(len(term) - len(word)) > max_edits:
+                continue
+            distance = _edit_distance(word, term, max_edits)
+            if distance <= max_edits:
+                scored.append((distance, -self._docs[i], term))
+        return [term for _, _, term in heapq.nsmallest(n, scored)]
+
+
+@dataclass(frozen=True)
+class _Suggester:
+    terms: PrefixIndex
+    repos: PrefixIndex
+    labels: PrefixIndex
+    vocab: TrigramIndex
+
+
+_suggester: _Suggester | None = None
+# The background build started while there was no index (see schedule_rebuild)
+_cold_build: asyncio.Task | None = None
+
+
+async def rebuild() -> None:
+    """Reload terms, repos and labels from the database. Run after a sync;
+    requests keep using the previous index until the new one is swapped in."""
+    global _suggester
+    terms = await queries.get_vocab_terms(
+        min_docs=settings.suggest_min_docs, limit=settings.suggest_max_terms
+    )
+    repos = await queries.get_all_repos()
+    labels = await queries.get_label_counts()
+
+    repo_entries = []
+    for repo in repos:
+        weight = repo["stars"] or 0
+        repo_entries.append((repo["full_name"], repo["full_name"], weight))
+        repo_entries.append((repo["name"], repo["full_name"], weight))
+
+    _suggester = _Suggester(
+        terms=PrefixIndex((row["term"], row["term"], row["doc"]) for row in terms),
+        repos=PrefixIndex(repo_entries),
+        labels=PrefixIndex((row["label"], row["label"], row["issues"]) for row in labels),
+        vocab=TrigramIndex((row["term"], row["doc"]) for row in terms),
+    )
+    logger.info(
+        "Rebuilt suggestions: %d terms, %d repos, %d labels",
+        len(terms), len(repos), len(labels),
+    )
+
+
+async def _rebuild_logged() -> None:
+    try:
+        await rebuild()
+    except Exception:
+        logger.exception("Building the suggestion index failed")
+
+
+def schedule_rebuild() -> asyncio.Task | None:
+    """Build the index in the background if there is none yet, unless that
+    build is already running. Returns the running build, if any.
+
+    Called at startup; requests that find no index call it too (in case
+    that build failed) and carry on without suggestions meanwhile.
+    """
+    global _cold_build
+    if _suggester is None and (_cold_build is None or _cold_build.done()):
+        _cold_build = asyncio.create_task(_rebuild_logged())
+    if _cold_build is not None and not _cold_build.done():
+        return _cold_build
+    return None
+
+
+def _items(completions: list[tuple[str, int]]) -> list[dict]:
+    return [{"value": value, "count": count} for value, count in completions]
+
+
+async def suggest(q: str, limit: int = 8) -> dict:
+    """SuggestResponse-shaped completions for the word being typed in ``q``.
+
+    ``repo:`` and ``label:`` prefixes (the query syntax filters) restrict
+    completions to that kind. A trailing space means the word is finished,
+    so nothing is suggested. Nothing is suggested either while the index is
+    still being built.
+    """
+    s = _suggester
+    if s is None:
+        schedule_rebuild()
+        return {"terms": [], "repos": [], "labels": []}
+    limit = min(limit, MAX_SUGGESTIONS)
+    if q.count('"') % 2:
+        # Inside an open quote: the word runs from the token holding it.
+        word = q[q.rfind(" ", 0, q.rfind('"')) + 1:]
+    else:
+        word = q.split()[-1] if q and not q[-1].isspace() else ""
+    word = word.lstrip("-")
+
+    field, _, rest = word.partition(":")
+    if rest or word.endswith(":"):
+        prefix = rest.strip('"')
+        if field.lower() == "repo":
+            return {"terms": [], "repos": _items(s.repos.complete(prefix, limit)), "labels": []}
+        if field.lower() == "label":
+            return {"terms": [], "repos": [], "labels": _items(s.labels.complete(prefix, limit))}
+
+    word = word.strip('"*')
+    return {
+        "terms": _items(s.terms.complete(word, limit)),
+        "repos": _items(s.repos.complete(word, limit)),
+        "labels": _items(s.labels.complete(word, limit)),
+    }
+
+
+async def corrections(
+    words: list[str], deadline: float | None = None
+) -> dict[str, list[str]]:
+    """Nearest vocabulary terms for each of ``words`` the vocabulary lacks,
+    keyed by the lowercased word.
+
+    Stops early once ``time.monotonic()`` passes ``deadline``, and finds
+    nothing while the index is still being built.
+    """
+    if _suggester is None:
+        schedule_rebuild()
+        return {}
+    vocab = _suggester.vocab
+    found: dict[str, list[str]] = {}
+    for word in words:
+        word = word.lower()
+        if (
+            len(word) < _MIN_CORRECTABLE_LEN
+            or not _PLAIN_WORD.fullmatch(word)
+            or word in vocab
+        ):
+            continue
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        nearest = vocab.nearest(word, settings.fuzzy_max_expansions)
+        if nearest:
+            found[word] = nearest
+    return found
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+
+from app.config import settings
+from app.db import queries
+from app.services.ingestion_service import comment_fields, issue_fields, repo_fields
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ("issues", "issue_comment")
+
+
+def verify_signature(body: bytes, signature: str | None) -> bool:
+    """Whether ``signature`` (X-Hub-Signature-256) is the HMAC-SHA256 of
+    ``body`` under the configured webhook secret."""
+    if not settings.github_webhook_secret or not signature:
+        return False
+    expected = hmac.new(
+        settings.github_webhook_secret.encode(), body, hashlib.sha256
+    ).hexdigest()
+    # Compared as bytes: compare_digest() rejects non-ASCII str, and header
+    # values arrive decoded as latin-1.
+    return hmac.compare_digest(f"sha256={expected}".encode(), signature.encode("latin-1"))
+
+
+class WriteQueue:
+    """Webhook updates, coalesced and written in batches.
+
+    Updates are keyed by id, so an issue edited five times between flushes
+    is written once. A flush runs ``webhook_flush_interval`` seconds after
+    the first queued update, or as soon as ``webhook_batch_size`` are
+    queued; callers queueing past that wait for it, which is the
+    backpressure. A batch that fails to write is merged back into the
+    queue and retried at the next flush, since its deliveries were already
+    acknowledged; an update that fails ``webhook_max_retries`` times is
+    dropped and logged, so one bad row cannot hold up the rest for good.
+    Updates still queued when the process dies are lost; GitHub lists the
+    deliveries for redelivery.
+    """
+
+    def __init__(self) -> None:
+        self._repos: dict[int, dict] = {}
+        self._issues: dict[int, dict] = {}
+        self._comments: dict[int, dict] = {}
+        self._deleted_comments: set[int] = set()
+        # Failed writes per queued update, keyed by ("repo" | "issue" | "comment", id)
+        self._attempts: dict[tuple[str, int], int] = {}
+        self._timer: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._closing = False
+        self.flushed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return (
+            len(self._repos) + len(self._issues)
+            + len(self._comments) + len(self._deleted_comments)
+        )
+
+    def _add(self, event: str, payload: dict) -> bool:
+        repository = payload.get("repository") or {}
+        issue = payload.get("issue") or {}
+        comment = payload.get("comment") or {}
+        action = payload.get("action")
+        if (
+            not repository.get("id")
+            or not issue.get("id")
+            or not issue.get("number")
+            or issue.get("pull_request")  # comments on PRs are issue_comment events too
+            or (event == "issue_comment" and not comment.get("id"))
+        ):
+            return False
+        if event == "issues" and action in ("deleted", "transferred"):
+            # The issue is gone from this repo; leave the row to the next sync.
+            return False
+
+        repo = repo_fields(
+            repository, (repository.get("owner") or {}).get("login", ""), repository.get("name", "")
+        )
+        self._repos[repo["repo_id"]] = repo
+        row = issue_fields(issue, repo["repo_id"])
+        self._put_issue(row)
+        # A new delivery gets its own retries.
+        self._attempts.pop(("repo", repo["repo_id"]), None)
+        self._attempts.pop(("issue", row["issue_id"]), None)
+
+        if event == "issue_comment":
+            self._attempts.pop(("comment", comment["id"]), None)
+            if action == "deleted":
+                self._comments.pop(comment["id"], None)
+                self._deleted_comments.add(comment["id"])
+            else:
+                self._deleted_comments.discard(comment["id"])
+                self._comments[comment["id"]] = comment_fields(comment, row["issue_id"])
+        return True
+
+    def _put_issue(self, row: dict) -> None:
+        """Queue an issue row unless a more recently updated one is queued."""
+        current = self._issues.get(row["issue_id"])
+        if current is None or (row["updated_at"] or "") >= (current["updated_at"] or ""):
+            self._issues[row["issue_id"]] = row
+
+    def _requeue(
+        self, repos: list[dict], issues: list[dict], comments: list[dict], deleted: list[int]
+    ) -> None:
+        """Merge a batch that failed to write back into the queue. Updates
+        queued since it was taken are newer, so they win."""
+        for repo in repos:
+            self._repos.setdefault(repo["repo_id"], repo)
+        for row in issues:
+            self._put_issue(row)
+        for comment in comments:
+            if comment["comment_id"] not in self._deleted_comments:
+                self._comments.setdefault(comment["comment_id"], comment)
+        for comment_id in deleted:
+            if comment_id not in self._comments:
+                self._deleted_comments.add(comment_id)
+
+    def _retryable(self, kind: str, ids: list[int]) -> tuple[set[int], list[int]]:
+        """Count a failed write against each update; returns the ids to
+        retry and those that have used up their retries."""
+        retry: set[int] = set()
+        exhausted: list[int] = []
+        for id_ in ids:
+            attempts = self._attempts.get((kind, id_), 0) + 1
+            if attempts > settings.webhook_max_retries:
+                self._attempts.pop((kind, id_), None)
+                exhausted.append(id_)
+            else:
+                self._attempts[(kind, id_)] = attempts
+                retry.add(id_)
+        return retry, exhausted
+
+    def _schedule(self) -> None:
+        if self._closing:
+            return
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def put(self, event: str, payload: dict) -> bool:
+        """Queue the update in an ``issues`` or ``issue_comment`` payload.
+        False if it was ignored (pull requests, deleted issues)."""
+        if not self._add(event, payload):
+            return False
+        if len(self) >= settings.webhook_batch_size:
+            await self.flush()
+        else:
+            self._schedule()
+        return True
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(settings.webhook_flush_interval)
+        self._timer = None
+        # Shielded so that cancelling the timer never abandons a batch mid-write.
+        await asyncio.shield(self.flush())
+
+    async def flush(self) -> bool:
+        """Write what is queued. False if the write failed; the batch is
+        then queued again and a retry scheduled."""
+        async with self._lock:
+            if not len(self):
+                return True
+            repos, issues = list(self._repos.values()), list(self._issues.values())
+            comments, deleted = list(self._comments.values()), list(self._deleted_comments)
+            self._repos, self._issues, self._comments = {}, {}, {}
+            self._deleted_comments = set()
+            try:
+                await queries.write_webhook_batch(repos, issues, comments, deleted)
+            except Exception:
+                self.failed += len(issues)
+                logger.exception(
+                    "Failed to write webhook batch (%d issues, %d comments); will retry",
+                    len(issues), len(comments),
+                )
+                retry_repos, _ = self._retryable("repo", [r["repo_id"] for r in repos])
+                retry_issues, dropped_issues = self._retryable(
+                    "issue", [row["issue_id"] for row in issues]
+                )
+                retry_comments, dropped_comments = self._retryable(
+                    "comment", [c["comment_id"] for c in comments] + deleted
+                )
+                if dropped_issues or dropped_comments:
+                    self.dropped += len(dropped_issues)
+                    logger.error(
+                        "Dropped webhook updates after %d failed writes: issues %s, comments %s",
+                        settings.webhook_max_retries + 1, dropped_issues, dropped_comments,
+                    )
+                self._requeue(
+                    [r for r in repos if r["repo_id"] in retry_repos],
+                    [row for row in issues if row["issue_id"] in retry_issues],
+                    [c for c in comments if c["comment_id"] in retry_comments],
+                    [comment_id for comment_id in deleted if comment_id in retry_comments],
+                )
+                self._schedule()
+                return False
+            # Everything queued with failed attempts was in this batch.
+            self._attempts.clear()
+            self.flushed += len(issues)
+            logger.info(
+                "Wrote webhook batch: %d issues, %d comments, %d deleted comments",
+                len(issues), len(comments), len(deleted),
+            )
+            return True
+
+    async def close(self) -> None:
+        """Write what is queued; run before the database is closed.
+
+        A flush already under way finishes first (flush() waits for it);
+        only a timer still sleeping is cancelled, and no retry is scheduled.
+        """
+        self._closing = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not await self.flush():
+            logger.error("Dropped %d queued webhook updates at shutdown", len(self))
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self),
+            "flushed_issues": self.flushed,
+            "failed_issues": self.failed,
+            "dropped_issues": self.dropped,
+        }
+
+
+write_queue = WriteQueue()
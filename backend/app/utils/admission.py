@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+
+class AdmissionPool:
+    """At most ``concurrency`` requests in flight and ``queue`` waiting.
+
+    A request that finds the queue full, or waits longer than
+    ``queue_timeout`` seconds, is rejected instead of piling up in front of
+    the database.
+    """
+
+    def __init__(self, concurrency: int, queue: int, queue_timeout: float) -> None:
+        self._slots = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if need be. False if rejected."""
+        if self._slots.locked() and self.waiting >= self.queue:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+# Expensive routes get budgets of their own, so a burst of exports or batch
+# searches cannot take the slots of plain searches. Routes not listed here
+# (issue detail, suggest, metrics) are cheap and never queued.
+POOLS: dict[str, AdmissionPool] = {
+    "search": AdmissionPool(
+        settings.admission_search_concurrency,
+        settings.admission_search_queue,
+        settings.admission_queue_timeout,
+    ),
+    "batch": AdmissionPool(
+        settings.admission_batch_concurrency,
+        settings.admission_batch_queue,
+        settings.admission_queue_timeout,
+    ),
+    "export": AdmissionPool(
+        settings.admission_export_concurrency,
+        settings.admission_export_queue,
+        settings.admission_queue_timeout,
+    ),
+}
+ROUTE_POOLS: dict[tuple[str, str], str] = {
+    ("POST", "/api/search"): "search",
+    ("POST", "/api/search/batch"): "batch",
+    ("GET", "/api/search/export"): "export",
+}
+
+
+def stats() -> dict:
+    return {name: pool.stats() for name, pool in POOLS.items()}
+
+
+class AdmissionControlMiddleware:
+    """Apply the route's AdmissionPool to each request; 503 with
+    Retry-After when it is rejected.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so a slot stays taken until
+    a streamed response (an export) has been sent in full.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        pools: dict[str, AdmissionPool] | None = None,
+        routes: dict[tuple[str, str], str] | None = None,
+    ) -> None:
+        self.app = app
+        self.pools = POOLS if pools is None else pools
+        self.routes = ROUTE_POOLS if routes is None else routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = None
+        if scope["type"] == "http":
+            name = self.routes.get((scope["method"], scope["path"]))
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        pool = self.pools[name]
+        if not await pool.acquire():
+            response = JSONResponse(
+                {"detail": "Server busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(settings.admission_retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release()
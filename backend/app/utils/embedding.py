@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # optional; semantic search is unavailable without it
+    np = None
+
+# Text encoders for semantic search (services/semantic_index.py). Every
+# encoder returns L2-normalized float32 rows, so a dot product is the cosine
+# similarity, and has an ``id`` recorded in the index: vectors from different
+# encoders are never compared.
+#
+# HashingEncoder needs nothing but numpy. Each word and each character
+# trigram of a word is hashed to HASH_DIMS signed positions (a sparse random
+# projection of the bag of features), weighted 1 + log(tf). Trigrams let
+# "crash"/"crashes"/"crashed" and "init"/"initialization" overlap where FTS5
+# tokens would not, but it is still lexical: true paraphrases need a model.
+HASH_DIMS = 4
+TRIGRAM_WEIGHT = 0.5
+# Only this much of a body is encoded; the title and opening carry the topic.
+MAX_TEXT_CHARS = 4000
+
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _feature_positions(feature: str, dim: int) -> tuple[tuple[int, ...], tuple[float, ...]]:
+    digest = hashlib.blake2b(feature.encode(), digest_size=2 * HASH_DIMS + 1).digest()
+    positions = tuple(
+        int.from_bytes(digest[2 * i:2 * i + 2], "little") % dim for i in range(HASH_DIMS)
+    )
+    signs = tuple(1.0 if digest[-1] >> i & 1 else -1.0 for i in range(HASH_DIMS))
+    return positions, signs
+
+
+def _features(text: str) -> Counter:
+    words = _WORD.findall(text.lower())
+    counts: Counter = Counter(words)
+    for word in words:
+        padded = f"<{word}>"
+        counts.update("#" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return counts
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEncoder:
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.id = f"hashing-v1-{dim}"
+
+    def encode(self, texts: list[str]):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            positions: list[int] = []
+            values: list[float] = []
+            for feature, tf in _features(text[:MAX_TEXT_CHARS]).items():
+                weight = 1.0 + math.log(tf)
+                if feature.startswith("#"):
+                    weight *= TRIGRAM_WEIGHT
+                idx, signs = _feature_positions(feature, self.dim)
+                positions.extend(idx)
+                values.extend(weight * sign for sign in signs)
+            np.add.at(out[row], positions, values)
+        return _normalize(out)
+
+
+class SentenceTransformerEncoder:
+    """A local sentence-transformers model, loaded from the name or path in
+    ``settings.semantic_model``. Nothing is downloaded at query time."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.id = f"st:{model_name}"
+
+    def encode(self, texts: list[str]):
+        vectors = self._model.encode(
+            [text[:MAX_TEXT_CHARS] for text in texts], convert_to_numpy=True
+        )
+        return _normalize(vectors.astype(np.float32))
+
+
+def issue_text(title: str | None, body: str | None) -> str:
+    return f"{title or ''}\n{body or ''}"
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json produces the same JSON
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode plain JSON data (dicts, lists, str, numbers, None) to bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for pre-shaped payloads.
+
+    Routes return it directly, so FastAPI skips response_model validation;
+    the payload must already match the declared model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
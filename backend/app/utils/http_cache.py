@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import hashlib
+import secrets
+import time
+
+from fastapi import Request, Response
+
+from app.config import settings
+from app.db.connection import get_generation
+
+# Generations restart from zero with the process, so tags also carry a
+# token unique to this process: a tag issued before a restart never matches.
+_PROCESS_TOKEN = secrets.token_hex(8)
+
+# For responses that must not be cached or revalidated, such as partial results
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+def etag(key: str) -> str:
+    """Strong ETag for the response to ``key`` at the current data generation.
+
+    No SQL is run, so it can be taken before the work it tags. The
+    generation only tracks writes made by this process, so the tag also
+    changes every ``search_cache_ttl`` seconds, which bounds how long a
+    write by another process (the CLI) goes unnoticed, as for search_cache.
+    """
+    window = int(time.time() // max(settings.search_cache_ttl, 1.0))
+    digest = hashlib.blake2b(
+        f"{_PROCESS_TOKEN}:{get_generation()}:{window}:{key}".encode(), digest_size=16
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def matches(request: Request, tag: str) -> bool:
+    """Whether the request's If-None-Match names ``tag``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in header.split(","))
+
+
+def headers(tag: str, cache_control: str) -> dict[str, str]:
+    return {"ETag": tag, "Cache-Control": cache_control}
+
+
+def not_modified(tag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers=headers(tag, cache_control))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from array import array
+
+# MinHash signatures for near-duplicate detection, using one-permutation
+# hashing: every shingle is hashed once and lands in one of NUM_PERM bins,
+# each bin keeping its minimum. Empty bins (short texts) borrow from the next
+# filled bin, offset by distance, so signatures of any length stay comparable.
+#
+# LSH splits a signature into BANDS bands of ROWS values; two issues become
+# candidates when any band matches exactly. With 16 x 4 the candidate
+# probability crosses 50% at a Jaccard similarity of about (1/16)^(1/4) = 0.5.
+#
+# Changing any constant here changes every signature: bump
+# text_analysis.RULES_VERSION so stored ones are recomputed.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+# Only this much of a body is shingled; pasted logs past it add little.
+MAX_TEXT_CHARS = 20_000
+
+_WORD = re.compile(r"\w+")
+_EMPTY = (1 << 64) - 1
+_BIN_BITS = 6  # log2(NUM_PERM)
+_DENSIFY_STEP = 1 << (64 - _BIN_BITS)
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(title: str, body: str | None) -> set[str]:
+    """Word ``SHINGLE_WORDS``-grams of the lowercased title and body."""
+    words = _WORD.findall(f"{title}\n{(body or '')[:MAX_TEXT_CHARS]}".lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def signature(title: str, body: str | None) -> array | None:
+    """NUM_PERM-value MinHash signature, or None for text without words."""
+    found = shingles(title, body)
+    if not found:
+        return None
+    sig = [_EMPTY] * NUM_PERM
+    for shingle in found:
+        h = _hash64(shingle.encode())
+        slot, value = h & (NUM_PERM - 1), h >> _BIN_BITS
+        if value < sig[slot]:
+            sig[slot] = value
+    filled = {i for i, v in enumerate(sig) if v != _EMPTY}
+    for i in range(NUM_PERM):
+        if i not in filled:
+            d = 1
+            while (i + d) % NUM_PERM not in filled:
+                d += 1
+            sig[i] = sig[(i + d) % NUM_PERM] + d * _DENSIFY_STEP
+    return array("Q", sig)
+
+
+def band_buckets(sig: array) -> list[int]:
+    """One bucket id per LSH band, as signed 64-bit ints for SQLite."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(sig[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for b in range(BANDS)
+    ]
+
+
+def to_blob(sig: array) -> bytes:
+    return sig.tobytes()
+
+
+def from_blob(blob: bytes) -> array:
+    sig = array("Q")
+    sig.frombytes(blob)
+    return sig
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity: the fraction of matching slots."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+# Search syntax accepted in SearchRequest.query:
+#
+#   memory leak          both terms (implicit AND)
+#   "memory leak"        phrase
+#   pars*                prefix
+#   parse OR lex         either term; binds tighter than the implicit AND
+#   -flaky / NOT flaky   exclude a term
+#   repo:owner/name  label:"good first issue"  lang:python  is:open|closed
+#
+# Every term is emitted as a quoted FTS5 string, so punctuation and FTS5
+# keywords (NEAR, AND, column filters) in user input are matched literally
+# rather than parsed. Anything malformed degrades to plain terms.
+
+_FIELD = re.compile(r"([A-Za-z]+):")
+_WORD = re.compile(r'[^\s"]+')
+_HAS_TOKEN = re.compile(r"\w")
+
+FIELDS = ("repo", "label", "lang", "is")
+_STATES = {"open", "closed"}
+
+
+@dataclass
+class ParsedQuery:
+    # FTS5 MATCH expression, or None when the query has no positive terms
+    text: str | None = None
+    # FTS5 expression for rows to drop when there are only negative terms
+    exclude_text: str | None = None
+    repo: str | None = None
+    language: str | None = None
+    state: str | None = None
+    labels: list[str] = field(default_factory=list)
+    # Positive terms as typed, without operators or quoting (for embedding)
+    terms: list[str] = field(default_factory=list)
+    # The same terms as an AND of OR-groups of (text, is_prefix), without
+    # expansions (for the percolator's term index)
+    term_groups: list[list[tuple[str, bool]]] = field(default_factory=list)
+
+
+@dataclass
+class _Token:
+    value: str
+    quoted: bool = False
+    negated: bool = False
+    prefix: bool = False
+    field: str | None = None
+
+
+def _tokenize(text: str) -> list[_Token]:
+    tokens: list[_Token] = []
+    i, n = 0, len(text)
+    while i < n:
+        if text[i].isspace():
+            i += 1
+            continue
+        tok = _Token("")
+        if text[i] == "-":
+            tok.negated = True
+            i += 1
+        m = _FIELD.match(text, i)
+        if m and m.group(1).lower() in FIELDS:
+            tok.field = m.group(1).lower()
+            i = m.end()
+        if i < n and text[i] == '"':
+            # An unbalanced quote runs to the end of the input.
+            end = text.find('"', i + 1)
+            end = n if end == -1 else end
+            tok.value, tok.quoted = text[i + 1:end], True
+            i = end + 1
+            if i < n and text[i] == "*":
+                tok.prefix = True
+                i += 1
+        else:
+            m = _WORD.match(text, i)
+            if m:
+                tok.value = m.group()
+                i = m.end()
+            if tok.value.endswith("*"):
+                tok.value, tok.prefix = tok.value.rstrip("*"), True
+        tokens.append(tok)
+    return tokens
+
+
+def _fts_term(tok: _Token) -> str | None:
+    """Quote a term for FTS5; None if it holds nothing the tokenizer indexes."""
+    if not _HAS_TOKEN.search(tok.value):
+        return None
+    term = '"' + tok.value.replace('"', '""') + '"'
+    return term + "*" if tok.prefix else term
+
+
+def _apply_field(parsed: ParsedQuery, tok: _Token) -> None:
+    # Negated field filters are not supported and are ignored.
+    value = tok.value.strip()
+    if tok.negated or not value:
+        return
+    if tok.field == "repo":
+        parsed.repo = value
+    elif tok.field == "lang":
+        parsed.language = value
+    elif tok.field == "label":
+        parsed.labels.append(value)
+    elif tok.field == "is" and value.lower() in _STATES:
+        parsed.state = value.lower()
+
+
+def parse_query(text: str, expansions: dict[str, list[str]] | None = None) -> ParsedQuery:
+    """Parse search syntax into an FTS5 expression plus field filters.
+
+    Never raises: unknown fields are searched as plain text, unbalanced
+    quotes are closed at the end of the input, and stray operators are
+    dropped. Repeated repo:/lang:/is: filters keep the last value; repeated
+    label: filters must all match.
+
+    ``expansions`` maps lowercased plain terms to alternatives that are
+    ORed with them (spelling corrections); phrases and prefixes are kept.
+    """
+    parsed = ParsedQuery()
+    groups: list[list[str]] = []  # AND of OR-groups
+    negatives: list[str] = []
+    join_or = negate_next = False
+
+    for tok in _tokenize(text or ""):
+        if tok.field:
+            _apply_field(parsed, tok)
+            join_or = negate_next = False
+            continue
+        if not tok.quoted and not tok.negated and not tok.prefix:
+            if tok.value == "OR":
+                join_or = bool(groups)
+                continue
+            if tok.value == "AND":
+                continue
+            if tok.value == "NOT":
+                negate_next = True
+                continue
+        term = _fts_term(tok)
+        if term is None:
+            continue
+        alternatives = [term]
+        if expansions and not (tok.quoted or tok.prefix):
+            alternatives += [
+                _fts_term(_Token(alt)) for alt in expansions.get(tok.value.lower(), ())
+            ]
+        if tok.negated or negate_next:
+            negatives.append(term)
+        elif join_or:
+            groups[-1].extend(alternatives)
+            parsed.terms.append(tok.value)
+            parsed.term_groups[-1].append((tok.value, tok.prefix))
+        else:
+            groups.append(alternatives)
+            parsed.terms.append(tok.value)
+            parsed.term_groups.append([(tok.value, tok.prefix)])
+        join_or = negate_next = False
+
+    positive = " AND ".join(
+        group[0] if len(group) == 1 else "(" + " OR ".join(group) + ")"
+        for group in groups
+    )
+    negative = " OR ".join(negatives)
+    if positive and negative:
+        parsed.text = f"({positive}) NOT ({negative})"
+    elif positive:
+        parsed.text = positive
+    elif negative:
+        parsed.exclude_text = negative
+    return parsed
@@ -2,6 +2,11 @@ from __future__ import annotations
 
 import re
 
+# Bump whenever a regex below, the shape of extract_features() or the MinHash
+# parameters in utils/minhash.py change. Issues scored under an older version
+# are re-extracted from their body.
+RULES_VERSION = 2
+
 _REPRO_KEYWORDS = re.compile(
     r"(steps\s+to\s+reproduce|how\s+to\s+reproduce|reproduction\s+steps|"
     r"repro\s+steps|minimal\s+reproduc|expected\s+behavio[ur]|actual\s+behavio[ur])",
@@ -0,0 +1,95 @@
+"""Microbenchmark: building and encoding one page of search results.
+
+Compares the old path (pydantic models per row, then FastAPI's response_model
+validation + serialization and JSONResponse encoding) with the fast path
+(row dicts encoded by utils/fast_json). Both start from the same row dicts,
+so the difference is exactly the model and encoding overhead.
+
+    cd backend && python -m benchmarks.bench_serialization [per_page]
+"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+
+from pydantic import TypeAdapter
+
+from app.models.schemas import (
+    FixabilityBreakdown,
+    FixabilityResult,
+    IssueResult,
+    RepoSummary,
+    ScoredIssue,
+    SearchResponse,
+)
+from app.services.search_service import _row_to_item
+from app.utils import fast_json
+
+
+def _fake_row(n: int) -> dict:
+    return {
+        "issue_id": n, "number": n, "title": f"Crash when parsing file {n}",
+        "html_url": f"https://github.com/owner/repo/issues/{n}", "state": "open",
+        "created_at": "2026-02-01T00:00:00Z", "updated_at": "2026-02-10T00:00:00Z",
+        "comments_count": n % 7, "labels": '["bug", "good first issue"]',
+        "user_login": "someone", "repo_full_name": "owner/repo", "stars": 1234,
+        "open_issues_count": 56, "language": "Python",
+        "pushed_at": "2026-02-15T00:00:00Z", "archived": 0,
+        "effective_score": 61.5, "has_steps_to_reproduce": 1,
+        "has_expected_vs_actual": 0, "has_stack_trace": 1, "has_code_block": 1,
+        "maintainer_replied": 1, "env_detail_count": 2,
+    }
+
+
+_response_adapter = TypeAdapter(SearchResponse)
+
+
+def models_path(items: list[dict]) -> bytes:
+    scored = [
+        ScoredIssue(
+            issue=IssueResult(**item["issue"]),
+            repo_summary=RepoSummary(**item["repo_summary"]),
+            fixability=FixabilityResult(
+                score=item["fixability"]["score"],
+                grade=item["fixability"]["grade"],
+                breakdown=FixabilityBreakdown(**item["fixability"]["breakdown"]),
+                enriched=item["fixability"]["enriched"],
+            ),
+        )
+        for item in items
+    ]
+    response = SearchResponse(total_count=len(scored), items=scored)
+    # What FastAPI does with a response_model, then JSONResponse.render().
+    validated = _response_adapter.validate_python(response, from_attributes=True)
+    content = _response_adapter.dump_python(validated, mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode()
+
+
+def fast_path(items: list[dict]) -> bytes:
+    return fast_json.dumps({
+        "total_count": len(items), "items": items, "next_cursor": None,
+        "facets": None, "did_you_mean": None, "timed_out": False,
+        "rate_limit": {"remaining": -1, "limit": -1, "reset_at": None},
+    })
+
+
+def main() -> None:
+    per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rows = [_fake_row(n) for n in range(per_page)]
+    assert json.loads(models_path([_row_to_item(r) for r in rows])) == json.loads(
+        fast_path([_row_to_item(r) for r in rows])
+    )
+    print(f"{per_page} results per page, encoder: "
+          f"{'orjson' if fast_json.orjson else 'json'}")
+    for name, encode in (("models", models_path), ("fast", fast_path)):
+        runs, total = timeit.Timer(
+            lambda: encode([_row_to_item(r) for r in rows])
+        ).autorange()
+        print(f"  {name:>6}: {total / runs * 1e3:7.3f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
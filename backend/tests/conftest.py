@@ -6,6 +6,8 @@ from pathlib import Path
 from unittest.mock import patch
 
 from app.db.connection import init_db, close_db, get_db
+from app.services.feature_service import SCORE_RULES_VERSION
+from app.utils.text_analysis import RULES_VERSION as TEXT_RULES_VERSION
 
 
 @pytest_asyncio.fixture
@@ -74,43 +76,25 @@ async def seeded_db(db):
 
     # Insert issue features
     await db.execute(
-        """INSERT INTO issue_features (issue_id, fixability_score, grade, reasons, features, computed_at)
-           VALUES (101, 76, 'B', ?, ?, '2026-02-10T00:00:00Z')""",
-        (
-            json.dumps(["+8 steps to reproduce", "+3 code block", "+10 maintainer replied"]),
-            json.dumps({
-                "has_steps_to_reproduce": True,
-                "has_expected_vs_actual": True,
-                "has_stack_trace": False,
-                "has_code_block": True,
-                "env_detail_count": 0,
-                "maintainer_replied": True,
-                "labels": ["bug", "good first issue"],
-                "state": "open",
-                "comments_count": 5,
-                "days_old": 16,
-            }),
-        ),
+        """INSERT INTO issue_features (issue_id, fixability_score, grade, reason_codes,
+                                       has_steps_to_reproduce, has_expected_vs_actual,
+                                       has_stack_trace, has_code_block, env_detail_count,
+                                       maintainer_replied, computed_at,
+                                       text_rules_version, score_rules_version)
+           VALUES (101, 76, 'B', 'repro,code,maintainer', 1, 1, 0, 1, 0, 1,
+                   '2026-02-10T00:00:00Z', ?, ?)""",
+        (TEXT_RULES_VERSION, SCORE_RULES_VERSION),
     )
 
     await db.execute(
-        """INSERT INTO issue_features (issue_id, fixability_score, grade, reasons, features, computed_at)
-           VALUES (102, 23, 'D', ?, ?, '2026-01-15T00:00:00Z')""",
-        (
-            json.dumps(["-10 closed"]),
-            json.dumps({
-                "has_steps_to_reproduce": False,
-                "has_expected_vs_actual": False,
-                "has_stack_trace": False,
-                "has_code_block": False,
-                "env_detail_count": 0,
-                "maintainer_replied": False,
-                "labels": ["bug"],
-                "state": "closed",
-                "comments_count": 12,
-                "days_old": 47,
-            }),
-        ),
+        """INSERT INTO issue_features (issue_id, fixability_score, grade, reason_codes,
+                                       has_steps_to_reproduce, has_expected_vs_actual,
+                                       has_stack_trace, has_code_block, env_detail_count,
+                                       maintainer_replied, computed_at,
+                                       text_rules_version, score_rules_version)
+           VALUES (102, 23, 'D', 'closed', 0, 0, 0, 0, 0, 0,
+                   '2026-01-15T00:00:00Z', ?, ?)""",
+        (TEXT_RULES_VERSION, SCORE_RULES_VERSION),
     )
 
     await db.commit()
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.utils.admission import AdmissionControlMiddleware, AdmissionPool
+
+
+@pytest.mark.asyncio
+async def test_pool_queues_then_rejects():
+    pool = AdmissionPool(concurrency=1, queue=1, queue_timeout=5)
+    assert await pool.acquire()
+
+    waiter = asyncio.create_task(pool.acquire())
+    await asyncio.sleep(0)
+    assert pool.waiting == 1
+    assert not await pool.acquire()  # queue full: rejected without waiting
+
+    pool.release()
+    assert await waiter
+    assert pool.stats()["in_flight"] == 1 and pool.stats()["rejected"] == 1
+
+    slow = AdmissionPool(concurrency=1, queue=5, queue_timeout=0.01)
+    assert await slow.acquire()
+    assert not await slow.acquire()  # waited too long
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_load_per_route():
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.post("/api/search")
+    async def search():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/api/other")
+    async def other():
+        return {"ok": True}
+
+    pools = {"search": AdmissionPool(concurrency=1, queue=0, queue_timeout=5)}
+    app.add_middleware(
+        AdmissionControlMiddleware, pools=pools, routes={("POST", "/api/search"): "search"}
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.post("/api/search"))
+        while pools["search"].in_flight == 0:
+            await asyncio.sleep(0.001)
+
+        busy = await client.post("/api/search")
+        assert busy.status_code == 503
+        assert busy.headers["Retry-After"] == "1"
+        # Routes outside the pool are unaffected.
+        assert (await client.get("/api/other")).status_code == 200
+
+        release.set()
+        assert (await first).status_code == 200
+        assert pools["search"].in_flight == 0
@@ -1,4 +1,6 @@
 import json
+import sqlite3
+from datetime import datetime, timezone
 import pytest
 
 from app.db import queries
@@ -58,6 +60,12 @@ async def test_get_comments_for_issue(seeded_db):
     assert len(comments) == 1
     assert comments[0]["author_association"] == "MEMBER"
 
+    await queries.upsert_comment(
+        comment_id=202, issue_id=101, body="x" * 500, created_at="2026-02-03T00:00:00Z"
+    )
+    comments = await queries.get_comments_for_issue(101, limit=1, body_chars=4)
+    assert [c["body"] for c in comments] == ["Look"]
+
 
 @pytest.mark.asyncio
 async def test_get_dirty_issues(db):
@@ -80,3 +88,356 @@ async def test_get_dirty_issues(db):
     dirty = await queries.get_dirty_issues()
     assert len(dirty) == 1
     assert dirty[0]["issue_id"] == 301
+
+
+@pytest.mark.asyncio
+async def test_effective_score_applies_staleness_at_query_time(seeded_db):
+    # Issue 42 was created 2026-02-01 with a stored base score of 76.
+    fresh = datetime(2026, 2, 20, tzinfo=timezone.utc)
+    aging = datetime(2026, 5, 15, tzinfo=timezone.utc)
+    stale = datetime(2026, 9, 1, tzinfo=timezone.utc)
+
+    for now, expected in ((fresh, 76), (aging, 72), (stale, 68)):
+        row = await queries.get_issue_by_repo_and_number("owner", "repo", 42, now=now)
+        assert row["fixability_score"] == 76
+        assert row["effective_score"] == expected
+
+    rows, _ = await queries.search_issues_fts("parse", now=stale)
+    assert rows[0]["effective_score"] == 68
+
+
+@pytest.mark.asyncio
+async def test_init_db_adds_columns_to_existing_tables(tmp_path):
+    import sqlite3
+    from unittest.mock import patch
+
+    from app.db.connection import close_db, get_db, init_db
+
+    db_path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute(
+        """CREATE TABLE issue_features (
+               issue_id INTEGER PRIMARY KEY,
+               fixability_score REAL NOT NULL DEFAULT 0,
+               grade TEXT NOT NULL DEFAULT 'F',
+               reasons TEXT NOT NULL DEFAULT '[]',
+               features TEXT NOT NULL DEFAULT '{}',
+               computed_at TEXT
+           )"""
+    )
+    legacy.execute(
+        """INSERT INTO issue_features (issue_id, fixability_score, features)
+           VALUES (1, 60, '{"has_stack_trace": true, "env_detail_count": 2}')"""
+    )
+    legacy.commit()
+    legacy.close()
+
+    with patch("app.db.connection.settings") as mock_settings:
+        mock_settings.db_path = str(db_path)
+        await init_db()
+        try:
+            db = await get_db()
+            cursor = await db.execute("SELECT * FROM issue_features")
+            row = await cursor.fetchone()
+            assert row["fixability_score"] == 60
+            assert row["text_rules_version"] == 0
+            assert row["has_stack_trace"] == 1
+            assert row["env_detail_count"] == 2
+            assert "features" not in row.keys()
+        finally:
+            await close_db()
+
+
+async def _comment_stats(db, issue_id: int):
+    cursor = await db.execute(
+        "SELECT * FROM issue_comment_stats WHERE issue_id = ?", (issue_id,)
+    )
+    return await cursor.fetchone()
+
+
+@pytest.mark.asyncio
+async def test_comment_stats_maintained_by_triggers(seeded_db):
+    stats = await _comment_stats(seeded_db, 101)
+    assert stats["comment_count"] == 1
+    assert stats["maintainer_replied"] == 1
+    assert stats["first_maintainer_response_at"] == "2026-02-02T00:00:00Z"
+
+    await queries.upsert_comment(202, 101, "Same here", "testuser", "NONE",
+                                 created_at="2026-02-03T00:00:00Z")
+    await queries.upsert_comment(203, 101, "Me too", "testuser", "NONE",
+                                 created_at="2026-02-04T00:00:00Z")
+    await queries.upsert_comment(204, 101, "Earlier reply", "owner1", "OWNER",
+                                 created_at="2026-02-01T12:00:00Z")
+    stats = await _comment_stats(seeded_db, 101)
+    assert stats["comment_count"] == 4
+    assert stats["commenter_count"] == 3
+    assert stats["first_maintainer_response_at"] == "2026-02-01T12:00:00Z"
+    assert stats["last_comment_at"] == "2026-02-04T00:00:00Z"
+
+    # Re-syncing an unchanged comment is a no-op for the aggregates.
+    await queries.upsert_comment(203, 101, "Me too (edited)", "testuser", "NONE",
+                                 created_at="2026-02-04T00:00:00Z")
+    assert (await _comment_stats(seeded_db, 101))["comment_count"] == 4
+
+    await seeded_db.execute("DELETE FROM comments WHERE comment_id IN (201, 204)")
+    await seeded_db.commit()
+    stats = await _comment_stats(seeded_db, 101)
+    assert stats["comment_count"] == 2
+    assert stats["commenter_count"] == 1
+    assert stats["maintainer_replied"] == 0
+    assert stats["first_maintainer_response_at"] is None
+
+    await seeded_db.execute("DELETE FROM comments WHERE issue_id = 101")
+    await seeded_db.commit()
+    assert await _comment_stats(seeded_db, 101) is None
+
+
+@pytest.mark.asyncio
+async def test_init_db_backfills_comment_stats(tmp_path):
+    from unittest.mock import patch
+
+    from app.db.connection import close_db, get_db, init_db
+
+    with patch("app.db.connection.settings") as mock_settings:
+        mock_settings.db_path = str(tmp_path / "stats.db")
+        await init_db()
+        db = await get_db()
+        await db.execute("INSERT INTO repos (repo_id, full_name, owner, name) VALUES (1, 'o/r', 'o', 'r')")
+        await db.execute("INSERT INTO issues (issue_id, repo_id, number) VALUES (1, 1, 1)")
+        await db.execute(
+            """INSERT INTO comments (comment_id, issue_id, user_login, author_association, created_at)
+               VALUES (1, 1, 'a', 'MEMBER', '2026-01-02T00:00:00Z'),
+                      (2, 1, 'b', 'NONE', '2026-01-03T00:00:00Z')"""
+        )
+        # Simulate a database created before issue_comment_stats existed.
+        await db.execute("DROP TABLE issue_comment_stats")
+        await db.commit()
+        await close_db()
+
+        await init_db()
+        try:
+            stats = await _comment_stats(await get_db(), 1)
+            assert stats["comment_count"] == 2
+            assert stats["commenter_count"] == 2
+            assert stats["maintainer_replied"] == 1
+            assert stats["last_comment_at"] == "2026-01-03T00:00:00Z"
+        finally:
+            await close_db()
+
+
+async def _query_plan(db, sql: str, params: list) -> str:
+    cursor = await db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return "\n".join(row["detail"] for row in await cursor.fetchall())
+
+
+@pytest.mark.asyncio
+async def test_search_filters_use_indexes(seeded_db):
+    filters = queries.SearchFilters(
+        state="open",
+        updated_after="2026-01-01T00:00:00Z",
+        language="Python",
+        min_stars=1000,
+        exclude_archived=True,
+    )
+    # Large match set: walk issues(state, COALESCE(updated_at, '')) in sort order
+    sql, params = queries._search_sql(
+        "parse", filters, sort_by="updated",
+        total_count=queries._INDEX_WALK_MIN_MATCHES,
+    )
+    plan = await _query_plan(seeded_db, sql, params)
+    assert "USING INDEX idx_issues_state_updated_key (state=? AND <expr>>?)" in plan
+    assert "USING COVERING INDEX idx_repos_language_stars (language=? AND stars>?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+    sql, params = queries._search_sql("parse", queries.SearchFilters(repo="owner/repo"))
+    plan = await _query_plan(seeded_db, sql, params)
+    assert "sqlite_autoindex_repos_1 (full_name=?)" in plan
+
+
+@pytest.mark.asyncio
+async def test_search_filters_applied(seeded_db):
+    async def numbers(**kwargs) -> set[int]:
+        rows, total = await queries.search_issues_fts(
+            "parse OR handler", queries.SearchFilters(**kwargs)
+        )
+        assert total == len(rows)
+        return {row["number"] for row in rows}
+
+    assert await numbers() == {42, 43}
+    assert await numbers(created_after="2026-01-15T00:00:00Z") == {42}
+    assert await numbers(updated_after="2026-02-10T00:00:00Z") == {42}
+    assert await numbers(min_stars=1000, exclude_archived=True) == {42, 43}
+    assert await numbers(min_stars=1001) == set()
+    assert await numbers(repo="owner/repo", state="closed") == {43}
+    assert await numbers(repo="other/repo") == set()
+
+
+@pytest.mark.asyncio
+async def test_label_filter_matches_wildcards_literally(seeded_db):
+    await queries.upsert_issue(
+        issue_id=301, repo_id=1, number=301, title="Percent parse", body="parse",
+        labels=["100%_done"], created_at="2026-02-01T00:00:00Z",
+    )
+
+    async def numbers(label: str) -> set[int]:
+        rows, _ = await queries.search_issues_fts("parse", queries.SearchFilters(labels=[label]))
+        return {row["number"] for row in rows}
+
+    assert await numbers("100%_done") == {301}
+    # "%" and "_" are not LIKE wildcards in a label filter.
+    assert await numbers("%") == set()
+    assert await numbers("100%") == set()
+    assert await numbers("100__done") == set()
+
+
+@pytest.mark.asyncio
+async def test_read_pool_serves_searches(tmp_path, monkeypatch):
+    from app.db import connection
+
+    monkeypatch.setattr(connection.settings, "db_path", str(tmp_path / "pool.db"))
+    monkeypatch.setattr(connection.settings, "read_pool_size", 2)
+    await connection.init_db()
+    try:
+        main = await connection.get_db()
+        readers = {id(await connection.get_read_db()) for _ in range(4)}
+        assert len(readers) == 2 and id(main) not in readers
+
+        await queries.upsert_repo(repo_id=1, full_name="o/r", owner="o", name="r")
+        await queries.upsert_issue(
+            issue_id=1, repo_id=1, number=1, title="Pool crash", body="",
+            created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+        )
+        # Writes committed on the main connection are visible to readers.
+        rows, total = await queries.search_issues_fts("crash")
+        assert total == 1 and rows[0]["number"] == 1
+
+        reader = await connection.get_read_db()
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            await reader.execute("DELETE FROM issues")
+    finally:
+        await connection.close_db()
+
+
+@pytest.mark.asyncio
+async def test_export_stream_reads_on_its_own_connection(tmp_path, monkeypatch):
+    from app.db import connection
+
+    monkeypatch.setattr(connection.settings, "db_path", str(tmp_path / "export.db"))
+    await connection.init_db()
+    try:
+        await queries.upsert_repo(repo_id=1, full_name="o/r", owner="o", name="r")
+        for n in range(3):
+            await queries.upsert_issue(
+                issue_id=n + 1, repo_id=1, number=n + 1, title=f"Export crash {n}", body="",
+            )
+        opened = []
+        connect = connection.aiosqlite.connect
+
+        async def tracking_connect(*args, **kwargs):
+            conn = await connect(*args, **kwargs)
+            opened.append(conn)
+            return conn
+
+        monkeypatch.setattr(connection.aiosqlite, "connect", tracking_connect)
+        pool = {id(conn) for conn in connection._read_pool}
+        stream = queries.iter_search_rows("crash", chunk_size=2)
+        assert [row["issue_id"] for row in await anext(stream)] == [1, 2]
+        assert len(opened) == 1 and id(opened[0]) not in pool
+        await stream.aclose()
+        # Closed with the stream, not returned to any pool.
+        with pytest.raises(ValueError):
+            await opened[0].execute("SELECT 1")
+    finally:
+        await connection.close_db()
+
+
+_SLOW_SQL = """WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n)
+               SELECT COUNT(*) FROM (SELECT x FROM n LIMIT 100000000)"""
+
+
+@pytest.mark.asyncio
+async def test_query_budget_aborts_and_cancels_statements(tmp_path, monkeypatch):
+    import asyncio
+    import time
+
+    from app.db import connection
+    from app.db.connection import QueryTimeout, query_budget
+
+    monkeypatch.setattr(connection.settings, "db_path", str(tmp_path / "budget.db"))
+    monkeypatch.setattr(connection.settings, "read_pool_size", 1)
+    await connection.init_db()
+    try:
+        start = time.monotonic()
+        with pytest.raises(QueryTimeout):
+            async with query_budget(0.05):
+                db = await connection.get_read_db()
+                await db.execute(_SLOW_SQL)
+        assert time.monotonic() - start < 2
+
+        # A soft limit aborts its own step and leaves the rest of the budget.
+        async with query_budget(5) as budget:
+            db = await connection.get_read_db()
+            with pytest.raises(QueryTimeout):
+                with budget.limit(0.05):
+                    await db.execute(_SLOW_SQL)
+            cursor = await db.execute("SELECT 1")
+            assert (await cursor.fetchone())[0] == 1
+        # The connection went back to the idle list and is reused.
+        assert len(connection._budget_idle) == 1
+
+        async def slow_search():
+            async with query_budget(60):
+                db = await connection.get_read_db()
+                await db.execute(_SLOW_SQL)
+
+        task = asyncio.create_task(slow_search())
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert time.monotonic() - start < 2
+    finally:
+        await connection.close_db()
+
+
+@pytest.mark.asyncio
+async def test_write_transactions_do_not_interleave(db):
+    import asyncio
+
+    from app.db.connection import write_transaction
+
+    async def failing_batch():
+        async with write_transaction() as conn:
+            await conn.execute(
+                "INSERT INTO repos (repo_id, full_name, owner, name) VALUES (50, 'a/b', 'a', 'b')"
+            )
+            await asyncio.sleep(0.01)  # let the other writer run if it can
+            raise RuntimeError("batch failed")
+
+    results = await asyncio.gather(
+        failing_batch(),
+        queries.upsert_repo(repo_id=51, full_name="c/d", owner="c", name="d"),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], RuntimeError) and results[1] is None
+    # The other writer neither committed half the failed batch nor lost its
+    # own row to that batch's rollback.
+    assert await queries.get_repo_by_name("a", "b") is None
+    assert await queries.get_repo_by_name("c", "d") is not None
+
+
+@pytest.mark.asyncio
+async def test_issue_row_reports_maintainer_reply_before_rescoring(seeded_db):
+    await queries.upsert_issue(
+        issue_id=800, repo_id=1, number=800, title="Fresh", body="",
+        created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+    )
+    await queries.upsert_comment(
+        comment_id=900, issue_id=800, body="Looking into it.", user_login="owner",
+        author_association="MEMBER", created_at="2026-02-02T00:00:00Z",
+    )
+    row = await queries.get_issue_by_repo_and_number("owner", "repo", 800)
+    assert row["maintainer_replied"] == 0  # the features are not rescored yet
+    assert row["comments_maintainer_replied"] == 1
+    assert row["first_maintainer_response_at"] == "2026-02-02T00:00:00Z"
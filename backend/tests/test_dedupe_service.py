@@ -0,0 +1,76 @@
+import pytest
+
+from app.db import queries
+from app.services.dedupe_service import find_duplicates, similar_closed
+from app.services.feature_service import score_all_dirty
+from app.utils import minhash
+
+CRASH_BODY = (
+    "When I open a project with more than one workspace folder the extension "
+    "host crashes immediately with an unhandled promise rejection in the "
+    "language server client. Restarting the window does not help and the "
+    "output panel shows the same stack every time."
+)
+
+
+def test_minhash_similarity_tracks_overlap():
+    a = minhash.signature("Extension host crash", CRASH_BODY)
+    assert minhash.similarity(a, minhash.signature("Extension host crash", CRASH_BODY)) == 1.0
+
+    near = minhash.signature("Extension host crashes", CRASH_BODY + " Any ideas?")
+    far = minhash.signature("Dark theme colors", "The sidebar uses the wrong accent color.")
+    assert minhash.similarity(a, near) > 0.7
+    assert minhash.similarity(a, far) < 0.2
+    assert minhash.band_buckets(a) == minhash.band_buckets(minhash.from_blob(minhash.to_blob(a)))
+
+    assert minhash.signature("", "") is None
+    assert len(minhash.signature("hi", None)) == minhash.NUM_PERM
+
+
+async def _seed(db) -> None:
+    await queries.upsert_repo(repo_id=2, full_name="other/fork", owner="other", name="fork")
+    for issue_id, repo_id, state, title, body in [
+        (700, 1, "open", "Extension host crash", CRASH_BODY),
+        (701, 1, "closed", "Extension host crashes", CRASH_BODY + " Any ideas?"),
+        (702, 2, "closed", "Extension host crash on startup", CRASH_BODY),
+        (703, 1, "closed", "Dark theme colors", "The sidebar uses the wrong accent color."),
+    ]:
+        await queries.upsert_issue(
+            issue_id=issue_id, repo_id=repo_id, number=issue_id, title=title,
+            body=body, state=state,
+            created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+        )
+    await score_all_dirty()
+
+
+@pytest.mark.asyncio
+async def test_similar_closed_from_lsh_index(seeded_db):
+    await _seed(seeded_db)
+
+    similar = await similar_closed(700)
+    assert {s["number"] for s in similar} == {701, 702}
+    assert all(s["similarity"] >= 0.5 for s in similar)
+    assert similar == sorted(similar, key=lambda s: -s["similarity"])
+    assert await similar_closed(703) == []
+
+    # Rescoring an edited issue replaces its bands instead of adding to them.
+    await queries.upsert_issue(
+        issue_id=701, repo_id=1, number=701, title="Unrelated",
+        body="Completely different text about build caching.", state="closed",
+        created_at="2026-02-01T00:00:00Z", updated_at="2099-01-01T00:00:00Z",
+    )
+    await score_all_dirty()
+    assert {s["number"] for s in await similar_closed(700)} == {702}
+
+
+@pytest.mark.asyncio
+async def test_find_duplicates_cross_repo(seeded_db):
+    await _seed(seeded_db)
+
+    pairs = await find_duplicates()
+    found = {frozenset((p["a"]["number"], p["b"]["number"])) for p in pairs}
+    assert found == {frozenset((700, 701)), frozenset((700, 702)), frozenset((701, 702))}
+
+    pairs = await find_duplicates(cross_repo_only=True)
+    assert all(p["a"]["repo_full_name"] != p["b"]["repo_full_name"] for p in pairs)
+    assert len(pairs) == 2
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+
+import httpx
+import pytest
+
+from app.main import app
+from app.models.schemas import SearchRequest
+from app.services import export_service
+from app.services.export_service import export_search
+
+
+async def _collect(*args, **kwargs) -> list[str]:
+    return [chunk async for chunk in export_search(*args, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_streams_in_chunks(seeded_db, monkeypatch):
+    monkeypatch.setattr(export_service.settings, "export_chunk_size", 1)
+    chunks = await _collect(
+        SearchRequest(query="parse OR pointer"), ["number", "labels", "grade"]
+    )
+    assert len(chunks) == 2
+    records = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert records == [
+        {"number": 42, "labels": ["bug", "good first issue"], "grade": "B"},
+        {"number": 43, "labels": ["bug"], "grade": "F"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_csv_with_filters_and_sort(seeded_db):
+    chunks = await _collect(
+        SearchRequest(query="lang:python"),
+        ["number", "state", "labels"],
+        fmt="csv",
+        sort_by="created",
+    )
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows == [
+        ["number", "state", "labels"],
+        ["42", "open", "bug,good first issue"],
+        ["43", "closed", "bug"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint(seeded_db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get(
+            "/api/search/export",
+            params={"q": "pointer", "fields": "repo,number,fixability_score"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        record = json.loads(resp.text)
+        assert record["repo"] == "owner/repo" and record["number"] == 43
+        assert record["fixability_score"] == pytest.approx(15.0)
+
+        resp = await client.get("/api/search/export", params={"fields": "number,secret"})
+        assert resp.status_code == 422
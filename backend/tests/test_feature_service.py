@@ -44,3 +44,112 @@ async def test_score_all_dirty_skips_scored(seeded_db):
     """Already-scored issues should not be re-scored if unchanged."""
     count = await score_all_dirty()
     assert count == 0  # Both issues in seeded_db already have features
+
+
+@pytest.mark.asyncio
+async def test_score_all_dirty_stores_time_independent_score(db):
+    """Old issues are stored without the staleness penalty."""
+    await db.execute(
+        """INSERT INTO repos (repo_id, full_name, owner, name, stars, forks,
+                              open_issues_count, language, pushed_at, archived)
+           VALUES (1, 'test/repo', 'test', 'repo', 100, 10, 5, 'Python',
+                   '2026-02-15T00:00:00Z', 0)"""
+    )
+    await db.execute(
+        """INSERT INTO issues (issue_id, repo_id, number, title, body, state,
+                               user_login, labels, comments_count, html_url,
+                               created_at, updated_at)
+           VALUES (202, 1, 2, 'Old issue', '', 'open', 'user1', '[]', 0,
+                   'https://github.com/test/repo/issues/2',
+                   '2020-01-01T00:00:00Z', '2020-01-02T00:00:00Z')"""
+    )
+    await db.commit()
+
+    assert await score_all_dirty() == 1
+
+    cursor = await db.execute(
+        "SELECT fixability_score, reason_codes FROM issue_features WHERE issue_id = 202"
+    )
+    row = await cursor.fetchone()
+    assert row[0] == 50.0
+    assert row[1] == ""
+
+
+@pytest.mark.asyncio
+async def test_text_rules_bump_marks_issues_dirty(seeded_db):
+    from app.db import queries
+
+    await seeded_db.execute("UPDATE issue_features SET text_rules_version = 0 WHERE issue_id = 101")
+    await seeded_db.commit()
+
+    dirty = await queries.get_dirty_issues()
+    assert [row["issue_id"] for row in dirty] == [101]
+
+
+@pytest.mark.asyncio
+async def test_rescore_outdated_rewrites_only_score_columns(seeded_db):
+    from app.services.feature_service import SCORE_RULES_VERSION, rescore_outdated
+
+    await seeded_db.execute(
+        "UPDATE issue_features SET score_rules_version = 0, fixability_score = 1 WHERE issue_id = 101"
+    )
+    await seeded_db.commit()
+
+    assert await rescore_outdated() == 1
+    assert await rescore_outdated() == 0
+
+    cursor = await seeded_db.execute(
+        """SELECT fixability_score, grade, computed_at, score_rules_version
+           FROM issue_features WHERE issue_id = 101"""
+    )
+    row = await cursor.fetchone()
+    # 50 + 8 steps + 5 expected/actual + 3 code block + 10 maintainer
+    # + 8 good first issue + 3 bug + 5 active discussion
+    assert row["fixability_score"] == 92.0
+    assert row["grade"] == "A"
+    assert row["computed_at"] == "2026-02-10T00:00:00Z"
+    assert row["score_rules_version"] == SCORE_RULES_VERSION
+
+
+async def _insert_dirty_issues(db, count: int) -> None:
+    await db.execute(
+        """INSERT INTO repos (repo_id, full_name, owner, name)
+           VALUES (1, 'test/repo', 'test', 'repo')"""
+    )
+    await db.executemany(
+        """INSERT INTO issues (issue_id, repo_id, number, title, body, created_at, updated_at)
+           VALUES (?, 1, ?, 'Issue', 'Body', '2026-02-01T00:00:00Z', '2026-02-10T00:00:00Z')""",
+        [(1000 + n, n) for n in range(count)],
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_score_all_dirty_streams_in_chunks(db):
+    await _insert_dirty_issues(db, 7)
+    progress = []
+
+    count = await score_all_dirty(batch_size=3, on_progress=progress.append)
+
+    assert count == 7
+    assert [p["scored"] for p in progress] == [3, 6, 7]
+    assert progress[-1]["last_issue_id"] == 1006
+    cursor = await db.execute("SELECT COUNT(*) FROM issue_features")
+    assert (await cursor.fetchone())[0] == 7
+
+
+@pytest.mark.asyncio
+async def test_score_all_dirty_stops_when_cancelled(db):
+    import asyncio
+
+    await _insert_dirty_issues(db, 7)
+    cancel = asyncio.Event()
+
+    def on_progress(progress: dict) -> None:
+        cancel.set()
+
+    count = await score_all_dirty(batch_size=3, on_progress=on_progress, cancel=cancel)
+
+    assert count == 3
+    cursor = await db.execute("SELECT COUNT(*) FROM issue_features")
+    assert (await cursor.fetchone())[0] == 3
@@ -0,0 +1,135 @@
+import httpx
+import pytest
+
+from app.db import queries
+from app.main import app
+from app.routers import rate_limit
+from app.services.github_client import github_client
+from app.utils import minhash
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_search_and_issue_revalidate_without_sql(seeded_db, monkeypatch):
+    async with _client() as client:
+        resp = await client.post("/api/search", json={"query": "parse"})
+        tag = resp.headers["etag"]
+        assert resp.status_code == 200 and resp.headers["cache-control"] == "private, no-cache"
+        other = await client.post("/api/search", json={"query": "pointer"})
+        assert other.headers["etag"] != tag
+
+        detail = await client.get("/api/issue/owner/repo/42")
+        assert detail.status_code == 200 and detail.headers["etag"] not in (tag, None)
+
+        async def no_sql(*args, **kwargs):
+            raise AssertionError("query ran for a revalidated request")
+
+        monkeypatch.setattr(queries, "search_issues_fts", no_sql)
+        monkeypatch.setattr(queries, "get_issue_by_repo_and_number", no_sql)
+        resp = await client.post(
+            "/api/search", json={"query": "parse"}, headers={"If-None-Match": f'"x", W/{tag}'}
+        )
+        assert resp.status_code == 304 and resp.headers["etag"] == tag and not resp.content
+        resp = await client.get(
+            "/api/issue/owner/repo/42", headers={"If-None-Match": detail.headers["etag"]}
+        )
+        assert resp.status_code == 304
+        assert resp.headers["cache-control"] == "public, max-age=30"
+
+        # Any write moves the generation on, so old tags stop matching.
+        await queries.upsert_issue(
+            issue_id=900, repo_id=1, number=900, title="New", body="", state="open",
+            created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+        )
+        monkeypatch.undo()
+        resp = await client.post(
+            "/api/search", json={"query": "parse"}, headers={"If-None-Match": tag}
+        )
+        assert resp.status_code == 200 and resp.headers["etag"] != tag
+
+
+@pytest.mark.asyncio
+async def test_partial_or_failed_searches_are_not_cached(seeded_db, monkeypatch):
+    from app.db.connection import QueryTimeout
+
+    async def too_slow(*args, **kwargs):
+        raise QueryTimeout("Query ran over its time budget")
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    async with _client() as client:
+        monkeypatch.setattr(queries, "get_facet_counts", too_slow)
+        resp = await client.post(
+            "/api/search", json={"query": "parse", "sort_by": "created", "facets": True}
+        )
+        assert resp.status_code == 200 and resp.json()["timed_out"]
+        assert resp.headers["cache-control"] == "no-store" and "etag" not in resp.headers
+
+        monkeypatch.setattr(queries, "search_issues_fts", broken)
+        # If-None-Match is not honoured for them either.
+        resp = await client.post(
+            "/api/search", json={"query": "pointer", "sort_by": "created"},
+            headers={"If-None-Match": "*"},
+        )
+        assert resp.status_code == 200 and resp.json()["items"] == []
+        assert resp.headers["cache-control"] == "no-store" and "etag" not in resp.headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_served_from_snapshot(monkeypatch):
+    calls = []
+
+    async def get_rate_limit():
+        calls.append(1)
+        return {"resources": {"core": {"remaining": 4000, "limit": 5000, "reset": 1}}}
+
+    monkeypatch.setattr(github_client, "get_rate_limit", get_rate_limit)
+    monkeypatch.setitem(rate_limit._snapshot, "fetched_at", None)
+    async with _client() as client:
+        first = (await client.get("/api/rate-limit")).json()
+        resp = await client.get("/api/rate-limit")
+        assert resp.json() == first and len(calls) == 1
+        assert first["core"]["remaining"] == 4000 and first["search"]["limit"] == -1
+        assert resp.headers["cache-control"] == "private, max-age=10"
+
+        monkeypatch.setattr(rate_limit.settings, "rate_limit_ttl", 0.0)
+        await client.get("/api/rate-limit")
+        assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_issue_detail_is_cached_until_the_issue_changes(seeded_db, monkeypatch):
+    loads = []
+    get_row = queries.get_issue_by_repo_and_number
+
+    async def counting(*args, **kwargs):
+        loads.append(args)
+        return await get_row(*args, **kwargs)
+
+    monkeypatch.setattr(queries, "get_issue_by_repo_and_number", counting)
+    async with _client() as client:
+        first = (await client.get("/api/issue/owner/repo/42")).json()
+        assert (await client.get("/api/issue/owner/repo/42")).json() == first
+        assert len(loads) == 1
+
+        # A write to another issue leaves the cached detail alone, even one
+        # that can change this issue's near-duplicates...
+        await queries.upsert_comment(comment_id=301, issue_id=102, body="Same here.")
+        sig = minhash.signature("Same crash", "Same body on both issues.")
+        entry = (minhash.to_blob(sig), minhash.band_buckets(sig))
+        await queries.upsert_minhash_many([(101, *entry), (102, *entry)])
+        detail = (await client.get("/api/issue/owner/repo/42")).json()
+        assert len(loads) == 1
+        assert [s["number"] for s in detail["similar_closed"]] == [43]
+
+        # ...one to this issue rebuilds it.
+        await queries.upsert_comment(
+            comment_id=302, issue_id=101, body="x" * 500, created_at="2026-02-03T00:00:00Z"
+        )
+        events = (await client.get("/api/issue/owner/repo/42")).json()["timeline_events"]
+        assert len(loads) == 2
+        assert [len(event["body"]) for event in events] == [18, 200]
@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.routers import jobs
+
+
+@pytest.mark.asyncio
+async def test_concurrent_triggers_start_one_job(seeded_db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first, second = await asyncio.gather(
+            client.post("/api/jobs/score"), client.post("/api/jobs/score")
+        )
+        assert {first.json()["message"], second.json()["message"]} == {
+            "Score job started", "Score job already running"
+        }
+        assert (await client.get("/api/jobs/status/score")).json()["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_cancel_after_last_chunk_reports_completed(seeded_db):
+    async def work(on_progress, cancel):
+        cancel.set()  # arrives once everything is done
+        return {"scored": 0}
+
+    async def nothing_left() -> bool:
+        return False
+
+    await jobs._run_job("score", work, jobs._start_job("score"), nothing_left)
+    assert jobs._job_status["score"]["status"] == "completed"
+    await jobs._run_job("score", work, jobs._start_job("score"))
+    assert jobs._job_status["score"]["status"] == "cancelled"
@@ -0,0 +1,96 @@
+import httpx
+import pytest
+
+from app.db import queries
+from app.db.connection import get_generation
+from app.main import app
+from app.models.schemas import SearchRequest
+from app.services import percolator
+from app.services.feature_service import score_all_dirty
+
+
+def test_index_picks_anchor_tokens():
+    index = percolator.PercolatorIndex([
+        (1, SearchRequest(query="crash OR segfault startup"), None),
+        (2, SearchRequest(query='"Null Pointer" pars*'), None),
+        (3, SearchRequest(query="-flaky", language="python"), None),
+        (4, SearchRequest(query="Café"), None),
+    ])
+    # Anchored on "startup", the group every match must contain.
+    assert index.candidates("Segfault at launch") == {3}
+    assert index.candidates("Segfault on startup") == {1, 3}
+    assert index.candidates("null pointer in parser") == {2, 3}
+    assert index.candidates("cafe menu") == {3, 4}
+
+
+async def _save(query: str, min_score: float | None = None, **filters) -> int:
+    req = SearchRequest(query=query, **filters)
+    return await queries.create_saved_search(query, req.model_dump_json(), min_score)
+
+
+async def _new_issue(issue_id: int, title: str, body: str = "", **fields) -> None:
+    await queries.upsert_issue(
+        issue_id=issue_id, repo_id=1, number=issue_id, title=title, body=body,
+        state=fields.get("state", "open"), created_at="2026-02-01T00:00:00Z",
+        updated_at=fields.get("updated_at", "2026-02-01T00:00:00Z"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_score_run_appends_matches_to_outbox(seeded_db):
+    crash = await _save("crash startup", state="open")
+    closed = await _save("crash", state="closed")
+    fixable = await _save("crash", min_score=60)
+    anything = await _save("", language="python")
+
+    await _new_issue(500, "Crash on startup", "Steps to reproduce: open it.")
+    await _new_issue(501, "Dark theme", "Colors are off.")
+    await score_all_dirty()
+
+    rows = await queries.get_saved_search_matches()
+    found = {(row["search_id"], row["number"]) for row in rows}
+    assert (crash, 500) in found and (anything, 500) in found and (anything, 501) in found
+    assert not any(search_id in (closed, fixable) for search_id, _ in found)
+
+    # Editing an issue percolates it again, but it is reported once per search.
+    await _new_issue(500, "Crash on startup!", updated_at="2099-01-01T00:00:00Z")
+    await score_all_dirty()
+    after = await queries.get_saved_search_matches(rows[-1]["match_id"])
+    assert after == []
+
+    # The outbox is not search data: appending to it leaves cached searches valid.
+    generation = get_generation()
+    assert await queries.insert_saved_search_matches([(crash, 501)]) == 1
+    assert get_generation() == generation
+
+
+@pytest.mark.asyncio
+async def test_saved_search_routes(seeded_db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post(
+            "/api/saved-searches",
+            json={"name": "parser bugs", "request": {"query": "parse", "labels": ["bug"]}},
+        )
+        saved = resp.json()
+        assert saved["request"]["labels"] == ["bug"] and saved["min_score"] is None
+        assert [s["name"] for s in (await client.get("/api/saved-searches")).json()] == [
+            "parser bugs"
+        ]
+
+        await queries.upsert_issue(
+            issue_id=600, repo_id=1, number=600, title="Cannot parse config", body="",
+            state="open", labels=["bug"], created_at="2026-02-01T00:00:00Z",
+            updated_at="2026-02-02T00:00:00Z",
+        )
+        await score_all_dirty()
+        page = (await client.get("/api/saved-searches/matches", params={"after": 0})).json()
+        assert [m["number"] for m in page["matches"]] == [600]
+        page = (
+            await client.get("/api/saved-searches/matches", params={"after": page["last_match_id"]})
+        ).json()
+        assert page["matches"] == [] and page["last_match_id"] > 0
+
+        path = f"/api/saved-searches/{saved['search_id']}"
+        assert (await client.delete(path)).status_code == 200
+        assert (await client.delete(path)).status_code == 404
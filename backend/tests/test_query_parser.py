@@ -0,0 +1,57 @@
+import random
+import sqlite3
+
+import pytest
+
+from app.utils.query_parser import parse_query
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("memory leak", '"memory" AND "leak"'),
+    ('"memory leak" pars*', '"memory leak" AND "pars"*'),
+    ("crash parse OR lex", '"crash" AND ("parse" OR "lex")'),
+    ("crash -flaky NOT windows", '("crash") NOT ("flaky" OR "windows")'),
+    ("NEAR(a b) title:x", '"NEAR(a" AND "b)" AND "title:x"'),
+    ('unbalanced "quote here', '"unbalanced" AND "quote here"'),
+    ("OR AND - : * ***", None),
+])
+def test_parse_query_text(query, expected):
+    assert parse_query(query).text == expected
+
+
+def test_parse_query_fields():
+    parsed = parse_query(
+        'segfault repo:owner/repo lang:Rust is:OPEN label:bug label:"good first issue"'
+    )
+    assert parsed.text == '"segfault"'
+    assert parsed.repo == "owner/repo"
+    assert parsed.language == "Rust"
+    assert parsed.state == "open"
+    assert parsed.labels == ["bug", "good first issue"]
+
+
+def test_parse_query_filter_only_and_negative_only():
+    parsed = parse_query("is:closed -label:bug is:whatever")
+    assert parsed.text is None
+    assert parsed.state == "closed"
+    assert parsed.labels == []
+
+    parsed = parse_query("-flaky -windows")
+    assert parsed.text is None
+    assert parsed.exclude_text == '"flaky" OR "windows"'
+
+
+def test_parse_query_fuzz_emits_valid_fts5():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE VIRTUAL TABLE t USING fts5(title, body)")
+    db.execute("INSERT INTO t VALUES ('parse error', 'memory leak in lexer')")
+
+    alphabet = ['"', "-", ":", "*", "(", ")", "^", "+", " ", " ", "a", "é", "_",
+                "OR", "AND", "NOT", "NEAR", "repo:", "is:", "label:", "title:", "{"]
+    rng = random.Random(1234)
+    for _ in range(2000):
+        query = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        parsed = parse_query(query)
+        for expr in (parsed.text, parsed.exclude_text):
+            if expr is not None:
+                db.execute("SELECT rowid FROM t WHERE t MATCH ?", (expr,)).fetchall()
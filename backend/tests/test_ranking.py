@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+from app.services.ranking import RankWeights, rerank
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _candidate(issue_id, bm25, score, stars=0, updated_at="2026-02-28T00:00:00Z"):
+    return {
+        "issue_id": issue_id,
+        "bm25_score": bm25,
+        "effective_score": score,
+        "stars": stars,
+        "updated_at": updated_at,
+    }
+
+
+CANDIDATES = [
+    _candidate(1, -9.0, 20, stars=10, updated_at="2025-01-01T00:00:00Z"),
+    _candidate(2, -6.0, 90, stars=50_000),
+    _candidate(3, -3.0, 60, stars=100, updated_at="2026-02-28T12:00:00Z"),
+]
+
+
+def test_rerank_text_only_keeps_bm25_order():
+    assert rerank(CANDIDATES, RankWeights(text=1.0, fixability=0.0), k=3, now=NOW) == [1, 2, 3]
+
+
+def test_rerank_fixability_only():
+    assert rerank(CANDIDATES, RankWeights(text=0.0, fixability=1.0), k=3, now=NOW) == [2, 3, 1]
+
+
+def test_rerank_blends_stars_and_recency():
+    weights = RankWeights(text=0.0, fixability=0.0, stars=1.0)
+    assert rerank(CANDIDATES, weights, k=1, now=NOW) == [2]
+    weights = RankWeights(text=0.0, fixability=0.0, recency=1.0)
+    assert rerank(CANDIDATES, weights, k=3, now=NOW) == [3, 2, 1]
+
+
+def test_rerank_bounds_output_to_k():
+    assert rerank(CANDIDATES, RankWeights(text=0.65, fixability=0.35), k=2, now=NOW) == [2, 1]
+    assert rerank(CANDIDATES, RankWeights(text=1.0, fixability=0.0), k=0, now=NOW) == []
+    assert rerank([], RankWeights(text=1.0, fixability=0.0), k=5, now=NOW) == []
@@ -1,4 +1,9 @@
-from app.services.feature_service import compute_score_from_features
+from app.services.feature_service import (
+    apply_staleness,
+    compute_base_score,
+    compute_score_from_features,
+    expand_reasons,
+)
 from app.services.score_engine import breakdown_from_features, compute_fixability_from_db
 
 
@@ -168,3 +173,61 @@ def test_compute_fixability_from_db():
     assert result["score"] == 0.76
     assert result["grade"] == "B"
     assert result["enriched"] is True
+
+
+def test_base_score_excludes_staleness():
+    features = {
+        "has_steps_to_reproduce": False,
+        "has_expected_vs_actual": False,
+        "has_stack_trace": False,
+        "has_code_block": False,
+        "env_detail_count": 0,
+        "maintainer_replied": False,
+        "labels": [],
+        "state": "open",
+        "comments_count": 0,
+        "days_old": 200,
+    }
+    base, reasons = compute_base_score(features)
+    assert base == 50.0
+    assert reasons == []
+    assert apply_staleness(base, 200) == (42.0, ["stale"])
+    assert apply_staleness(base, 100) == (46.0, ["aging"])
+    assert apply_staleness(base, 10) == (50.0, [])
+
+
+def test_clamp_applies_after_staleness():
+    features = {
+        "has_steps_to_reproduce": True,
+        "has_expected_vs_actual": True,
+        "has_stack_trace": True,
+        "has_code_block": True,
+        "env_detail_count": 2,
+        "maintainer_replied": True,
+        "labels": ["good first issue", "help wanted", "bug"],
+        "state": "open",
+        "comments_count": 3,
+    }
+    base, _ = compute_base_score(features)
+    assert base == 106.0
+    assert apply_staleness(base, 200) == (98.0, ["stale"])
+    assert apply_staleness(base, 10) == (100.0, [])
+
+
+def test_reason_codes_expand_for_display():
+    features = {
+        "has_steps_to_reproduce": True,
+        "maintainer_replied": True,
+        "labels": ["wontfix"],
+        "state": "closed",
+        "comments_count": 0,
+    }
+    score, codes = compute_base_score(features)
+    assert codes == ["repro", "maintainer", "negative", "closed"]
+    assert expand_reasons(codes) == [
+        "+8 steps to reproduce",
+        "+10 maintainer replied",
+        "-20 wontfix/invalid/duplicate label",
+        "-10 closed",
+    ]
+    assert expand_reasons(["unknown"]) == []
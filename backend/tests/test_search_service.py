@@ -1,6 +1,10 @@
+import json
+
+import httpx
 import pytest
 
-from app.models.schemas import SearchRequest
+from app.main import app
+from app.models.schemas import SearchRequest, SearchResponse
 from app.services.search_service import search_issues
 
 
@@ -26,6 +30,15 @@ async def test_search_no_results(seeded_db):
     assert len(resp.items) == 0
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", ["", "OR - :"])
+async def test_search_without_terms_or_filters_is_empty(seeded_db, query):
+    resp = await search_issues(SearchRequest(query=query, facets=True))
+    assert resp.total_count == 0
+    assert resp.items == []
+    assert resp.facets.state == []
+
+
 @pytest.mark.asyncio
 async def test_search_with_state_filter(seeded_db):
     req = SearchRequest(query="pointer", state="closed")
@@ -33,3 +46,452 @@ async def test_search_with_state_filter(seeded_db):
     assert resp.total_count >= 1
     for item in resp.items:
         assert item.issue.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_search_with_signal_filter(seeded_db):
+    resp = await search_issues(SearchRequest(query="parse OR pointer", signals=["maintainer_replied"]))
+    assert [item.issue.number for item in resp.items] == [42]
+
+    resp = await search_issues(SearchRequest(query="parse OR pointer", signals=["has_stack_trace"]))
+    assert resp.total_count == 0
+
+
+@pytest.mark.asyncio
+async def test_search_cache_hits_until_generation_bumps(seeded_db):
+    from app.db import queries
+    from app.services.cache import search_cache
+
+    before = search_cache.stats()
+    first = await search_issues(SearchRequest(query="TypeError", labels=["bug", "good first issue"]))
+    # Same search with different whitespace and label order is a cache hit.
+    second = await search_issues(SearchRequest(query="  TypeError ", labels=["good first issue", "bug"]))
+    after = search_cache.stats()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+    assert second.items == first.items
+
+    await queries.upsert_issue(
+        issue_id=103, repo_id=1, number=44, title="Another TypeError",
+        body="TypeError again", labels=["bug", "good first issue"],
+        created_at="2026-02-05T00:00:00Z", updated_at="2026-02-05T00:00:00Z",
+    )
+    third = await search_issues(SearchRequest(query="TypeError", labels=["bug", "good first issue"]))
+    assert third.total_count == first.total_count + 1
+
+
+@pytest.mark.asyncio
+async def test_relevance_sort_honors_weight_overrides(seeded_db):
+    query = "parse OR pointer"
+    by_fixability = await search_issues(
+        SearchRequest(query=query, sort_by="relevance", text_weight=0, fixability_weight=1)
+    )
+    assert by_fixability.total_count == 2
+    assert [item.issue.number for item in by_fixability.items] == [42, 43]
+
+    page_two = await search_issues(
+        SearchRequest(query=query, sort_by="relevance", text_weight=0, fixability_weight=1,
+                      page=2, per_page=1)
+    )
+    assert page_two.total_count == 2
+    assert [item.issue.number for item in page_two.items] == [43]
+
+
+async def _seed_sortable_issues(db) -> None:
+    from app.db import queries
+
+    for n in range(5):
+        await queries.upsert_issue(
+            issue_id=500 + n, repo_id=1, number=100 + n, title=f"Sortable widget {n}",
+            body="widget", comments_count=(n * 3) % 5,
+            created_at=f"2026-01-0{n + 1}T00:00:00Z",
+            updated_at=f"2026-02-0{5 - n}T00:00:00Z",
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by,expected", [
+    ("created", [104, 103, 102, 101, 100]),
+    ("updated", [100, 101, 102, 103, 104]),
+    ("comments", [103, 101, 104, 102, 100]),
+])
+async def test_sort_modes_with_keyset_cursor(seeded_db, sort_by, expected):
+    await _seed_sortable_issues(seeded_db)
+
+    seen = []
+    cursor = None
+    for _ in range(3):
+        resp = await search_issues(
+            SearchRequest(query="widget", sort_by=sort_by, per_page=2, cursor=cursor)
+        )
+        assert resp.total_count == 5
+        seen.extend(item.issue.number for item in resp.items)
+        cursor = resp.next_cursor
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_keyset_cursor_pages_across_null_created_at(seeded_db):
+    from app.db import queries
+
+    await _seed_sortable_issues(seeded_db)
+    for n in range(3):
+        await queries.upsert_issue(
+            issue_id=600 + n, repo_id=1, number=200 + n, title=f"Undated widget {n}",
+            body="widget", created_at=None, updated_at=None,
+        )
+
+    seen = []
+    cursor = None
+    for _ in range(5):
+        resp = await search_issues(
+            SearchRequest(query="widget", sort_by="created", per_page=3, cursor=cursor)
+        )
+        assert resp.total_count == 8
+        seen.extend(item.issue.number for item in resp.items)
+        cursor = resp.next_cursor
+        if cursor is None:
+            break
+    # Undated issues sort last, newest issue_id first, and none are skipped.
+    assert seen == [104, 103, 102, 101, 100, 202, 201, 200]
+
+
+@pytest.mark.asyncio
+async def test_index_walk_matches_sorted_results(seeded_db, monkeypatch):
+    from app.db import queries
+
+    await _seed_sortable_issues(seeded_db)
+    expected, _ = await queries.search_issues_fts("widget", sort_by="comments")
+    monkeypatch.setattr(queries, "_INDEX_WALK_MIN_MATCHES", 1)
+    walked, _ = await queries.search_issues_fts("widget", sort_by="comments")
+    assert [r["issue_id"] for r in walked] == [r["issue_id"] for r in expected]
+
+
+@pytest.mark.asyncio
+async def test_search_date_filter_accepts_datetimes(seeded_db):
+    resp = await search_issues(
+        SearchRequest(query="parse OR handler", created_after="2026-01-15")
+    )
+    assert [item.issue.number for item in resp.items] == [42]
+
+
+@pytest.mark.asyncio
+async def test_search_query_syntax(seeded_db):
+    async def numbers(query: str) -> list[int]:
+        resp = await search_issues(SearchRequest(query=query))
+        assert resp.total_count == len(resp.items)
+        return sorted(item.issue.number for item in resp.items)
+
+    assert await numbers('"null pointer"') == [43]
+    assert await numbers("pars* OR handl*") == [42, 43]
+    assert await numbers("pars* OR handl* -pointer") == [42]
+    assert await numbers('parse( "unbalanced') == []
+    # Field filters alone run without a MATCH
+    assert await numbers("is:closed") == [43]
+    assert await numbers('repo:owner/repo lang:python label:"good first issue"') == [42]
+    assert await numbers("-pointer") == [42]
+
+
+@pytest.mark.asyncio
+async def test_unknown_sort_uses_relevance_ranking(seeded_db):
+    def numbers(resp):
+        return [item.issue.number for item in resp.items]
+
+    relevance = await search_issues(SearchRequest(query="parse OR pointer", sort_by="relevance"))
+    other = await search_issues(SearchRequest(query="parse OR pointer", sort_by="stars"))
+    assert numbers(other) == numbers(relevance) and other.total_count == relevance.total_count
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by", ["fixability", "relevance"])
+async def test_search_facets(seeded_db, sort_by):
+    resp = await search_issues(
+        SearchRequest(query="parse OR handler", sort_by=sort_by, facets=True)
+    )
+    assert resp.total_count == 2
+    facets = resp.facets
+    assert not facets.truncated
+    assert {(f.value, f.count) for f in facets.language} == {("Python", 2)}
+    assert {(f.value, f.count) for f in facets.state} == {("open", 1), ("closed", 1)}
+    assert {f.value for f in facets.grade} == {"B", "F"}  # 102 is stale
+    assert facets.labels[0].value == "bug" and facets.labels[0].count == 2
+
+    assert (await search_issues(SearchRequest(query="parse"))).facets is None
+
+
+@pytest.mark.asyncio
+async def test_search_facets_top_labels(seeded_db, monkeypatch):
+    from app.services import search_service
+
+    monkeypatch.setattr(search_service.settings, "search_facet_labels", 1)
+    resp = await search_issues(SearchRequest(query="parse OR handler", facets=True))
+    assert resp.total_count == 2
+    assert not resp.facets.truncated
+    assert [(f.value, f.count) for f in resp.facets.labels] == [("bug", 2)]
+
+
+@pytest.mark.asyncio
+async def test_search_facets_capped(seeded_db, monkeypatch):
+    from app.services import search_service
+
+    monkeypatch.setattr(search_service.settings, "search_facet_cap", 1)
+    resp = await search_issues(SearchRequest(query="parse OR handler", facets=True))
+    # Facets cover one match; the total is still counted exactly.
+    assert resp.facets.truncated
+    assert sum(f.count for f in resp.facets.state) == 1
+    assert resp.total_count == 2
+
+    monkeypatch.setattr(search_service.settings, "search_facet_cap", 2)
+    resp = await search_issues(SearchRequest(query="handler OR parse", facets=True))
+    assert not resp.facets.truncated
+    assert sum(f.count for f in resp.facets.state) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_batch_shares_work_and_isolates_failures(seeded_db, monkeypatch):
+    from app.db import queries
+    from app.services.search_service import search_batch
+
+    counts = 0
+    count_search_matches = queries.count_search_matches
+
+    async def counting(*args, **kwargs):
+        nonlocal counts
+        counts += 1
+        return await count_search_matches(*args, **kwargs)
+
+    monkeypatch.setattr(queries, "count_search_matches", counting)
+    results = await search_batch([
+        SearchRequest(query="parse OR pointer", sort_by="created", per_page=1),
+        SearchRequest(query="pointer", state="closed"),
+        SearchRequest(query="parse OR pointer", sort_by="created", cursor="not-a-cursor"),
+        SearchRequest(query="parse OR pointer", sort_by="updated", per_page=1),
+        SearchRequest(query="parse OR pointer", sort_by="created", per_page=1),
+    ])
+
+    assert [r["error"] is None for r in results] == [True, True, False, True, True]
+    assert [item["issue"]["number"] for item in results[0]["response"]["items"]] == [42]
+    assert [item["issue"]["number"] for item in results[1]["response"]["items"]] == [43]
+    assert [item["issue"]["number"] for item in results[3]["response"]["items"]] == [42]
+    assert results[4] == results[0]
+    # One COUNT per distinct (query, filters): the three "parse OR pointer"
+    # searches share theirs.
+    assert counts == 2
+
+
+@pytest.mark.asyncio
+async def test_search_rejects_bad_cursor(seeded_db):
+    page = await search_issues(
+        SearchRequest(query="parse OR pointer", sort_by="created", per_page=1)
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for cursor, detail in [
+            ("garbage!!", "Invalid cursor"),
+            (page.next_cursor, "Cursor is for sort_by='created', not 'updated'"),
+        ]:
+            resp = await client.post(
+                "/api/search",
+                json={"query": "parse OR pointer", "sort_by": "updated", "cursor": cursor},
+            )
+            assert resp.status_code == 400 and resp.json() == {"detail": detail}
+
+
+@pytest.mark.asyncio
+async def test_cache_get_or_compute_runs_once_for_concurrent_callers(db):
+    import asyncio
+
+    from app.services.cache import GenerationCache
+
+    cache = GenerationCache(maxsize=8, ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+    assert results == ["value"] * 5
+    assert calls == 1
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("bad", fail)
+    assert cache.get("bad") is None
+
+
+@pytest.mark.asyncio
+async def test_cache_waiter_restarts_with_cacheable_after_owner_cancelled(db):
+    import asyncio
+
+    from app.services.cache import GenerationCache
+
+    cache = GenerationCache(maxsize=8, ttl=60)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def timed_out():
+        return {"timed_out": True}
+
+    def complete(value):
+        return not value["timed_out"]
+
+    owner = asyncio.create_task(cache.get_or_compute("k", slow, complete))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_compute("k", timed_out, complete))
+    await asyncio.sleep(0)
+    owner.cancel()
+    # The waiter starts over with its own compute, still subject to cacheable.
+    assert await waiter == {"timed_out": True}
+    assert owner.cancelled()
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_search_snippets_highlight_matches(seeded_db):
+    from app.db import queries
+
+    await queries.upsert_issue(
+        issue_id=600, repo_id=1, number=600, title="Huge log",
+        body=("filler line " * 2000) + "the segfault happens here" + (" more" * 2000),
+        created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+    )
+    for sort_by in ("fixability", "relevance", "created"):
+        resp = await search_issues(SearchRequest(query="segfault", sort_by=sort_by))
+        snippet = resp.items[0].issue.body_snippet
+        assert "<mark>segfault</mark>" in snippet
+        assert snippet.startswith("…") and len(snippet) < 400
+
+    # Filter-only searches have nothing to highlight: show the start of the body.
+    resp = await search_issues(SearchRequest(query="is:closed"))
+    assert resp.items[0].issue.body_snippet == "Null pointer when handler is None."
+
+    rows, _ = await queries.search_issues_fts("segfault")
+    assert "body" not in rows[0].keys()
+
+
+@pytest.mark.asyncio
+async def test_search_snippets_escape_issue_html(seeded_db):
+    from app.db import queries
+
+    await queries.upsert_issue(
+        issue_id=601, repo_id=1, number=601, title="Injected",
+        body='Crashes with <script>alert(1)</script> & "quotes" in the segfault log',
+        created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+    )
+    expected = (
+        "Crashes with &lt;script&gt;alert(1)&lt;/script&gt; &amp; &quot;quotes&quot;"
+        " in the <mark>segfault</mark> log"
+    )
+    resp = await search_issues(SearchRequest(query="segfault"))
+    assert resp.items[0].issue.body_snippet == expected
+    resp = await search_issues(SearchRequest(query="", repo="owner/repo", sort_by="created"))
+    preview = next(item for item in resp.items if item.issue.number == 601).issue.body_snippet
+    assert preview == expected.replace("<mark>", "").replace("</mark>", "")
+
+
+@pytest.mark.asyncio
+async def test_search_payload_matches_response_model(seeded_db):
+    from app.services.search_service import search_payload
+    from app.utils import fast_json
+
+    for req in (
+        SearchRequest(query="parse OR pointer", facets=True),
+        SearchRequest(query="parse OR pointer", sort_by="relevance"),
+        SearchRequest(query="parse(", sort_by="created", cursor="bad"),
+    ):
+        payload = await search_payload(req)
+        # The fast path emits exactly what the pydantic models would.
+        assert SearchResponse.model_validate(payload).model_dump(mode="json") == payload
+        assert json.loads(fast_json.dumps(payload)) == payload
+
+
+@pytest.mark.asyncio
+async def test_misspelled_query_falls_back_to_corrections(seeded_db, monkeypatch):
+    from app.db import queries
+    from app.services import search_service, suggest_service
+
+    for issue_id in (610, 611):
+        await queries.upsert_issue(
+            issue_id=issue_id, repo_id=1, number=issue_id, title="Serialization error",
+            body="Serialization fails for nested models.", state="open",
+            created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+        )
+    await suggest_service.rebuild()
+
+    resp = await search_issues(SearchRequest(query="serializaton nested"))
+    assert resp.total_count == 2
+    assert resp.did_you_mean == "serialization nested"
+    assert "<mark>Serialization</mark>" in resp.items[0].issue.body_snippet
+
+    # Queries that already match enough, or only need another page, are untouched.
+    resp = await search_issues(SearchRequest(query="serialization"))
+    assert resp.did_you_mean is None
+    resp = await search_issues(SearchRequest(query="serializaton", page=2))
+    assert resp.total_count == 0 and resp.did_you_mean is None
+
+    monkeypatch.setattr(search_service.settings, "fuzzy_budget_ms", 0.0)
+    resp = await search_issues(SearchRequest(query="nested serializaton"))
+    assert resp.total_count == 0 and resp.did_you_mean is None
+
+
+@pytest.mark.asyncio
+async def test_search_degrades_when_out_of_time(seeded_db, monkeypatch):
+    from app.db import queries
+    from app.db.connection import QueryTimeout
+
+    async def too_slow(*args, **kwargs):
+        raise QueryTimeout("Query ran over its time budget")
+
+    # The count and facets are optional: the page still comes back.
+    monkeypatch.setattr(queries, "count_search_matches", too_slow)
+    monkeypatch.setattr(queries, "get_facet_counts", too_slow)
+    resp = await search_issues(SearchRequest(query="parse OR pointer", sort_by="created", facets=True))
+    assert resp.timed_out
+    assert [item.issue.number for item in resp.items] == [42, 43]
+    assert resp.total_count == 2  # a lower bound: what was seen
+    assert resp.facets.truncated
+
+    # Without a first page the query is reported as too broad.
+    monkeypatch.setattr(queries, "search_issues_fts", too_slow)
+    resp = await search_issues(SearchRequest(query="parse", sort_by="created"))
+    assert resp.timed_out and resp.total_count == 0 and resp.items == []
+
+    # Neither result was cached: once there is time, the same searches complete.
+    monkeypatch.undo()
+    resp = await search_issues(SearchRequest(query="parse", sort_by="created"))
+    assert not resp.timed_out and resp.total_count == 1
+    resp = await search_issues(SearchRequest(query="parse OR pointer", sort_by="created", facets=True))
+    assert not resp.timed_out and not resp.facets.truncated
+
+
+@pytest.mark.asyncio
+async def test_search_route_cancels_work_on_disconnect():
+    import asyncio
+
+    from app.routers.search import _unless_disconnected
+
+    class DisconnectedRequest:
+        async def receive(self):
+            return {"type": "http.disconnect"}
+
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    assert await _unless_disconnected(DisconnectedRequest(), slow()) is None
+    assert cancelled.is_set()
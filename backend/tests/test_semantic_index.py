@@ -0,0 +1,103 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.db import queries
+from app.models.schemas import SearchRequest
+from app.services import semantic_index
+from app.services.feature_service import score_all_dirty
+from app.services.ranking import reciprocal_rank_fusion
+from app.services.search_service import search_issues
+from app.utils.embedding import HashingEncoder
+
+
+@pytest.fixture
+def semantic(monkeypatch, tmp_path):
+    monkeypatch.setattr(semantic_index.settings, "semantic_search_enabled", True)
+    monkeypatch.setattr(semantic_index.settings, "semantic_index_dir", str(tmp_path))
+    monkeypatch.setattr(semantic_index, "_MIN_CAPACITY", 2)
+
+
+async def _seed() -> None:
+    for issue_id, title, body in [
+        (800, "Extension crashes on startup", "The window closes as soon as it starts."),
+        (801, "Dark theme colors", "The sidebar uses the wrong accent color."),
+        (802, "Slow indexing of large folders", "Indexing takes minutes on big repos."),
+    ]:
+        await queries.upsert_issue(
+            issue_id=issue_id, repo_id=1, number=issue_id, title=title, body=body,
+            state="open", created_at="2026-02-01T00:00:00Z", updated_at="2026-02-01T00:00:00Z",
+        )
+
+
+def test_hashing_encoder_is_deterministic_and_normalized():
+    encoder = HashingEncoder(256)
+    a, b, c = encoder.encode(["crash on startup", "crashing at startup", "dark theme colors"])
+    assert np.allclose(a, HashingEncoder(256).encode(["crash on startup"])[0])
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert a @ b > a @ c
+    assert not encoder.encode([""])[0].any()
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60) == [1, 3, 2]
+    assert reciprocal_rank_fusion([[], [5]]) == [5]
+
+
+@pytest.mark.asyncio
+async def test_sync_is_incremental_and_trains_ivf(seeded_db, semantic, monkeypatch):
+    await _seed()
+    await score_all_dirty()
+    assert await queries.get_embedding_stats() == (5, 4)
+    assert (await semantic_index.search("crashing at startup", 3))[0] == 800
+
+    # Only the edited issue is re-embedded, into its old slot.
+    slots = {r["issue_id"]: r["slot"] for r in await queries.get_embedding_slots()}
+    await queries.upsert_issue(
+        issue_id=801, repo_id=1, number=801, title="Startup crash in safe mode",
+        body="Crashes on startup when extensions are disabled.", state="open",
+        created_at="2026-02-01T00:00:00Z", updated_at="2099-01-01T00:00:00Z",
+    )
+    assert await semantic_index.sync() == 1
+    assert {r["issue_id"]: r["slot"] for r in await queries.get_embedding_slots()} == slots
+
+    monkeypatch.setattr(semantic_index.settings, "semantic_ivf_min_vectors", 3)
+    monkeypatch.setattr(semantic_index.settings, "semantic_nprobe", 100)
+    await semantic_index.sync()
+    index = semantic_index.get_index()
+    assert index.meta["trained_count"] == 5
+    assert await queries.get_embedding_slots([-1]) == []
+    top = await semantic_index.search("crashing at startup", 2)
+    assert set(top) == {800, 801}
+
+
+@pytest.mark.asyncio
+async def test_semantic_and_hybrid_search_modes(seeded_db, semantic):
+    await _seed()
+    await score_all_dirty()
+
+    # No FTS match for "crashing", but the trigrams overlap "crashes".
+    keyword = await search_issues(SearchRequest(query="crashing startup"))
+    assert keyword.total_count == 0
+    semantic = await search_issues(SearchRequest(query="crashing startup", mode="semantic"))
+    assert semantic.items[0].issue.number == 800
+    assert semantic.items[0].issue.body_snippet.startswith("The window closes")
+
+    hybrid = await search_issues(
+        SearchRequest(query="parse", mode="hybrid", state="open", per_page=50)
+    )
+    numbers = [item.issue.number for item in hybrid.items]
+    assert numbers[0] == 42
+    assert 43 not in numbers  # closed: filtered out of the semantic hits too
+
+
+@pytest.mark.asyncio
+async def test_semantic_mode_falls_back_to_keyword(seeded_db, semantic, monkeypatch):
+    await _seed()
+    await score_all_dirty()
+    monkeypatch.setattr(semantic_index.settings, "semantic_search_enabled", False)
+
+    result = await search_issues(SearchRequest(query="crashing startup", mode="semantic"))
+    assert result.total_count == 0
+    result = await search_issues(SearchRequest(query="startup", mode="hybrid"))
+    assert [item.issue.number for item in result.items] == [800]
@@ -0,0 +1,77 @@
+import pytest
+
+from app.services import suggest_service
+from app.services.suggest_service import PrefixIndex
+
+
+def test_prefix_index_ranks_by_weight_and_dedupes():
+    index = PrefixIndex([
+        ("parse", "parse", 5), ("parser", "parser", 9), ("path", "path", 7),
+        ("pandas", "org/pandas", 3), ("org/pandas", "org/pandas", 3),
+    ])
+    assert index.complete("pa", 3) == [("parser", 9), ("path", 7), ("parse", 5)]
+    assert index.complete("PARS") == [("parser", 9), ("parse", 5)]
+    assert index.complete("pand") == [("org/pandas", 3)]
+    assert index.complete("x") == []
+    assert index.complete("") == []
+
+
+@pytest.mark.asyncio
+async def test_suggest_terms_repos_and_labels(seeded_db):
+    await suggest_service.rebuild()
+
+    # Only terms in at least suggest_min_docs (2) issues are kept.
+    result = await suggest_service.suggest("null poi")
+    assert result["terms"] == []
+    result = await suggest_service.suggest("parse(None) whe")
+    assert result["terms"] == [{"value": "when", "count": 2}]
+
+    result = await suggest_service.suggest("b")
+    assert result["labels"] == [{"value": "bug", "count": 2}]
+    assert (await suggest_service.suggest("re"))["repos"] == [{"value": "owner/repo", "count": 1000}]
+
+    assert await suggest_service.suggest("repo:own") == {
+        "terms": [], "repos": [{"value": "owner/repo", "count": 1000}], "labels": [],
+    }
+    result = await suggest_service.suggest('-label:"good fi')
+    assert result["labels"] == [{"value": "good first issue", "count": 1}]
+    assert await suggest_service.suggest("bug ") == {"terms": [], "repos": [], "labels": []}
+
+
+def test_trigram_index_finds_near_spellings():
+    from app.services.suggest_service import TrigramIndex, _edit_distance
+
+    vocab = TrigramIndex([
+        ("serialization", 40), ("serializer", 25), ("specialization", 3), ("parse", 9),
+    ])
+    assert vocab.nearest("serializaton") == ["serialization"]
+    assert vocab.nearest("serialisation") == ["serialization"]
+    assert vocab.nearest("pasre") == ["parse"]  # one transposition
+    assert vocab.nearest("xyzzy") == []
+    assert "parse" in vocab and "pasre" not in vocab
+    assert _edit_distance("kitten", "sitting", 5) == 3
+    assert _edit_distance("kitten", "sitting", 1) == 2
+
+
+@pytest.mark.asyncio
+async def test_corrections_do_not_wait_for_a_cold_index(seeded_db, monkeypatch):
+    monkeypatch.setattr(suggest_service, "_suggester", None)
+    monkeypatch.setattr(suggest_service, "_cold_build", None)
+    builds = 0
+    rebuild = suggest_service.rebuild
+
+    async def counting_rebuild():
+        nonlocal builds
+        builds += 1
+        await rebuild()
+
+    monkeypatch.setattr(suggest_service, "rebuild", counting_rebuild)
+    # No index yet: nothing is found, and one background build serves both calls.
+    assert await suggest_service.corrections(["whne"]) == {}
+    assert await suggest_service.suggest("pa") == {"terms": [], "repos": [], "labels": []}
+    build = suggest_service.schedule_rebuild()
+    assert build is not None
+    await build
+    assert builds == 1
+    assert suggest_service.schedule_rebuild() is None
+    assert await suggest_service.corrections(["whne"]) == {"whne": ["when"]}
@@ -0,0 +1,170 @@
+import copy
+import hashlib
+import hmac
+import json
+import sqlite3
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.db import queries
+from app.main import app
+from app.services import webhook_service
+from app.services.feature_service import score_all_dirty
+from app.services.webhook_service import write_queue
+
+SECRET = "test-secret"
+FIXTURES = Path(__file__).parent / "fixtures" / "webhooks"
+
+
+def _load(name: str) -> dict:
+    return json.loads((FIXTURES / f"{name}.json").read_text())
+
+
+@pytest.fixture
+def webhooks(monkeypatch):
+    monkeypatch.setattr(webhook_service.settings, "github_webhook_secret", SECRET)
+    monkeypatch.setattr(webhook_service.settings, "webhook_flush_interval", 60.0)
+
+
+async def _deliver(client: httpx.AsyncClient, event: str, payload: dict, secret: str = SECRET):
+    body = json.dumps(payload).encode()
+    signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return await client.post(
+        "/api/webhooks/github",
+        content=body,
+        headers={"X-GitHub-Event": event, "X-Hub-Signature-256": signature},
+    )
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_replayed_deliveries_are_batched_and_marked_dirty(seeded_db, webhooks):
+    opened = _load("issues_opened")
+    commented = _load("issue_comment_created")
+    stale = copy.deepcopy(opened)
+    stale["issue"].update(title="Old title", updated_at="2026-02-28T00:00:00Z")
+
+    async with _client() as client:
+        for event, payload in [
+            ("issues", opened), ("issue_comment", commented), ("issues", stale),
+        ]:
+            resp = await _deliver(client, event, payload)
+            assert resp.status_code == 202 and resp.json() == {"message": "Queued"}
+        assert await queries.get_issue_by_repo_and_number("owner", "repo", 44) is None
+        await write_queue.flush()
+
+    issue = await queries.get_issue_by_repo_and_number("owner", "repo", 44)
+    assert issue["title"] == "Crash when parse() gets an empty file"
+    assert issue["labels"] == '["bug"]'
+    dirty = {row["issue_id"]: row["changed"] for row in await queries.get_dirty_issues()}
+    assert dirty == {102: 1, 103: 1}
+    await score_all_dirty()
+    closed = await queries.get_issue_by_repo_and_number("owner", "repo", 43)
+    assert closed["synced_comment_count"] == 1 and closed["maintainer_replied"] == 1
+
+    # An older delivery arriving after the batch does not roll the issue back.
+    async with _client() as client:
+        await _deliver(client, "issues", stale)
+        deleted = copy.deepcopy(commented)
+        deleted["action"] = "deleted"
+        await _deliver(client, "issue_comment", deleted)
+        await write_queue.flush()
+    issue = await queries.get_issue_by_repo_and_number("owner", "repo", 44)
+    assert issue["title"] == "Crash when parse() gets an empty file"
+    closed = await queries.get_issue_by_repo_and_number("owner", "repo", 43)
+    assert closed["synced_comment_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_and_ignores(seeded_db, webhooks, monkeypatch):
+    payload = _load("issue_comment_created")
+    async with _client() as client:
+        assert (await _deliver(client, "issues", payload, secret="wrong")).status_code == 401
+        non_ascii = {"X-GitHub-Event": "issues", "X-Hub-Signature-256": "sha256=\xe9".encode("latin-1")}
+        resp = await client.post("/api/webhooks/github", content=b"{}", headers=non_ascii)
+        assert resp.status_code == 401
+        assert (await _deliver(client, "ping", {"zen": "Keep it simple."})).json() == {
+            "message": "pong"
+        }
+        assert (await _deliver(client, "push", {})).json()["message"] == "Ignored push event"
+
+        payload["issue"]["pull_request"] = {"url": "https://api.github.com/repos/owner/repo/pulls/43"}
+        resp = await _deliver(client, "issue_comment", payload)
+        assert resp.json()["message"] == "Ignored issue_comment event" and not len(write_queue)
+
+        monkeypatch.setattr(webhook_service.settings, "github_webhook_secret", "")
+        assert (await _deliver(client, "ping", {})).status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_requeued(seeded_db, webhooks, monkeypatch):
+    opened = _load("issues_opened")
+    stale = copy.deepcopy(opened)
+    stale["issue"].update(title="Old title", updated_at="2026-02-28T00:00:00Z")
+
+    async def busy(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    async with _client() as client:
+        await _deliver(client, "issues", opened)
+        monkeypatch.setattr(queries, "write_webhook_batch", busy)
+        assert not await write_queue.flush() and len(write_queue)
+        # Arriving while the batch waits for its retry, the older delivery
+        # still loses to the one already acknowledged.
+        await _deliver(client, "issues", stale)
+        monkeypatch.undo()
+        monkeypatch.setattr(webhook_service.settings, "github_webhook_secret", SECRET)
+        assert await write_queue.flush() and not len(write_queue)
+
+    issue = await queries.get_issue_by_repo_and_number("owner", "repo", 44)
+    assert issue["title"] == "Crash when parse() gets an empty file"
+    assert write_queue.stats()["failed_issues"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_update_failing_past_retry_cap_is_dropped(seeded_db, webhooks, monkeypatch):
+    queue = webhook_service.WriteQueue()
+    monkeypatch.setattr(webhook_service.settings, "webhook_max_retries", 2)
+
+    async def poison(*args):
+        raise sqlite3.IntegrityError("CHECK constraint failed")
+
+    monkeypatch.setattr(queries, "write_webhook_batch", poison)
+    await queue.put("issues", _load("issues_opened"))
+    for _ in range(2):
+        assert not await queue.flush() and len(queue)
+    assert not await queue.flush()
+    # The third failure uses up its retries: nothing is left to stall the queue.
+    assert not len(queue)
+    assert queue.stats()["dropped_issues"] == 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_a_running_flush(seeded_db, webhooks, monkeypatch):
+    import asyncio
+
+    queue = webhook_service.WriteQueue()
+    monkeypatch.setattr(webhook_service.settings, "webhook_flush_interval", 0.0)
+    started, release = asyncio.Event(), asyncio.Event()
+    write = queries.write_webhook_batch
+
+    async def slow_write(*args):
+        started.set()
+        await release.wait()
+        await write(*args)
+
+    monkeypatch.setattr(queries, "write_webhook_batch", slow_write)
+    await queue.put("issues", _load("issues_opened"))
+    await started.wait()  # the timer's flush is mid-write
+    closing = asyncio.create_task(queue.close())
+    await asyncio.sleep(0)
+    release.set()
+    await closing
+    assert queue.stats()["flushed_issues"] == 1 and not len(queue)
+    assert await queries.get_issue_by_repo_and_number("owner", "repo", 44) is not None